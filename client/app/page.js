@@ -9,6 +9,8 @@ const AudioStreamingComponent = () => {
     const audioContextRef = React.useRef(null);
     const audioQueueRef = React.useRef([]);
     const isPlayingRef = React.useRef(false);
+    const currentSourceRef = React.useRef(null);
+    const playedMsRef = React.useRef(0);
     const agentId = "e4adba25-65d0-4fee-9d00-f06671babcf1";
 
     // Initialize audio context
@@ -40,9 +42,18 @@ const AudioStreamingComponent = () => {
             source.connect(audioContextRef.current.destination);
 
             source.onended = () => {
+                if (currentSourceRef.current !== source) {
+                    return;
+                }
+                currentSourceRef.current = null;
+
+                // Acknowledge played audio so the server can pace what it sends to our buffer
+                playedMsRef.current += audioBuffer.duration * 1000;
+                sendAck(audioQueueRef.current.length === 0);
                 playNextInQueue();
             };
 
+            currentSourceRef.current = source;
             source.start(0);
         } catch (error) {
             console.error("ERROR PLAYING AUDIO:", error);
@@ -50,6 +61,13 @@ const AudioStreamingComponent = () => {
         }
     };
 
+    const sendAck = (starved) => {
+        const ws = websocketRef.current;
+        if (ws && ws.readyState === WebSocket.OPEN) {
+            ws.send(JSON.stringify({ type: "ack", played_ms: playedMsRef.current, starved }));
+        }
+    };
+
     const toggleStreaming = async () => {
         if (isStreaming) {
             if (mediaRecorderRef.current) {
@@ -99,6 +117,23 @@ const AudioStreamingComponent = () => {
                 };
 
                 ws.onmessage = async (event) => {
+                    // Control messages from the server are JSON text frames
+                    if (typeof event.data === "string") {
+                        const message = JSON.parse(event.data);
+                        if (message.type === "clear") {
+                            // Caller interrupted the agent, drop everything buffered and stop playback
+                            audioQueueRef.current = [];
+                            playedMsRef.current = 0;
+                            if (currentSourceRef.current) {
+                                const source = currentSourceRef.current;
+                                currentSourceRef.current = null;
+                                source.stop();
+                            }
+                            isPlayingRef.current = false;
+                        }
+                        return;
+                    }
+
                     // Handle incoming audio data
                     if (event.data instanceof Blob) {
                         audioQueueRef.current.push(event.data);
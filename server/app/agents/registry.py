@@ -0,0 +1,381 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from contextlib import closing
+from functools import lru_cache
+from typing import NamedTuple
+
+from app.core.config import get_settings
+from app.lib.constants import (
+    DEFAULT_FILLERS,
+    DEFAULT_MAX_CALL_DURATION_MS,
+    DEFAULT_MODEL,
+    DEFAULT_SYSTEM_PROMPT,
+    DEFAULT_VOICE_ID,
+    DEFAULT_VOICE_MODEL_ID,
+    DEFAULT_VOICE_SETTINGS,
+)
+from app.lib.metrics import CallbackGauge, CounterVec, register
+from app.lib.utils import normalize_transcript
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENT_ID = "default"
+
+AGENT_CONFIG_LOOKUPS = register(CounterVec(
+    "agent_config_lookups_total",
+    "Agent config lookups at call setup by result: hit, stale (served while reloading), load (read from the store) or default.",
+    ("result",),
+))
+AGENT_CONFIG_ERRORS = register(CounterVec(
+    "agent_config_errors_total",
+    "Agent configs that failed to load or validate. The previous version, if any, stays in use.",
+))
+
+# Deepgram parameters derived from the call's audio format or other settings, not per agent.
+RESERVED_STT_PARAMS = ("encoding", "sample_rate", "channels", "interim_results")
+SCALAR_TYPES = (str, int, float, bool)
+MAX_FILLERS = 10
+MAX_FILLER_CHARS = 40
+MAX_CACHED_PHRASES = 200
+
+
+class AgentConfig(NamedTuple):
+    """Validated, immutable pipeline settings for one agent, shared by all of its calls."""
+    agent_id: str
+    version: str
+    name: str
+    system_prompt: str
+    greeting: str               # Spoken when the call starts, rendered from the agent's fields. Empty for none.
+    fillers: tuple              # Short phrases played while a slow response is on its way
+    cached_phrases: frozenset   # Normalized caller phrases whose responses may be reused across calls
+    llm_model: str
+    voice_id: str
+    voice_model_id: str
+    voice_settings: tuple       # (key, value) pairs, dict(...) them for the provider
+    stt_params: tuple           # (key, value) pairs of extra Deepgram listen parameters
+    max_call_duration_ms: int
+
+
+FIELDS = {
+    "name": str,
+    "system_prompt": str,
+    "greeting": str,
+    "fillers": list,
+    "cached_phrases": list,
+    "llm_model": str,
+    "voice_id": str,
+    "voice_model_id": str,
+    "voice_settings": dict,
+    "stt_params": dict,
+    "max_call_duration_ms": int,
+}
+
+
+def compile_agent(agent_id: str, raw: dict, version: str = ""):
+    """Validates a stored agent and compiles it into an AgentConfig. Raises ValueError on bad input."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"Agent {agent_id}: expected an object, got {type(raw).__name__}")
+
+    unknown = set(raw) - set(FIELDS) - {"agent_id"}
+    if unknown:
+        raise ValueError(f"Agent {agent_id}: unknown fields {', '.join(sorted(unknown))}")
+
+    for field, field_type in FIELDS.items():
+        # bool is an int, but never a valid one here.
+        if field in raw and (not isinstance(raw[field], field_type) or isinstance(raw[field], bool) and field_type is int):
+            raise ValueError(f"Agent {agent_id}: {field} must be {field_type.__name__}")
+
+    voice_settings = raw.get("voice_settings", DEFAULT_VOICE_SETTINGS)
+    for key, value in voice_settings.items():
+        if not isinstance(value, (int, float, bool)):
+            raise ValueError(f"Agent {agent_id}: voice_settings.{key} must be a number or bool")
+
+    stt_params = raw.get("stt_params", {})
+    for key, value in stt_params.items():
+        if key in RESERVED_STT_PARAMS:
+            raise ValueError(f"Agent {agent_id}: stt_params.{key} is set from the call's audio format")
+        if not isinstance(value, SCALAR_TYPES):
+            raise ValueError(f"Agent {agent_id}: stt_params.{key} must be a string, number or bool")
+
+    fillers = raw.get("fillers", DEFAULT_FILLERS)
+    if len(fillers) > MAX_FILLERS:
+        raise ValueError(f"Agent {agent_id}: at most {MAX_FILLERS} fillers")
+    for filler in fillers:
+        if not isinstance(filler, str) or not filler.strip() or len(filler) > MAX_FILLER_CHARS:
+            raise ValueError(f"Agent {agent_id}: fillers must be non-empty strings of at most {MAX_FILLER_CHARS} characters")
+
+    cached_phrases = raw.get("cached_phrases", [])
+    if len(cached_phrases) > MAX_CACHED_PHRASES:
+        raise ValueError(f"Agent {agent_id}: at most {MAX_CACHED_PHRASES} cached_phrases")
+    for phrase in cached_phrases:
+        if not isinstance(phrase, str) or not normalize_transcript(phrase):
+            raise ValueError(f"Agent {agent_id}: cached_phrases must be non-empty strings")
+
+    max_call_duration_ms = raw.get("max_call_duration_ms", DEFAULT_MAX_CALL_DURATION_MS)
+    if max_call_duration_ms <= 0:
+        raise ValueError(f"Agent {agent_id}: max_call_duration_ms must be positive")
+
+    system_prompt = raw.get("system_prompt", DEFAULT_SYSTEM_PROMPT).strip()
+    if not system_prompt:
+        raise ValueError(f"Agent {agent_id}: system_prompt is empty")
+
+    name = raw.get("name", agent_id)
+    try:
+        greeting = raw.get("greeting", "").format(name=name).strip()
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Agent {agent_id}: greeting can only reference {{name}}: {e}")
+
+    return AgentConfig(
+        agent_id=agent_id,
+        version=version,
+        name=name,
+        system_prompt=system_prompt,
+        greeting=greeting,
+        fillers=tuple(filler.strip() for filler in fillers),
+        cached_phrases=frozenset(normalize_transcript(phrase) for phrase in cached_phrases),
+        llm_model=raw.get("llm_model", DEFAULT_MODEL),
+        voice_id=raw.get("voice_id", DEFAULT_VOICE_ID),
+        voice_model_id=raw.get("voice_model_id", DEFAULT_VOICE_MODEL_ID),
+        voice_settings=tuple(sorted(voice_settings.items())),
+        stt_params=tuple(sorted((key, str(value).lower() if isinstance(value, bool) else value) for key, value in stt_params.items())),
+        max_call_duration_ms=max_call_duration_ms,
+    )
+
+
+DEFAULT_AGENT = compile_agent(DEFAULT_AGENT_ID, {})
+
+
+class FileAgentStore:
+    """One JSON file per agent in a directory, named <agent_id>.json. Versions are file mtimes."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def list_versions(self):
+        versions = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".json") and entry.is_file():
+                stat = entry.stat()
+                versions[entry.name[:-len(".json")]] = f"{stat.st_mtime_ns}-{stat.st_size}"
+        return versions
+
+    def load(self, agent_id: str):
+        """Returns (raw config, version), or (None, None) when the agent doesn't exist."""
+        path = os.path.join(self.directory, f"{agent_id}.json")
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(self.directory):
+            return None, None
+        try:
+            with open(path) as f:
+                stat = os.fstat(f.fileno())
+                return json.load(f), f"{stat.st_mtime_ns}-{stat.st_size}"
+        except FileNotFoundError:
+            return None, None
+
+
+class SqliteAgentStore:
+    """Agents in an embedded SQLite table, versioned by their updated_at column."""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with closing(self.connect()) as connection, connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS agents (agent_id TEXT PRIMARY KEY, config TEXT NOT NULL, updated_at REAL NOT NULL)")
+
+    def connect(self):
+        # Calls come from whichever thread asyncio.to_thread picks, so each gets its own connection.
+        return sqlite3.connect(self.path)
+
+    def list_versions(self):
+        with closing(self.connect()) as connection:
+            return {agent_id: str(updated_at) for agent_id, updated_at in connection.execute("SELECT agent_id, updated_at FROM agents")}
+
+    def load(self, agent_id: str):
+        with closing(self.connect()) as connection:
+            row = connection.execute("SELECT config, updated_at FROM agents WHERE agent_id = ?", (agent_id,)).fetchone()
+        if row is None:
+            return None, None
+        return json.loads(row[0]), str(row[1])
+
+    def save(self, agent_id: str, raw: dict):
+        """Validates and stores an agent. Workers pick it up on their next reload."""
+        compile_agent(agent_id, raw)
+        with closing(self.connect()) as connection, connection:
+            connection.execute(
+                "INSERT INTO agents (agent_id, config, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(agent_id) DO UPDATE SET config = excluded.config, updated_at = excluded.updated_at",
+                (agent_id, json.dumps(raw), time.time()),
+            )
+
+
+class CachedAgent(NamedTuple):
+    config: AgentConfig
+    loaded_at: float
+
+
+class AgentRegistry:
+    """
+    Compiled agent configs, held in memory so call setup never parses or touches the store.
+
+    Every agent in the store is compiled at startup, and a background task rescans the store every
+    `reload_interval_s` and recompiles the agents whose version changed. Entries older than `ttl_s`
+    are still served, and reloaded in the background. An agent that isn't cached yet is loaded on its
+    first call; unknown agents fall back to the store's "default" agent, then to the built-in one.
+    A config that fails validation is logged and the previous version stays in use.
+    """
+
+    def __init__(self, store, ttl_s: float = 300.0, reload_interval_s: float = 5.0):
+        self.store = store
+        self.ttl_s = ttl_s
+        self.reload_interval_s = reload_interval_s
+
+        self.agents: dict = {}          # agent_id -> CachedAgent
+        self.missing: dict = {}         # agent_id -> when the store last didn't have it
+        self.reloading: set = set()     # agent ids with a background reload in flight
+        self.invalid: dict = {}         # agent_id -> stored version that failed validation, not retried
+
+        self.reload_task = None
+        self.background_tasks: set = set()
+        self.load_listeners: list = []  # Called with each newly compiled AgentConfig
+
+    def get_default(self):
+        cached = self.agents.get(DEFAULT_AGENT_ID)
+        return cached.config if cached else DEFAULT_AGENT
+
+    def add_load_listener(self, listener):
+        """Call `listener(config)` for every agent compiled from now on, and for the default agent."""
+        self.load_listeners.append(listener)
+        listener(self.get_default())
+
+    async def get(self, agent_id: str):
+        cached = self.agents.get(agent_id)
+        now = time.monotonic()
+
+        if cached is None:
+            missing_at = self.missing.get(agent_id)
+            if missing_at is not None and now - missing_at < self.ttl_s:
+                AGENT_CONFIG_LOOKUPS.inc(1, "default")
+                return self.get_default()
+
+            cached = await self.load(agent_id)
+            if cached is None:
+                logger.warning(f"Agent {agent_id} not found, using the default agent")
+                AGENT_CONFIG_LOOKUPS.inc(1, "default")
+                return self.get_default()
+            AGENT_CONFIG_LOOKUPS.inc(1, "load")
+            return cached.config
+
+        if now - cached.loaded_at > self.ttl_s:
+            self.reload_in_background(agent_id)
+            AGENT_CONFIG_LOOKUPS.inc(1, "stale")
+        else:
+            AGENT_CONFIG_LOOKUPS.inc(1, "hit")
+        return cached.config
+
+    async def load(self, agent_id: str):
+        """Reads and compiles one agent. Returns the cached entry, the old one if the new one is invalid."""
+        version = None
+        try:
+            raw, version = await asyncio.to_thread(self.store.load, agent_id)
+            if raw is None:
+                self.agents.pop(agent_id, None)
+                self.missing[agent_id] = time.monotonic()
+                return None
+
+            cached = self.agents.get(agent_id)
+            if cached is None or cached.config.version != version:
+                cached = CachedAgent(compile_agent(agent_id, raw, version), time.monotonic())
+                logger.info(f"Loaded agent {agent_id} version {version}")
+                for listener in self.load_listeners:
+                    listener(cached.config)
+            else:
+                cached = cached._replace(loaded_at=time.monotonic())
+
+            self.agents[agent_id] = cached
+            self.missing.pop(agent_id, None)
+            self.invalid.pop(agent_id, None)
+            return cached
+        except Exception as e:
+            if version is not None:
+                self.invalid[agent_id] = version
+            AGENT_CONFIG_ERRORS.inc()
+            logger.error(f"AGENT CONFIG ERROR: {agent_id}: {e}")
+            return self.agents.get(agent_id)
+
+    def reload_in_background(self, agent_id: str):
+        if agent_id in self.reloading:
+            return
+
+        async def reload():
+            try:
+                await self.load(agent_id)
+            finally:
+                self.reloading.discard(agent_id)
+
+        self.reloading.add(agent_id)
+        task = asyncio.create_task(reload())
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    async def refresh(self):
+        """Recompiles every agent whose stored version changed and forgets deleted ones."""
+        try:
+            versions = await asyncio.to_thread(self.store.list_versions)
+        except Exception as e:
+            logger.error(f"AGENT STORE ERROR: {e}")
+            return
+
+        for agent_id in list(self.agents):
+            if agent_id not in versions:
+                logger.info(f"Agent {agent_id} removed")
+                del self.agents[agent_id]
+
+        now = time.monotonic()
+        self.missing = {agent_id: missing_at for agent_id, missing_at in self.missing.items() if now - missing_at < self.ttl_s}
+        for agent_id, version in versions.items():
+            cached = self.agents.get(agent_id)
+            is_current = cached is not None and cached.config.version == version
+            if not is_current and self.invalid.get(agent_id) != version:
+                await self.load(agent_id)
+            elif cached is not None:
+                # Unchanged, or changed to a version already rejected: keep serving what we have.
+                self.agents[agent_id] = cached._replace(loaded_at=now)
+
+    async def reload_forever(self):
+        while True:
+            await asyncio.sleep(self.reload_interval_s)
+            await self.refresh()
+
+    async def start(self):
+        """Compile every stored agent, then keep them in sync with the store."""
+        await self.refresh()
+        logger.info(f"Agent registry loaded {len(self.agents)} agents")
+        if self.reload_interval_s > 0 and self.reload_task is None:
+            self.reload_task = asyncio.create_task(self.reload_forever())
+
+    async def close(self):
+        if self.reload_task:
+            self.reload_task.cancel()
+            self.reload_task = None
+        for task in list(self.background_tasks):
+            task.cancel()
+
+
+@lru_cache
+def get_agent_registry():
+    if settings.AGENT_STORE == "sqlite":
+        store = SqliteAgentStore(settings.AGENT_DB_PATH)
+    else:
+        store = FileAgentStore(settings.AGENT_DIR)
+
+    registry = AgentRegistry(store, ttl_s=settings.AGENT_CACHE_TTL_S, reload_interval_s=settings.AGENT_RELOAD_INTERVAL_S)
+    register(CallbackGauge("agents_loaded", "Compiled agent configs held by this worker.", lambda: len(registry.agents)))
+    return registry
@@ -0,0 +1,140 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+class AudioFormat(NamedTuple):
+    name: str           # ElevenLabs output_format name
+    encoding: str       # Deepgram encoding, or the container for compressed audio
+    sample_rate: int
+
+
+AUDIO_FORMATS = {
+    "pcm_16000": AudioFormat("pcm_16000", "linear16", 16000),
+    "pcm_24000": AudioFormat("pcm_24000", "linear16", 24000),
+    "ulaw_8000": AudioFormat("ulaw_8000", "mulaw", 8000),
+    "mp3": AudioFormat("mp3_44100_128", "mp3", 44100),
+}
+# What the browser client's MediaRecorder sends. Deepgram detects the container on its own.
+WEBM = AudioFormat("webm", "webm", 48000)
+INPUT_FORMATS = {**AUDIO_FORMATS, "webm": WEBM}
+
+RAW_ENCODINGS = ("linear16", "mulaw")
+
+ULAW_BIAS = 0x84
+ULAW_CLIP = 32635
+
+
+def get_audio_format(name: str, formats: dict = AUDIO_FORMATS):
+    if name not in formats:
+        raise ValueError(f"Unsupported audio format {name}, expected one of {', '.join(formats)}")
+    return formats[name]
+
+
+def build_ulaw_decode_table():
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + ULAW_BIAS) << exponent) - ULAW_BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+ULAW_DECODE_TABLE = build_ulaw_decode_table()
+
+
+def ulaw_to_pcm(samples: np.ndarray):
+    """G.711 μ-law bytes (uint8) to 16-bit PCM."""
+    return ULAW_DECODE_TABLE[samples]
+
+
+def pcm_to_ulaw(samples: np.ndarray):
+    """16-bit PCM to G.711 μ-law bytes (uint8)."""
+    samples = samples.astype(np.int32)
+    sign = np.where(samples < 0, 0x80, 0)
+    magnitude = np.minimum(np.abs(samples), ULAW_CLIP) + ULAW_BIAS
+
+    # Position of the highest set bit above bit 7 picks the segment.
+    exponent = np.clip(np.frexp(magnitude)[1] - 8, 0, 7)
+    mantissa = (magnitude >> (exponent + 3)) & 0x0F
+    return (~(sign | (exponent << 4) | mantissa) & 0xFF).astype(np.uint8)
+
+
+def lowpass_kernel(cutoff: float, taps: int):
+    """Hamming-windowed sinc with `cutoff` as a fraction of the sample rate."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class Resampler:
+    """
+    Streaming sample-rate converter for 16-bit mono PCM.
+
+    Downsampling runs a windowed-sinc low-pass filter first so telephony legs don't alias, then
+    every output sample is linearly interpolated from the filtered input in one vectorized pass.
+    Filter history and the fractional read position carry over between chunks, so chunk
+    boundaries don't click.
+    """
+
+    def __init__(self, source_rate: int, target_rate: int, taps: int = 31):
+        self.step = source_rate / target_rate
+        self.kernel = lowpass_kernel(0.45 * target_rate / source_rate, taps) if target_rate < source_rate else None
+        self.history = np.zeros(taps - 1 if self.kernel is not None else 0, dtype=np.float32)
+
+        self.pending = np.empty(0, dtype=np.float32)    # Filtered input not yet interpolated past
+        self.position: float = 0.0                      # Next output position, relative to pending[0]
+
+    def process(self, samples: np.ndarray):
+        samples = samples.astype(np.float32)
+        if self.kernel is not None:
+            padded = np.concatenate((self.history, samples))
+            self.history = padded[len(padded) - len(self.history):]
+            samples = np.convolve(padded, self.kernel, mode="valid")
+
+        pending = np.concatenate((self.pending, samples))
+        if len(pending) < 2 or self.position > len(pending) - 1:
+            self.pending = pending
+            return np.empty(0, dtype=np.int16)
+
+        count = int((len(pending) - 1 - self.position) // self.step) + 1
+        positions = self.position + np.arange(count) * self.step
+        index = positions.astype(np.int64)
+        fraction = (positions - index).astype(np.float32)
+        following = np.minimum(index + 1, len(pending) - 1)
+        output = pending[index] * (1 - fraction) + pending[following] * fraction
+
+        next_position = self.position + count * self.step
+        consumed = int(next_position)
+        self.pending = pending[consumed:]
+        self.position = next_position - consumed
+
+        return np.clip(np.rint(output), -32768, 32767).astype(np.int16)
+
+
+class AudioConverter:
+    """Converts a stream of raw audio (linear16 or μ-law) from one format and rate to another."""
+
+    def __init__(self, source: AudioFormat, target: AudioFormat):
+        if source.encoding not in RAW_ENCODINGS or target.encoding not in RAW_ENCODINGS:
+            raise ValueError(f"Can't convert {source.name} to {target.name}, only raw PCM and μ-law are supported")
+
+        self.source = source
+        self.target = target
+        self.resampler = Resampler(source.sample_rate, target.sample_rate) if source.sample_rate != target.sample_rate else None
+
+    def convert(self, audio: bytes):
+        if self.source.encoding == "mulaw":
+            samples = ulaw_to_pcm(np.frombuffer(audio, dtype=np.uint8))
+        else:
+            samples = np.frombuffer(audio, dtype="<i2")
+
+        if self.resampler:
+            samples = self.resampler.process(samples)
+
+        if self.target.encoding == "mulaw":
+            return pcm_to_ulaw(samples).tobytes()
+        return samples.astype("<i2").tobytes()
+
+
+def can_convert(source: AudioFormat, target: AudioFormat):
+    return source.encoding in RAW_ENCODINGS and target.encoding in RAW_ENCODINGS
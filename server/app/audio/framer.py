@@ -0,0 +1,90 @@
+from app.lib.metrics import CounterVec, register
+
+
+# Bytes per sample for raw encodings that can be cut into fixed-duration frames. Containerized or
+# compressed input (webm, opus, mp3) has no fixed frame size and is forwarded as received.
+BYTES_PER_SAMPLE = {
+    "linear16": 2,
+    "mulaw": 1,
+    "alaw": 1,
+}
+
+MIN_FRAME_MS = 20
+MAX_FRAME_MS = 100
+
+AUDIO_FRAMES_IN = register(CounterVec(
+    "audio_frames_in_total",
+    "Inbound audio messages received from callers.",
+))
+AUDIO_FRAMES_OUT = register(CounterVec(
+    "audio_frames_out_total",
+    "Fixed-duration audio frames forwarded to the transcriber.",
+))
+
+
+def get_frame_bytes(encoding: str, sample_rate: int, frame_ms: int):
+    """Size of one frame in bytes, or None when the encoding can't be framed."""
+    bytes_per_sample = BYTES_PER_SAMPLE.get(encoding)
+    if bytes_per_sample is None:
+        return None
+
+    if not MIN_FRAME_MS <= frame_ms <= MAX_FRAME_MS:
+        raise ValueError(f"Audio frame must be {MIN_FRAME_MS}-{MAX_FRAME_MS} ms, got {frame_ms}")
+
+    return sample_rate * frame_ms // 1000 * bytes_per_sample
+
+
+class AudioFramer:
+    """
+    Coalesces inbound audio of any message size into fixed-size frames.
+
+    Audio is copied once into a preallocated ring of `slots` frames and each complete frame is
+    returned as a memoryview of its slot, so nothing else is allocated per message. A slot is
+    overwritten `slots` frames later, so the consumer must be done with a view by then. With the
+    transcriber that holds as long as `slots` exceeds the audio queue bound plus the frame being
+    sent, and websocket sends copy the payload into the transport before they first yield.
+    """
+
+    def __init__(self, frame_bytes: int, slots: int):
+        self.frame_bytes = frame_bytes
+        self.slots = slots
+        self.ring = bytearray(frame_bytes * slots)
+        self.view = memoryview(self.ring)
+
+        self.slot: int = 0          # Slot being filled
+        self.filled: int = 0        # Bytes written into the current slot
+
+    def push(self, data: bytes):
+        """Add inbound audio, returns the frames it completed."""
+        AUDIO_FRAMES_IN.inc()
+
+        frames = []
+        data = memoryview(data)
+        position = 0
+        while position < len(data):
+            start = self.slot * self.frame_bytes + self.filled
+            count = min(self.frame_bytes - self.filled, len(data) - position)
+            self.view[start:start + count] = data[position:position + count]
+            position += count
+            self.filled += count
+
+            if self.filled == self.frame_bytes:
+                frames.append(self.view[start + count - self.frame_bytes:start + count])
+                self.slot = (self.slot + 1) % self.slots
+                self.filled = 0
+
+        AUDIO_FRAMES_OUT.inc(len(frames))
+        return frames
+
+    def flush(self):
+        """The partial frame left at the end of the stream, if any."""
+        if not self.filled:
+            return None
+
+        start = self.slot * self.frame_bytes
+        frame = self.view[start:start + self.filled]
+        self.slot = (self.slot + 1) % self.slots
+        self.filled = 0
+
+        AUDIO_FRAMES_OUT.inc()
+        return frame
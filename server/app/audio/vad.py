@@ -0,0 +1,87 @@
+import numpy as np
+
+from app.lib.metrics import CounterVec, register
+
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+VAD_EVENTS = register(CounterVec(
+    "vad_events_total",
+    "Speech start and end events from the local voice activity detector.",
+    ("event",),
+))
+
+
+class VoiceActivityDetector:
+    """
+    Energy and zero-crossing voice activity detection over 16-bit PCM.
+
+    Audio is cut into `window_ms` windows whose features are computed in one vectorized pass per
+    frame. A window is speech when it is louder than `energy_threshold_db` (dBFS) and crosses zero
+    less often than `max_zero_crossing_rate`, which rejects hiss. Speech starts after `start_ms` of
+    consecutive speech windows and ends after `hangover_ms` without any, so short pauses and
+    unvoiced consonants don't split an utterance.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        energy_threshold_db: float = -45.0,
+        max_zero_crossing_rate: float = 0.3,
+        start_ms: int = 60,
+        hangover_ms: int = 300,
+        window_ms: int = 10,
+    ):
+        self.window = sample_rate * window_ms // 1000
+        self.energy_threshold_db = energy_threshold_db
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.start_windows = max(start_ms // window_ms, 1)
+        self.hangover_windows = hangover_ms // window_ms
+
+        self.is_speech: bool = False
+        self.speech_run: int = 0
+        self.silence_run: int = 0
+        # Samples left over from the last frame that didn't fill a window.
+        self.remainder = np.empty(0, dtype=np.int16)
+
+    def classify(self, samples: np.ndarray):
+        """Speech flag for each whole window in `samples`."""
+        windows = samples.reshape(-1, self.window).astype(np.float32)
+
+        rms = np.sqrt(np.mean(np.square(windows), axis=1))
+        energy_db = 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+        zero_crossing_rate = np.count_nonzero(np.diff(np.signbit(windows), axis=1), axis=1) / (self.window - 1)
+
+        return (energy_db > self.energy_threshold_db) & (zero_crossing_rate < self.max_zero_crossing_rate)
+
+    def process(self, frame):
+        """Feed a frame of audio, returns the events it triggered in order."""
+        samples = np.frombuffer(frame, dtype="<i2")
+        if self.remainder.size:
+            samples = np.concatenate((self.remainder, samples))
+
+        whole = samples.size - samples.size % self.window
+        self.remainder = samples[whole:].copy()
+        if not whole:
+            return []
+
+        events = []
+        for is_speech in self.classify(samples[:whole]):
+            if is_speech:
+                self.speech_run += 1
+                self.silence_run = 0
+            else:
+                self.silence_run += 1
+                self.speech_run = 0
+
+            if not self.is_speech and self.speech_run >= self.start_windows:
+                self.is_speech = True
+                events.append(SPEECH_START)
+            elif self.is_speech and self.silence_run > self.hangover_windows:
+                self.is_speech = False
+                events.append(SPEECH_END)
+
+        for event in events:
+            VAD_EVENTS.inc(1, event)
+        return events
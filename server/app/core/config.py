@@ -8,6 +8,165 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     ELEVENLABS_API_KEY: str
     DEEPGRAM_API_KEY: str
+    
+    # Logs are formatted and written off the event loop by a listener thread. LOG_FORMAT is "text" or
+    # "json"; records past LOG_QUEUE_MAXSIZE are dropped and counted. Per-frame logs are summarized
+    # once every LOG_SAMPLE_INTERVAL_S.
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "text"
+    LOG_QUEUE_MAXSIZE: int = 10000
+    LOG_SAMPLE_INTERVAL_S: float = 5.0
+    
+    # Admission control. A full or draining worker redirects new calls to a peer with room that
+    # advertises a URL in the shared session backend ("memory" for one worker, "file" for a shared
+    # directory), or rejects them. POST /sessions/drain needs "Authorization: Bearer <ADMIN_TOKEN>"
+    # and is refused while ADMIN_TOKEN is empty.
+    MAX_CONCURRENT_CALLS: int = 100
+    SESSION_BACKEND: str = "memory"
+    SESSION_DIR: str = ".cache/sessions"
+    SESSION_ADVERTISE_URL: str = ""
+    SESSION_HEARTBEAT_S: float = 2.0
+    SESSION_STALE_S: float = 10.0
+    ADMIN_TOKEN: str = ""
+    
+    # Agent configs, read from one JSON file per agent in AGENT_DIR or from the SQLite table at
+    # AGENT_DB_PATH ("file" or "sqlite"). Workers compile every agent at startup and rescan the store
+    # every AGENT_RELOAD_INTERVAL_S; entries older than AGENT_CACHE_TTL_S are reloaded in the background.
+    AGENT_STORE: str = "file"
+    AGENT_DIR: str = "agents"
+    AGENT_DB_PATH: str = ".cache/agents.db"
+    AGENT_CACHE_TTL_S: float = 300.0
+    AGENT_RELOAD_INTERVAL_S: float = 5.0
+    
+    # Call deadlines, kept on one timer wheel per worker that ticks every TIMER_TICK_MS. Besides the
+    # agent's maximum duration, a call ends after CALL_CALLER_SILENCE_TIMEOUT_S with no caller speech
+    # once the agent's audio has played, after CALL_AGENT_STALL_TIMEOUT_S with no audio back for a
+    # caller turn, or after CALL_PROVIDER_IDLE_TIMEOUT_S without a message from the transcriber. 0 is off.
+    CALL_CALLER_SILENCE_TIMEOUT_S: float = 60.0
+    CALL_AGENT_STALL_TIMEOUT_S: float = 20.0
+    CALL_PROVIDER_IDLE_TIMEOUT_S: float = 30.0
+    TIMER_TICK_MS: int = 100
+    TIMER_WHEEL_SLOTS: int = 512
+    
+    # Provider endpoints, overridable to point at the local fakes in scripts/loadtest.
+    DEEPGRAM_WS_URL: str = "wss://api.deepgram.com/v1/listen"
+    ELEVENLABS_WS_BASE_URL: str = "wss://api.elevenlabs.io"
+    
+    # Pre-opened provider websockets kept per (provider, params) key.
+    WS_POOL_SIZE: int = 2
+    WS_POOL_KEEPALIVE_INTERVAL_S: float = 5.0
+    WS_POOL_MAX_IDLE_S: float = 120.0
+    
+    # Shared LLM HTTP clients, created once per worker.
+    LLM_CLIENT_SHARDS: int = 1
+    LLM_HTTP2: bool = True
+    LLM_MAX_CONNECTIONS: int = 200
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 50
+    LLM_KEEPALIVE_EXPIRY_S: float = 120.0
+    LLM_TIMEOUT_S: float = 60.0
+    LLM_CONNECT_TIMEOUT_S: float = 5.0
+    
+    # Optional second OpenAI-compatible endpoint. A completion fails over to it when the primary errors
+    # before its first token, and with hedging on it is also sent there when the primary's first token
+    # takes longer than its recent LLM_HEDGE_PERCENTILE (clamped to the min and max delay); the first
+    # to answer is streamed. LLM_ENDPOINT_FAILURE_THRESHOLD consecutive errors or lost hedges take an
+    # endpoint out of rotation for LLM_ENDPOINT_EJECT_S. An empty model uses the agent's.
+    LLM_FALLBACK_BASE_URL: str = ""
+    LLM_FALLBACK_API_KEY: str = ""
+    LLM_FALLBACK_MODEL: str = ""
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 95
+    LLM_HEDGE_MIN_DELAY_MS: float = 300
+    LLM_HEDGE_MAX_DELAY_MS: float = 2000
+    LLM_HEDGE_DEFAULT_DELAY_MS: float = 800
+    LLM_ENDPOINT_FAILURE_THRESHOLD: int = 3
+    LLM_ENDPOINT_EJECT_S: float = 30.0
+    
+    # Conversation history sent to the LLM. Older turns are folded into a running summary.
+    LLM_CONTEXT_TOKEN_BUDGET: int = 2000
+    LLM_MIN_RECENT_MESSAGES: int = 6
+    
+    # Per-call pipeline queue bounds. Inbound audio drops the oldest frames, LLM text blocks the
+    # LLM stream, synthesized audio coalesces into the newest chunk up to PLAYBACK_MIN_DEPTH_MS of
+    # audio and blocks past that.
+    AUDIO_QUEUE_MAXSIZE: int = 100
+    TRANSCRIBER_QUEUE_MAXSIZE: int = 16
+    LLM_QUEUE_MAXSIZE: int = 32
+    SYNTHESIZER_QUEUE_MAXSIZE: int = 64
+    
+    # Default call audio formats when the client doesn't ask for one: webm from the browser client's
+    # MediaRecorder, or pcm_16000, pcm_24000, ulaw_8000 and mp3. Raw caller audio is coalesced into
+    # AUDIO_FRAME_MS frames before it reaches the transcriber, webm passes through as received.
+    AUDIO_INPUT_FORMAT: str = "webm"
+    AUDIO_OUTPUT_FORMAT: str = "mp3"
+    AUDIO_FRAME_MS: int = 40
+    # When set, ElevenLabs always synthesizes this raw format and audio is converted locally for
+    # calls that want another raw format, so every call shares one warm socket pool and phrase cache.
+    TTS_PROVIDER_FORMAT: str = ""
+    
+    # Local voice activity detection on linear16 input. When the caller goes quiet for the hangover
+    # window the transcriber is asked to finalize, so the turn starts before the provider's endpointing.
+    VAD_ENABLED: bool = True
+    VAD_ENERGY_THRESHOLD_DB: float = -45.0
+    VAD_MAX_ZERO_CROSSING_RATE: float = 0.3
+    VAD_START_MS: int = 60
+    VAD_HANGOVER_MS: int = 300
+    
+    # Speculative LLM generation on stable interim transcripts. Tokens are held back until the final
+    # transcript confirms the hypothesis, a call stops speculating once misses have wasted the cap.
+    LLM_SPECULATION_ENABLED: bool = False
+    LLM_SPECULATION_MAX_WASTED_TOKENS: int = 600
+    
+    # Response cache for caller turns on an agent's cached_phrases allowlist. A hit replays the stored
+    # response without calling the model. Entries expire after LLM_RESPONSE_CACHE_TTL_S and the least
+    # recently used go past LLM_RESPONSE_CACHE_MAX_ENTRIES. With LLM_RESPONSE_CACHE_CONTEXT_MESSAGES
+    # above 0 that many preceding messages are part of the key, for phrases whose answer depends on them.
+    LLM_RESPONSE_CACHE_ENABLED: bool = False
+    LLM_RESPONSE_CACHE_TTL_S: float = 3600
+    LLM_RESPONSE_CACHE_MAX_ENTRIES: int = 10000
+    LLM_RESPONSE_CACHE_CONTEXT_MESSAGES: int = 0
+    
+    # Client playback buffer pacing. The target depth bounds how much audio is still buffered on the
+    # client when the caller interrupts, adaptive mode moves it between min and max using client acks.
+    PLAYBACK_TARGET_DEPTH_MS: float = 600
+    PLAYBACK_ADAPTIVE: bool = True
+    PLAYBACK_MIN_DEPTH_MS: float = 300
+    PLAYBACK_MAX_DEPTH_MS: float = 2000
+    
+    # Token streaming into TTS. When on, LLM tokens are forwarded to ElevenLabs word by word and only
+    # flushed at the end of a response; ElevenLabs starts generating each time the buffered text passes
+    # the next chunk length in the schedule (50-500 characters). Flushing the first clause as well
+    # starts audio as early as sentence mode. Off flushes every sentence. The phrase cache only
+    # applies to whole sentences, so it is bypassed while streaming.
+    TTS_STREAM_TOKENS: bool = False
+    TTS_STREAM_FLUSH_FIRST_CLAUSE: bool = True
+    TTS_CHUNK_LENGTH_SCHEDULE: list[int] = [120, 160, 250, 290]
+    
+    # Call recordings of both audio legs and the transcripts, one append-only file per call in
+    # RECORDING_DIR. Records are batched in memory and appended by a background thread once a batch
+    # reaches RECORDING_BATCH_BYTES or every RECORDING_FLUSH_INTERVAL_S. Past RECORDING_MAX_PENDING_BYTES
+    # waiting on the disk, audio is left out of recordings instead of buffering without limit.
+    RECORDING_ENABLED: bool = False
+    RECORDING_DIR: str = "recordings"
+    RECORDING_BATCH_BYTES: int = 262144
+    RECORDING_FLUSH_INTERVAL_S: float = 1.0
+    RECORDING_MAX_PENDING_BYTES: int = 67108864
+    
+    # Filler clips ("Mm-hm.", "Let me see.") played when a caller turn gets no audio back within
+    # FILLER_DELAY_MS. Clips are synthesized per voice and output format when agents load and kept in
+    # memory for up to FILLER_MAX_VOICES voices.
+    FILLER_ENABLED: bool = False
+    FILLER_DELAY_MS: int = 1000
+    FILLER_MAX_VOICES: int = 64
+    
+    # Synthesized audio cache for short repeated phrases, shared by workers through TTS_CACHE_DIR. Every
+    # sentence up to TTS_CACHE_MAX_PHRASE_CHARS is stored the first time it is spoken, so only turn it
+    # on for agents whose responses repeat.
+    TTS_CACHE_ENABLED: bool = False
+    TTS_CACHE_DIR: str = ".cache/tts"
+    TTS_CACHE_MEMORY_BYTES: int = 64 * 1024 * 1024
+    TTS_CACHE_DISK_BYTES: int = 1024 * 1024 * 1024
+    TTS_CACHE_MAX_PHRASE_CHARS: int = 80
 
     class Config:
         env_file = ".env"
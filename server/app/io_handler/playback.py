@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from bisect import bisect_right
+
+
+class PlaybackBuffer:
+    """
+    Server-side estimate of how much audio the client has buffered but not yet played, used to pace
+    sends so the client never holds more than `target_depth_ms`. Whatever is buffered is what the
+    caller still hears after an interruption, so the target bounds latency-to-silence on barge-in.
+
+    In adaptive mode the client acknowledges played audio. Each ack re-anchors the estimate, an
+    underrun (the client ran dry while audio was still in flight) raises the target, and a run of
+    clean acks lowers it again towards `min_depth_ms`.
+    """
+
+    INCREASE_STEP_MS = 100
+    DECREASE_STEP_MS = 20
+    CLEAN_ACKS_BEFORE_DECREASE = 20
+
+    def __init__(self, target_depth_ms: float, adaptive: bool = False, min_depth_ms: float = None, max_depth_ms: float = None):
+        self.target_depth_ms = target_depth_ms
+        self.adaptive = adaptive
+        self.min_depth_ms = min_depth_ms if min_depth_ms is not None else target_depth_ms
+        self.max_depth_ms = max_depth_ms if max_depth_ms is not None else target_depth_ms
+
+        self.playback_ends_at: float = 0.0     # Monotonic time the client finishes everything sent
+        self.sent_ms: float = 0.0               # Audio sent since the last clear
+        self.clean_acks: int = 0
+        self.underruns: int = 0
+
+        self.cleared = asyncio.Event()
+
+    def buffered_ms(self):
+        return max(self.playback_ends_at - time.monotonic(), 0.0) * 1000
+
+    def played_ms(self):
+        """Position of the client's playback in the audio sent since the last clear."""
+        return max(self.sent_ms - self.buffered_ms(), 0.0)
+
+    def is_playing(self):
+        return time.monotonic() < self.playback_ends_at
+
+    async def wait_for_room(self, duration_ms: float):
+        """
+        Sleep until sending `duration_ms` more audio keeps the client at or under the target depth.
+        A chunk longer than the target waits for the buffer to drain instead. Returns early on clear.
+        """
+        buffered_ms = self.buffered_ms()
+        wait_ms = min(buffered_ms + duration_ms - self.target_depth_ms, buffered_ms)
+        if wait_ms <= 0:
+            return
+
+        self.cleared.clear()
+        try:
+            await asyncio.wait_for(self.cleared.wait(), wait_ms / 1000)
+        except asyncio.TimeoutError:
+            pass
+
+    def on_sent(self, duration_ms: float):
+        self.playback_ends_at = max(self.playback_ends_at, time.monotonic()) + duration_ms / 1000
+        self.sent_ms += duration_ms
+
+    def on_ack(self, played_ms: float, starved: bool = False):
+        """`played_ms` is the audio the client finished since the last clear, `starved` that it ran dry."""
+        in_flight_ms = max(self.sent_ms - played_ms, 0.0)
+        self.playback_ends_at = time.monotonic() + in_flight_ms / 1000
+
+        if not self.adaptive:
+            return
+
+        if starved and in_flight_ms > 0:
+            self.underruns += 1
+            self.clean_acks = 0
+            self.target_depth_ms = min(self.target_depth_ms + PlaybackBuffer.INCREASE_STEP_MS, self.max_depth_ms)
+            return
+
+        self.clean_acks += 1
+        if self.clean_acks >= PlaybackBuffer.CLEAN_ACKS_BEFORE_DECREASE:
+            self.clean_acks = 0
+            self.target_depth_ms = max(self.target_depth_ms - PlaybackBuffer.DECREASE_STEP_MS, self.min_depth_ms)
+
+    def clear(self):
+        self.playback_ends_at = 0.0
+        self.sent_ms = 0.0
+        self.cleared.set()
+
+
+class PlaybackTracker:
+    """
+    Which characters of the response being played the caller has heard. Every sent chunk's
+    characters are laid out on the playback timeline (PlaybackBuffer.sent_ms at the time the chunk was
+    sent) from the chunk's ElevenLabs alignment, so a playback position maps to the character being
+    spoken with one bisect. Chunks without alignment, like phrase cache hits, are spread evenly.
+    """
+
+    def __init__(self):
+        self.response_id: int = None
+        self.char_starts: list = []     # Playback position of each character, non-decreasing
+        self.chars: list = []
+        # Content of the assistant message this response continues, if the last message already was one.
+        self.prefix: str = ""
+
+    def start_response(self, response_id: int, prefix: str = ""):
+        self.response_id = response_id
+        self.char_starts = []
+        self.chars = []
+        self.prefix = prefix
+
+    def on_sent(self, position_ms: float, text: str, duration_ms: float, char_start_times_ms: list = None):
+        if not char_start_times_ms or len(char_start_times_ms) != len(text):
+            step_ms = duration_ms / max(len(text), 1)
+            char_start_times_ms = [i * step_ms for i in range(len(text))]
+
+        # Alignment can overlap by a millisecond or so between chunks, keep the timeline sorted for bisect.
+        floor_ms = self.char_starts[-1] if self.char_starts else 0.0
+        for start_ms in char_start_times_ms:
+            floor_ms = max(floor_ms, position_ms + start_ms)
+            self.char_starts.append(floor_ms)
+        self.chars.extend(text)
+
+    def heard_text(self, played_ms: float):
+        """Text of the response up to and including the character playing at `played_ms`."""
+        return "".join(self.chars[:bisect_right(self.char_starts, played_ms)])
+
+    def sent_text(self):
+        return "".join(self.chars)
+
+    def reset(self):
+        self.start_response(None)
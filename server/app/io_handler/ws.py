@@ -1,10 +1,23 @@
 import asyncio
 import logging
+import time
+
+import numpy as np
 
 from fastapi import WebSocket
-from app.lib.utils import add_message
+from app.audio.convert import INPUT_FORMATS, AudioFormat, get_audio_format, ulaw_to_pcm
+from app.audio.framer import AudioFramer, get_frame_bytes
+from app.audio.vad import SPEECH_START, VoiceActivityDetector
+from app.core.config import get_settings
+from app.io_handler.playback import PlaybackBuffer, PlaybackTracker
+from app.lib import codec, metrics
+from app.lib.timers import CallTimeouts
+from app.llm.memory import ConversationMemory
+from app.recording.recorder import CallRecorder
+from app.tts.fillers import FILLER_MASKED_MS, FILLERS, FillerClip
 
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
@@ -13,13 +26,52 @@ class WebsocketIOHandler:
         self.input_queue: asyncio.Queue = input_queue
         self.output_queue: asyncio.Queue = output_queue
         self.websocket: WebSocket = kwargs["websocket"]
-        self.messages: list = kwargs["messages"]
+        self.memory: ConversationMemory = kwargs["memory"]
         self.call_status: dict = kwargs["call_status"]
+        self.turn_latency: metrics.TurnLatencyRecorder = kwargs["turn_latency"]
+        self.timeouts: CallTimeouts = kwargs["timeouts"]
+        self.recorder: CallRecorder = kwargs.get("recorder", None)
+        
+        # Raw PCM from the caller is coalesced into fixed frames, containerized audio passes through.
+        self.input_format: AudioFormat = kwargs.get("input_format", get_audio_format(settings.AUDIO_INPUT_FORMAT, INPUT_FORMATS))
+        frame_bytes = get_frame_bytes(self.input_format.encoding, self.input_format.sample_rate, settings.AUDIO_FRAME_MS)
+        self.framer = AudioFramer(frame_bytes, slots=settings.AUDIO_QUEUE_MAXSIZE + 2) if frame_bytes else None
+        
+        # Local VAD needs raw audio, with containerized input end-of-turn is left to the transcriber.
+        self.vad = None
+        if settings.VAD_ENABLED and self.framer:
+            self.vad = VoiceActivityDetector(
+                self.input_format.sample_rate,
+                energy_threshold_db=settings.VAD_ENERGY_THRESHOLD_DB,
+                max_zero_crossing_rate=settings.VAD_MAX_ZERO_CROSSING_RATE,
+                start_ms=settings.VAD_START_MS,
+                hangover_ms=settings.VAD_HANGOVER_MS,
+            )
+        self.on_speech_start = kwargs.get("on_speech_start", None)
+        self.on_speech_end = kwargs.get("on_speech_end", None)
         
         self.sender_task = None
         self.receiver_task = None
         
+        # Filler played when a caller turn gets no audio within the delay.
+        self.filler_delay_s: float = kwargs.get("filler_delay_ms", settings.FILLER_DELAY_MS) / 1000
+        self.filler_task = None
+        self.filler_count: int = 0
+        self.filler_response_id: int = None
+        self.filler_sent_at: float = 0.0
+        # Response whose audio was sent last, fillers never play once real audio has started.
+        self.sent_response_id: int = None
+        
         self.is_call_ended = False
+        
+        self.playback = PlaybackBuffer(
+            target_depth_ms=kwargs.get("playback_target_depth_ms", settings.PLAYBACK_TARGET_DEPTH_MS),
+            adaptive=kwargs.get("playback_adaptive", settings.PLAYBACK_ADAPTIVE),
+            min_depth_ms=settings.PLAYBACK_MIN_DEPTH_MS,
+            max_depth_ms=settings.PLAYBACK_MAX_DEPTH_MS,
+        )
+        # What the caller heard of the response playing, so an interruption leaves only that in the history.
+        self.tracker = PlaybackTracker()
 
     async def sender(self):
         try:
@@ -27,11 +79,41 @@ class WebsocketIOHandler:
                 if self.is_call_ended:
                     break
                 
-                data = await self.websocket.receive_bytes()
-                await self.input_queue.put(data)
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                
+                if message.get("bytes") is not None:
+                    await self.forward_audio(message["bytes"])
+                elif message.get("text") is not None:
+                    self.handle_control_message(codec.loads(message["text"]))
         except Exception as e:
             logger.error(f"WS RECEIVER ERROR: {e}")
     
+    async def forward_audio(self, audio: bytes):
+        if self.recorder:
+            self.recorder.record_inbound(audio)
+        
+        if self.framer is None:
+            await self.input_queue.put(audio)
+            return
+        
+        for frame in self.framer.push(audio):
+            await self.input_queue.put(frame)
+            if self.vad:
+                samples = ulaw_to_pcm(np.frombuffer(frame, dtype=np.uint8)) if self.input_format.encoding == "mulaw" else frame
+                for event in self.vad.process(samples):
+                    await self.handle_vad_event(event)
+    
+    async def handle_vad_event(self, event: str):
+        callback = self.on_speech_start if event == SPEECH_START else self.on_speech_end
+        if callback:
+            await callback()
+    
+    def handle_control_message(self, message: dict):
+        if message.get("type") == "ack":
+            self.playback.on_ack(message.get("played_ms", 0), message.get("starved", False))
+    
     async def receiver(self):
         while True:
             try:
@@ -39,11 +121,111 @@ class WebsocketIOHandler:
                     break
                 
                 data = await self.output_queue.get()
+                
+                # Audio synthesized for a response the caller has since interrupted.
+                if data["response_id"] != self.call_status["response_id"]:
+                    continue
+                
+                # Real audio is here, a filler that hasn't started is no longer needed.
+                self.cancel_filler("not_needed")
+                
+                # Keep the client's buffer at the target depth so an interruption has little to cancel.
+                await self.playback.wait_for_room(data["duration_ms"])
+                if data["response_id"] != self.call_status["response_id"]:
+                    continue
+                
                 await self.websocket.send_bytes(data["audio"])
-                add_message(self.messages, {"role": "assistant", "content": data["text"]})
+                self.turn_latency.mark(metrics.FIRST_AUDIO_SENT)
+                if self.sent_response_id != data["response_id"]:
+                    self.sent_response_id = data["response_id"]
+                    if self.filler_response_id == data["response_id"]:
+                        FILLER_MASKED_MS.observe((time.monotonic() - self.filler_sent_at) * 1000)
+                if self.tracker.response_id != data["response_id"]:
+                    self.tracker.start_response(data["response_id"], self.memory.get_last_content("assistant"))
+                self.tracker.on_sent(self.playback.sent_ms, data["text"], data["duration_ms"], data.get("char_start_times_ms"))
+                self.write_turn(self.tracker.sent_text())
+                self.playback.on_sent(data["duration_ms"])
+                self.timeouts.agent_responded(data["duration_ms"])
+                if self.recorder:
+                    self.recorder.record_outbound(data["audio"], data["response_id"])
+                    self.recorder.record_text("assistant", data["text"], data["response_id"])
             except Exception as e:
                 logger.error(f"WS SENDER ERROR: {e}")
             
+    def is_playing(self):
+        return self.playback.is_playing()
+    
+    def schedule_filler(self, clips: tuple, response_id: int):
+        """Play one of `clips` if no audio for `response_id` has been sent within the filler delay."""
+        self.cancel_filler("interrupted")
+        self.filler_task = asyncio.create_task(self.play_filler(clips, response_id))
+    
+    def cancel_filler(self, result: str):
+        if self.filler_task and not self.filler_task.done():
+            self.filler_task.cancel()
+            FILLERS.inc(1, result)
+        self.filler_task = None
+    
+    async def play_filler(self, clips: tuple, response_id: int):
+        await asyncio.sleep(self.filler_delay_s)
+        if response_id != self.call_status["response_id"]:
+            FILLERS.inc(1, "interrupted")
+            return
+        if self.sent_response_id == response_id or self.is_playing():
+            FILLERS.inc(1, "not_needed")
+            return
+        
+        # Rotate through the clips so the caller doesn't hear the same one every time. A clip is short,
+        # so one already playing is left to finish and the response's audio queues up behind it.
+        clip: FillerClip = clips[self.filler_count % len(clips)]
+        self.filler_count += 1
+        FILLERS.inc(1, "played")
+        
+        try:
+            await self.websocket.send_bytes(clip.audio)
+        except Exception as e:
+            logger.error(f"WS FILLER ERROR: {e}")
+            return
+        self.filler_response_id = response_id
+        self.filler_sent_at = time.monotonic()
+        # Not added to the conversation memory, the LLM doesn't need to see its own fillers.
+        self.playback.on_sent(clip.duration_ms)
+        if self.recorder:
+            self.recorder.record_outbound(clip.audio, response_id)
+            self.recorder.record_text("assistant", clip.text, response_id)
+    
+    def truncate_history(self):
+        """Cut the interrupted response in the history back to the characters the caller heard."""
+        if self.tracker.response_id is None:
+            return
+        
+        heard = self.tracker.heard_text(self.playback.played_ms())
+        unheard_chars = len(self.tracker.chars) - len(heard)
+        metrics.BARGE_IN_UNHEARD_CHARS.observe(unheard_chars)
+        if unheard_chars > 0:
+            self.write_turn(heard)
+        self.tracker.reset()
+    
+    def write_turn(self, text: str):
+        """
+        Set the assistant's last message to the response's text so far. Chunk text is kept as the
+        provider aligned it, split words and all, so it is concatenated as is; only the message this
+        response continues, if any, is joined with a space.
+        """
+        content = " ".join(part for part in (self.tracker.prefix, text.strip()) if part)
+        self.memory.replace_last_message({"role": "assistant", "content": content})
+    
+    async def clear_buffer(self):
+        """Tell the client to drop any audio it has buffered but not played yet."""
+        self.cancel_filler("interrupted")
+        self.truncate_history()
+        self.playback.clear()
+        
+        try:
+            await self.websocket.send_text(codec.dumps({"type": "clear"}))
+        except Exception as e:
+            logger.error(f"WS CLEAR ERROR: {e}")
+            
     async def run(self):
         try:
             self.sender_task = asyncio.create_task(self.sender())
@@ -57,6 +239,8 @@ class WebsocketIOHandler:
         self.is_call_ended = True
         
         try:
+            if self.filler_task:
+                self.filler_task.cancel()
             if self.sender_task:
                 self.sender_task.cancel()
             if self.receiver_task:
@@ -0,0 +1,156 @@
+"""
+Wire codecs for provider messages.
+
+Uses msgspec when installed: provider messages are decoded straight into typed structs, fields we
+don't declare (ElevenLabs' normalizedAlignment, Deepgram's metadata and word timings) are skipped
+without being built, and base64 audio is decoded to bytes in the same pass. Falls back to orjson,
+then to the stdlib json module, with the same results.
+"""
+import binascii
+import json
+
+from typing import NamedTuple
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+
+    loads = orjson.loads
+else:
+    dumps = json.dumps
+    loads = json.loads
+
+BACKEND = "msgspec" if msgspec is not None else "orjson" if orjson is not None else "json"
+
+
+def get_loads(backend: str):
+    return orjson.loads if backend in ("msgspec", "orjson") and orjson is not None else json.loads
+
+
+class XiMessage(NamedTuple):
+    audio: bytes                # Decoded audio, empty when the message carries none
+    is_final: bool
+    chars: list
+    char_durations_ms: list
+    char_start_times_ms: list   # Only filled when the decoder was asked for start times
+
+
+class TranscriptMessage(NamedTuple):
+    type: str
+    transcript: str
+    is_final: bool
+    speech_final: bool
+    from_finalize: bool
+
+
+if msgspec is not None:
+    class XiAlignment(msgspec.Struct):
+        chars: list = []
+        charDurationsMs: list = []
+
+    class XiAlignmentWithStartTimes(msgspec.Struct):
+        chars: list = []
+        charDurationsMs: list = []
+        charStartTimesMs: list = []
+
+    class XiWireMessage(msgspec.Struct):
+        audio: bytes | None = None
+        isFinal: bool | None = None
+        alignment: XiAlignment | None = None
+
+    class XiWireMessageWithStartTimes(msgspec.Struct):
+        audio: bytes | None = None
+        isFinal: bool | None = None
+        alignment: XiAlignmentWithStartTimes | None = None
+
+    class DeepgramAlternative(msgspec.Struct):
+        transcript: str = ""
+
+    class DeepgramChannel(msgspec.Struct):
+        alternatives: list[DeepgramAlternative] = []
+
+    class DeepgramWireMessage(msgspec.Struct):
+        type: str = ""
+        # An object on Results, a list of channel indexes on SpeechStarted and UtteranceEnd.
+        channel: DeepgramChannel | list | None = None
+        is_final: bool = False
+        speech_final: bool = False
+        from_finalize: bool = False
+
+
+class XiDecoder:
+    """Decodes ElevenLabs stream-input messages. Character start times are skipped unless asked for."""
+
+    def __init__(self, start_times: bool = False, backend: str = BACKEND):
+        self.start_times = start_times
+        self.backend = backend
+        self.loads = get_loads(backend)
+        if backend == "msgspec":
+            self.decoder = msgspec.json.Decoder(XiWireMessageWithStartTimes if start_times else XiWireMessage)
+
+    def decode(self, message) -> XiMessage:
+        if self.backend == "msgspec":
+            data = self.decoder.decode(message)
+            alignment = data.alignment
+            return XiMessage(
+                data.audio or b"",
+                bool(data.isFinal),
+                alignment.chars if alignment else [],
+                alignment.charDurationsMs if alignment else [],
+                alignment.charStartTimesMs if alignment and self.start_times else [],
+            )
+
+        data: dict = self.loads(message)
+        audio = data.get("audio")
+        alignment = data.get("alignment") or {}
+        return XiMessage(
+            binascii.a2b_base64(audio) if audio else b"",
+            bool(data.get("isFinal")),
+            alignment.get("chars", []),
+            alignment.get("charDurationsMs", []),
+            alignment.get("charStartTimesMs", []) if self.start_times else [],
+        )
+
+
+class DeepgramDecoder:
+    """Decodes Deepgram listen messages. Non-transcript messages decode with an empty transcript."""
+
+    def __init__(self, backend: str = BACKEND):
+        self.backend = backend
+        self.loads = get_loads(backend)
+        if backend == "msgspec":
+            self.decoder = msgspec.json.Decoder(DeepgramWireMessage)
+
+    def decode(self, message) -> TranscriptMessage:
+        if self.backend == "msgspec":
+            data = self.decoder.decode(message)
+            alternatives = data.channel.alternatives if isinstance(data.channel, DeepgramChannel) else []
+            return TranscriptMessage(
+                data.type,
+                alternatives[0].transcript if alternatives else "",
+                data.is_final,
+                data.speech_final,
+                data.from_finalize,
+            )
+
+        data: dict = self.loads(message)
+        channel = data.get("channel")
+        alternatives = (channel.get("alternatives") if isinstance(channel, dict) else None) or [{}]
+        return TranscriptMessage(
+            data.get("type", ""),
+            alternatives[0].get("transcript", ""),
+            bool(data.get("is_final")),
+            bool(data.get("speech_final")),
+            bool(data.get("from_finalize")),
+        )
@@ -1,3 +1,12 @@
 DEFAULT_SYSTEM_PROMPT = "You are engaging in a realtime conversation with a human. Ouput short, concise messages to ensure a smooth conversation, preferably less than 50 characters."
 AGENT_SYSTEM_PROMPT = ""
-DEFAULT_MODEL = ""
+DEFAULT_MODEL = "mixtral-8x7b-32768"
+DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"
+DEFAULT_VOICE_MODEL_ID = "eleven_flash_v2_5"
+DEFAULT_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.8
+}
+DEFAULT_MAX_CALL_DURATION_MS = 300000
+DEFAULT_FILLERS = ["Mm-hm.", "Okay.", "Let me see.", "Sure."]
+CONVERSATION_SUMMARY_PROMPT = "You maintain a running summary of a phone conversation between a caller (user) and a voice agent (assistant). Update the summary with the new turns. Keep names, numbers, decisions and open questions. Reply with the updated summary only, in under 120 words."
@@ -0,0 +1,165 @@
+"""
+Logging for the media pipeline.
+
+Records are handed to a bounded queue on the event loop and formatted and written by a listener
+thread, so a slow stdout never stalls audio forwarding. Every record carries the call it belongs to
+(call_id, agent_id, response_id) as structured fields, taken from a context variable that child
+tasks of a call inherit. Per-frame events go through a LogSampler so they cost a counter bump
+rather than a log line.
+"""
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+from app.lib import codec
+from app.lib.metrics import CounterVec, register
+
+
+LOG_RECORDS_DROPPED = register(CounterVec(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+    ("level",),
+))
+
+# Fields every record gets, empty outside a call.
+CONTEXT_FIELDS = ("call_id", "agent_id", "response_id")
+# LogRecord attributes that aren't user supplied `extra` fields.
+RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", *CONTEXT_FIELDS}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(call_id)s %(response_id)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class CallContext:
+    """Identifies the call a task is working for. The response id is read live from call_status."""
+
+    def __init__(self, call_id: str, agent_id: str, call_status: dict = None):
+        self.call_id = call_id
+        self.agent_id = agent_id
+        self.call_status = call_status
+
+    @property
+    def response_id(self):
+        return self.call_status["response_id"] if self.call_status else ""
+
+
+call_context: contextvars.ContextVar = contextvars.ContextVar("call_context", default=None)
+
+
+def bind_call_context(call_id: str, agent_id: str, call_status: dict = None):
+    """Tag every record logged from the current task, and tasks it creates afterwards, with this call."""
+    return call_context.set(CallContext(call_id, agent_id, call_status))
+
+
+class CallContextFilter(logging.Filter):
+    def filter(self, record):
+        context: CallContext = call_context.get()
+        record.call_id = context.call_id if context else "-"
+        record.agent_id = context.agent_id if context else "-"
+        record.response_id = context.response_id if context else "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, call context and any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in CONTEXT_FIELDS:
+            entry[key] = getattr(record, key, "-")
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return codec.dumps(entry)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queues records without formatting them; the listener thread formats. The call context is
+    captured here since it lives in the task that logged. A full queue drops the record and counts it
+    instead of blocking the event loop.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.addFilter(CallContextFilter())
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(1, record.levelname)
+
+
+class LogSampler:
+    """
+    Rate limits a high-frequency log line. `sample()` returns how many events happened since the
+    last line once every `interval_s`, and None in between, so per-frame code can log a summary.
+    """
+
+    def __init__(self, interval_s: float = 5.0):
+        self.interval_s = interval_s
+        self.count: int = 0
+        self.total: float = 0
+        self.last_logged_at: float = time.monotonic()
+
+    def sample(self, amount: float = 0):
+        self.count += 1
+        self.total += amount
+
+        now = time.monotonic()
+        if now - self.last_logged_at < self.interval_s:
+            return None
+
+        sampled = (self.count, self.total, now - self.last_logged_at)
+        self.count = 0
+        self.total = 0
+        self.last_logged_at = now
+        return sampled
+
+
+listener: logging.handlers.QueueListener = None
+
+
+def setup_logging(level: str = "INFO", log_format: str = "text", queue_maxsize: int = 10000, stream=None):
+    """Route the root logger through the logging queue. Returns the listener, stopped at exit."""
+    global listener
+    if listener is not None:
+        listener.stop()
+
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    log_queue = queue.Queue(queue_maxsize)
+    root = logging.getLogger()
+    root.handlers = [DroppingQueueHandler(log_queue)]
+    root.setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+atexit.register(stop_logging)
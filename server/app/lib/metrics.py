@@ -0,0 +1,251 @@
+import bisect
+import time
+
+
+# Bucket upper bounds in milliseconds.
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000, 5000, 10000)
+QUANTILES = (50, 95, 99)
+
+# Every metric rendered by the /metrics endpoint.
+REGISTRY: list = []
+
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def format_labels(labels: dict):
+    if not labels:
+        return ""
+
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def format_number(value: float):
+    # Prometheus accepts floats, integers read better.
+    return str(int(value)) if float(value).is_integer() else f"{value:.3f}"
+
+
+class Histogram:
+    def __init__(self, name: str, description: str = "", buckets: tuple = DEFAULT_BUCKETS_MS, labels: dict = None):
+        self.name = name
+        self.description = description
+        self.buckets: tuple = tuple(buckets)
+        self.labels: dict = labels or {}
+        # One extra slot for values above the last bucket (+Inf).
+        self.counts: list = [0] * (len(self.buckets) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def percentile(self, q: float):
+        """Estimate the q-th percentile (0-100) by interpolating within the matching bucket."""
+        if self.count == 0:
+            return 0.0
+
+        rank = self.count * q / 100
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+
+        return float(self.buckets[-1])
+
+    def render_series(self):
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{format_labels({**self.labels, 'le': bound})} {cumulative}")
+        lines.append(f"{self.name}_sum{format_labels(self.labels)} {format_number(self.sum)}")
+        lines.append(f"{self.name}_count{format_labels(self.labels)} {self.count}")
+        return lines
+
+    def render_quantiles(self):
+        return [
+            f"{self.name}_quantile{format_labels({**self.labels, 'quantile': q / 100})} {format_number(self.percentile(q))}"
+            for q in QUANTILES
+        ]
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+            *self.render_series(),
+            f"# TYPE {self.name}_quantile gauge",
+            *self.render_quantiles(),
+        ]
+
+
+class HistogramVec:
+    def __init__(self, name: str, description: str, label_names: tuple, buckets: tuple = DEFAULT_BUCKETS_MS):
+        self.name = name
+        self.description = description
+        self.label_names: tuple = label_names
+        self.buckets: tuple = buckets
+        self.children: dict = {}
+
+    def labels(self, *label_values):
+        child = self.children.get(label_values)
+        if child is None:
+            child = Histogram(self.name, self.description, self.buckets, dict(zip(self.label_names, label_values)))
+            self.children[label_values] = child
+        return child
+
+    def render(self):
+        children = list(self.children.values())
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram",
+            *[line for child in children for line in child.render_series()],
+            f"# TYPE {self.name}_quantile gauge",
+            *[line for child in children for line in child.render_quantiles()],
+        ]
+
+
+class GaugeVec:
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.label_names: tuple = label_names
+        self.values: dict = {}
+
+    def set(self, value: float, *label_values):
+        self.values[label_values] = value
+
+    def remove(self, *label_values):
+        self.values.pop(label_values, None)
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            *[
+                f"{self.name}{format_labels(dict(zip(self.label_names, label_values)))} {format_number(value)}"
+                for label_values, value in list(self.values.items())
+            ],
+        ]
+
+
+class CounterVec:
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.label_names: tuple = label_names
+        self.values: dict = {}
+
+    def inc(self, amount: float = 1, *label_values):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def get(self, *label_values):
+        return self.values.get(label_values, 0)
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+            *[
+                f"{self.name}{format_labels(dict(zip(self.label_names, label_values)))} {format_number(value)}"
+                for label_values, value in list(self.values.items())
+            ],
+        ]
+
+
+class CallbackGauge:
+    """Gauge whose value is computed at scrape time."""
+
+    def __init__(self, name: str, description: str, callback):
+        self.name = name
+        self.description = description
+        self.callback = callback
+
+    def render(self):
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+            f"{self.name} {format_number(self.callback())}",
+        ]
+
+
+def render_prometheus():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+BARGE_IN_TIME_TO_SILENCE_MS = register(Histogram(
+    "barge_in_time_to_silence_ms",
+    "Time from the caller starting to speak over the agent (by local VAD, else the transcript) to the clear being sent to the client.",
+))
+BARGE_IN_UNHEARD_CHARS = register(Histogram(
+    "barge_in_unheard_chars",
+    "Characters of an interrupted response sent to the caller but not played, removed from the history.",
+    buckets=(0, 10, 25, 50, 100, 200, 400, 800),
+))
+
+
+# Turn stages, in pipeline order. Each is measured from the caller's speech_final.
+SPEECH_FINAL = 0
+LLM_REQUEST = 1
+LLM_FIRST_TOKEN = 2
+FIRST_SENTENCE = 3
+TTS_FIRST_AUDIO = 4
+FIRST_AUDIO_SENT = 5
+TURN_STAGES = ("speech_final", "llm_request", "llm_first_token", "first_sentence", "tts_first_audio", "first_audio_sent")
+
+TURN_STAGE_LATENCY_MS = register(HistogramVec(
+    "turn_stage_latency_ms",
+    "Time from the caller's speech_final to each pipeline stage of the agent's response.",
+    ("stage", "agent_id"),
+))
+TURN_STAGE_LAST_LATENCY_MS = register(GaugeVec(
+    "turn_stage_last_latency_ms",
+    "Latest turn's stage latency for each active call.",
+    ("stage", "agent_id", "call_id"),
+))
+
+
+class TurnLatencyRecorder:
+    """
+    Per-call stage timestamps for the current turn. Everything is allocated up front and only touched
+    from the call's event loop, so mark() is a list lookup, a clock read and a histogram increment.
+    """
+
+    def __init__(self, call_id: str, agent_id: str):
+        self.call_id = call_id
+        self.agent_id = agent_id
+        self.marks: list = [0.0] * len(TURN_STAGES)
+        # speech_final is the reference point, it has no latency of its own.
+        self.histograms: list = [None] + [TURN_STAGE_LATENCY_MS.labels(stage, agent_id) for stage in TURN_STAGES[1:]]
+
+    def start_turn(self):
+        for i in range(len(self.marks)):
+            self.marks[i] = 0.0
+        self.marks[SPEECH_FINAL] = time.perf_counter()
+
+    def mark(self, stage: int):
+        # Only the first occurrence of a stage in a turn counts.
+        if self.marks[stage] or not self.marks[SPEECH_FINAL]:
+            return
+
+        self.marks[stage] = time.perf_counter()
+        latency_ms = (self.marks[stage] - self.marks[SPEECH_FINAL]) * 1000
+        self.histograms[stage].observe(latency_ms)
+        TURN_STAGE_LAST_LATENCY_MS.set(latency_ms, TURN_STAGES[stage], self.agent_id, self.call_id)
+
+    def close(self):
+        for stage in TURN_STAGES[1:]:
+            TURN_STAGE_LAST_LATENCY_MS.remove(stage, self.agent_id, self.call_id)
@@ -0,0 +1,125 @@
+import asyncio
+import weakref
+
+from collections import defaultdict
+
+from app.lib.metrics import CounterVec, format_labels, register
+
+
+# What put() does when the queue is full.
+BLOCK = "block"                 # Wait for room, backpressure to the producer
+DROP_OLDEST = "drop_oldest"     # Never wait, discard the oldest item, for real-time input
+COALESCE = "coalesce"           # Never wait, merge into the newest item when possible, otherwise block
+
+QUEUE_FULL = register(CounterVec(
+    "pipeline_queue_full_total",
+    "Puts that found a pipeline queue at its bound, whatever the policy did about it.",
+    ("stage",),
+))
+QUEUE_DROPPED = register(CounterVec(
+    "pipeline_queue_dropped_total",
+    "Items dropped by drop-oldest pipeline queues when full.",
+    ("stage",),
+))
+QUEUE_COALESCED = register(CounterVec(
+    "pipeline_queue_coalesced_total",
+    "Items merged into an already queued item by coalescing pipeline queues when full.",
+    ("stage",),
+))
+
+LIVE_QUEUES = weakref.WeakSet()
+
+
+def coalesce_audio(last: dict, item: dict, max_duration_ms: float = None):
+    """
+    Merge two synthesized audio chunks of the same response. Returns None when they can't be merged,
+    including when the merged chunk would be longer than `max_duration_ms`, so that one item can't
+    grow without bound or outlast the playback buffer's target depth.
+    """
+    if last["response_id"] != item["response_id"]:
+        return None
+    if max_duration_ms is not None and last["duration_ms"] + item["duration_ms"] > max_duration_ms:
+        return None
+
+    merged = {
+        **last,
+        "audio": last["audio"] + item["audio"],
+        "text": last["text"] + item["text"],
+        "duration_ms": last["duration_ms"] + item["duration_ms"],
+    }
+    # Alignment is relative to each chunk's audio, shift the second chunk's behind the first.
+    if last.get("char_start_times_ms") and item.get("char_start_times_ms"):
+        merged["char_start_times_ms"] = last["char_start_times_ms"] + [start_ms + last["duration_ms"] for start_ms in item["char_start_times_ms"]]
+    else:
+        merged.pop("char_start_times_ms", None)
+    return merged
+
+
+class PipelineQueue(asyncio.Queue):
+    def __init__(self, stage: str, maxsize: int = 0, policy: str = BLOCK, merge=None):
+        super().__init__(maxsize)
+        self.stage = stage
+        self.policy = policy
+        self.merge = merge
+        self.high_water_mark: int = 0
+
+        LIVE_QUEUES.add(self)
+
+    def try_coalesce(self, item):
+        if self.policy != COALESCE or not self._queue:
+            return False
+
+        merged = self.merge(self._queue[-1], item)
+        if merged is None:
+            return False
+
+        # Replace rather than mutate, producers may still hold a reference to the queued item.
+        self._queue[-1] = merged
+        QUEUE_COALESCED.inc(1, self.stage)
+        return True
+
+    def put_nowait(self, item):
+        if self.full():
+            QUEUE_FULL.inc(1, self.stage)
+            if self.policy == DROP_OLDEST:
+                self.get_nowait()
+                QUEUE_DROPPED.inc(1, self.stage)
+            elif self.try_coalesce(item):
+                return
+
+        super().put_nowait(item)
+        if self.qsize() > self.high_water_mark:
+            self.high_water_mark = self.qsize()
+
+    async def put(self, item):
+        if self.full():
+            if self.policy == DROP_OLDEST:
+                return self.put_nowait(item)
+            QUEUE_FULL.inc(1, self.stage)
+            if self.try_coalesce(item):
+                return
+
+        await super().put(item)
+
+
+class QueueDepthMetrics:
+    """Current depth and high-water mark per stage, summed and maxed over live calls at scrape time."""
+
+    def render(self):
+        depth = defaultdict(int)
+        high_water_mark = defaultdict(int)
+        for queue in list(LIVE_QUEUES):
+            depth[queue.stage] += queue.qsize()
+            high_water_mark[queue.stage] = max(high_water_mark[queue.stage], queue.high_water_mark)
+
+        return [
+            "# HELP pipeline_queue_depth Items waiting in pipeline queues across live calls.",
+            "# TYPE pipeline_queue_depth gauge",
+            *[f"pipeline_queue_depth{format_labels({'stage': stage})} {value}" for stage, value in depth.items()],
+            "# HELP pipeline_queue_high_water_mark Deepest any live call's pipeline queue has been.",
+            "# TYPE pipeline_queue_high_water_mark gauge",
+            *[f"pipeline_queue_high_water_mark{format_labels({'stage': stage})} {value}" for stage, value in high_water_mark.items()],
+        ]
+
+
+register(QueueDepthMetrics())
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.lib.metrics import CallbackGauge, CounterVec, register
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Outcomes of SessionRegistry.admit()
+ADMIT = "admit"
+REDIRECT = "redirect"
+REJECT = "reject"
+
+SESSION_ADMISSIONS = register(CounterVec(
+    "session_admissions_total",
+    "New calls by admission outcome: admit, redirect to another worker, or reject.",
+    ("result",),
+))
+
+
+class InMemorySessionBackend:
+    """Worker states held in this process only. Stand-in for a single worker, or for tests."""
+
+    def __init__(self):
+        self.workers: dict = {}
+
+    async def publish(self, worker_id: str, state: dict):
+        self.workers[worker_id] = state
+
+    async def remove(self, worker_id: str):
+        self.workers.pop(worker_id, None)
+
+    async def list_workers(self):
+        return dict(self.workers)
+
+
+class FileSessionBackend:
+    """
+    Worker states shared through a directory, one JSON file per worker, so workers on one host (or
+    on a shared volume) can see each other. Files are replaced atomically and read off the event loop.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_path(self, worker_id: str):
+        return os.path.join(self.directory, f"{worker_id.replace(os.sep, '_')}.json")
+
+    def write(self, worker_id: str, state: dict):
+        path = self.get_path(worker_id)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, path)
+
+    def read_all(self):
+        workers = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    state = json.load(f)
+                workers[state["worker_id"]] = state
+            except (OSError, ValueError, KeyError):
+                continue
+        return workers
+
+    async def publish(self, worker_id: str, state: dict):
+        await asyncio.to_thread(self.write, worker_id, state)
+
+    async def remove(self, worker_id: str):
+        try:
+            await asyncio.to_thread(os.remove, self.get_path(worker_id))
+        except FileNotFoundError:
+            pass
+
+    async def list_workers(self):
+        return await asyncio.to_thread(self.read_all)
+
+
+class SessionRegistry:
+    """
+    Active calls on this worker, with admission control.
+
+    A worker admits calls until it runs `max_calls` or is draining. Past that, a new call is
+    redirected to the least loaded peer with room that advertises a URL, or rejected. Each worker
+    publishes its state to the shared backend every `heartbeat_s`; admission only reads the peer view
+    from the last heartbeat so it never waits on the backend.
+    """
+
+    def __init__(self, worker_id: str, max_calls: int, backend, advertise_url: str = "", heartbeat_s: float = 2.0, stale_s: float = 10.0):
+        self.worker_id = worker_id
+        self.max_calls = max_calls
+        self.backend = backend
+        self.advertise_url = advertise_url
+        self.heartbeat_s = heartbeat_s
+        self.stale_s = stale_s
+
+        self.sessions: dict = {}        # call_id -> {"agent_id", "started_at"}
+        self.is_draining: bool = False
+        self.peers: dict = {}           # worker_id -> last published state of the other workers
+        self.drained = asyncio.Event()
+        self.drained.set()
+
+        self.heartbeat_task = None
+
+    def get_state(self):
+        return {
+            "worker_id": self.worker_id,
+            "url": self.advertise_url,
+            "active_calls": len(self.sessions),
+            "max_calls": self.max_calls,
+            "is_draining": self.is_draining,
+            "updated_at": time.time(),
+        }
+
+    def has_capacity(self):
+        return not self.is_draining and len(self.sessions) < self.max_calls
+
+    def find_peer(self):
+        """URL of the least loaded live peer with room, or None."""
+        now = time.time()
+        candidates = [
+            state for state in self.peers.values()
+            if state.get("url")
+            and not state["is_draining"]
+            and state["active_calls"] < state["max_calls"]
+            and now - state["updated_at"] < self.stale_s
+        ]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda state: state["active_calls"] / max(state["max_calls"], 1))["url"]
+
+    def admit(self, call_id: str, agent_id: str):
+        """Returns (ADMIT, None), (REDIRECT, peer_url) or (REJECT, None). Admitted calls are registered."""
+        if self.has_capacity():
+            self.sessions[call_id] = {"agent_id": agent_id, "started_at": time.time()}
+            self.drained.clear()
+            SESSION_ADMISSIONS.inc(1, ADMIT)
+            return ADMIT, None
+
+        peer_url = self.find_peer()
+        if peer_url:
+            # Count the redirected call against the peer until its next heartbeat shows it.
+            for state in self.peers.values():
+                if state.get("url") == peer_url:
+                    state["active_calls"] += 1
+            SESSION_ADMISSIONS.inc(1, REDIRECT)
+            return REDIRECT, peer_url
+
+        SESSION_ADMISSIONS.inc(1, REJECT)
+        return REJECT, None
+
+    def remove(self, call_id: str):
+        self.sessions.pop(call_id, None)
+        if not self.sessions:
+            self.drained.set()
+
+    def drain(self):
+        """Stop admitting calls. Calls already running carry on until they end."""
+        if not self.is_draining:
+            logger.info(f"Worker {self.worker_id} draining, {len(self.sessions)} calls still active")
+        self.is_draining = True
+
+    async def wait_drained(self, timeout_s: float = None):
+        """True once every call has ended, False if `timeout_s` ran out first."""
+        try:
+            await asyncio.wait_for(self.drained.wait(), timeout_s)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def heartbeat(self):
+        while True:
+            try:
+                await self.backend.publish(self.worker_id, self.get_state())
+                workers = await self.backend.list_workers()
+                self.peers = {worker_id: state for worker_id, state in workers.items() if worker_id != self.worker_id}
+            except Exception as e:
+                logger.error(f"SESSION HEARTBEAT ERROR: {e}")
+
+            await asyncio.sleep(self.heartbeat_s)
+
+    def start(self):
+        if self.heartbeat_task is None:
+            self.heartbeat_task = asyncio.create_task(self.heartbeat())
+
+    async def close(self):
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+
+        try:
+            await self.backend.remove(self.worker_id)
+        except Exception as e:
+            logger.error(f"SESSION BACKEND REMOVE ERROR: {e}")
+
+
+@lru_cache
+def get_session_registry():
+    if settings.SESSION_BACKEND == "file":
+        backend = FileSessionBackend(settings.SESSION_DIR)
+    else:
+        backend = InMemorySessionBackend()
+
+    registry = SessionRegistry(
+        worker_id=f"{socket.gethostname()}-{os.getpid()}",
+        max_calls=settings.MAX_CONCURRENT_CALLS,
+        backend=backend,
+        advertise_url=settings.SESSION_ADVERTISE_URL,
+        heartbeat_s=settings.SESSION_HEARTBEAT_S,
+        stale_s=settings.SESSION_STALE_S,
+    )
+    register(CallbackGauge("active_calls", "Calls running on this worker.", lambda: len(registry.sessions)))
+    register(CallbackGauge("worker_draining", "1 while this worker is draining.", lambda: int(registry.is_draining)))
+    return registry
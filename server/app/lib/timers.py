@@ -0,0 +1,232 @@
+"""
+Process-wide timers for call deadlines.
+
+One TimerWheel task serves every call on the worker. Timers hash into a ring of slots by deadline
+tick; the wheel task wakes once per tick and only looks at the current slot. Pushing a deadline
+later, which activity timers do on every event, just overwrites it in place: the timer is
+re-slotted when its old slot comes round. Deadlines past one revolution of the ring go the same
+way, so there is no overflow level to manage. Schedule, rearm and cancel are all O(1).
+"""
+import asyncio
+import contextvars
+import inspect
+import logging
+import math
+import time
+
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.lib.metrics import CallbackGauge, CounterVec, Histogram, register
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+CALL_TIMEOUTS = register(CounterVec(
+    "call_timeouts_total",
+    "Calls ended by a deadline, by reason.",
+    ("reason",),
+))
+TIMER_FIRE_LAG_MS = register(Histogram(
+    "timer_fire_lag_ms",
+    "How late timers fired after their deadline.",
+    buckets=(1, 5, 10, 25, 50, 100, 150, 250, 500, 1000, 5000),
+))
+
+# Call timeout reasons.
+MAX_DURATION = "max_duration"       # The agent's maximum call duration
+CALLER_SILENCE = "caller_silence"   # Nobody has said anything, the caller may have walked away
+AGENT_STALL = "agent_stall"         # A caller turn got no audio back
+PROVIDER_IDLE = "provider_idle"     # The transcriber stopped sending anything, no audio is reaching it
+
+
+class Timer:
+    __slots__ = ("wheel", "deadline", "callback", "context", "slot")
+
+    def __init__(self, wheel, deadline: float, callback):
+        self.wheel: TimerWheel = wheel
+        self.deadline = deadline
+        self.callback = callback
+        # Fires in the context it was scheduled from, so its logs carry the call's ids.
+        self.context = contextvars.copy_context()
+        self.slot: int = None       # None once fired or cancelled
+
+    def rearm(self, delay_s: float):
+        self.wheel.rearm(self, delay_s)
+
+    def cancel(self):
+        self.wheel.cancel(self)
+
+    def is_active(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    def __init__(self, tick_s: float = 0.1, slots: int = 512):
+        self.tick_s = tick_s
+        self.slots: list = [set() for _ in range(slots)]
+        self.current_tick: int = math.floor(time.monotonic() / tick_s)    # Last tick processed
+        self.active: int = 0
+        self.callback_tasks: set = set()
+        self.run_task = None
+
+    def insert(self, timer: Timer):
+        tick = max(math.ceil(timer.deadline / self.tick_s), self.current_tick + 1)
+        # Past one revolution, park it in the last slot of this one and re-slot it from there.
+        tick = min(tick, self.current_tick + len(self.slots))
+        timer.slot = tick % len(self.slots)
+        self.slots[timer.slot].add(timer)
+
+    def schedule(self, delay_s: float, callback):
+        """Call `callback()` once `delay_s` has passed. A returned coroutine runs as a task."""
+        timer = Timer(self, time.monotonic() + delay_s, callback)
+        self.insert(timer)
+        self.active += 1
+        return timer
+
+    def rearm(self, timer: Timer, delay_s: float):
+        """Move the deadline to `delay_s` from now, rescheduling the timer if it already fired."""
+        deadline = time.monotonic() + delay_s
+        if timer.slot is None:
+            timer.deadline = deadline
+            self.insert(timer)
+            self.active += 1
+        elif deadline >= timer.deadline:
+            # Its slot comes up no later than the new deadline, it is re-slotted then.
+            timer.deadline = deadline
+        else:
+            self.slots[timer.slot].discard(timer)
+            timer.deadline = deadline
+            self.insert(timer)
+
+    def cancel(self, timer: Timer):
+        if timer.slot is not None:
+            self.slots[timer.slot].discard(timer)
+            timer.slot = None
+            self.active -= 1
+
+    def advance(self, now: float):
+        """Fire every timer due by `now`, catching up on ticks missed while the loop was busy."""
+        while self.current_tick < math.floor(now / self.tick_s):
+            self.current_tick += 1
+            index = self.current_tick % len(self.slots)
+            due = self.slots[index]
+            if not due:
+                continue
+
+            self.slots[index] = set()
+            for timer in due:
+                if timer.deadline > now:
+                    self.insert(timer)
+                    continue
+                timer.slot = None
+                self.active -= 1
+                self.fire(timer, now)
+
+    def fire(self, timer: Timer, now: float):
+        TIMER_FIRE_LAG_MS.observe((now - timer.deadline) * 1000)
+        try:
+            result = timer.context.run(timer.callback)
+            if inspect.isawaitable(result):
+                task = timer.context.run(asyncio.ensure_future, result)
+                self.callback_tasks.add(task)
+                task.add_done_callback(self.callback_tasks.discard)
+        except Exception as e:
+            logger.error(f"TIMER CALLBACK ERROR: {e}", exc_info=True)
+
+    async def run(self):
+        while True:
+            # Wake on tick boundaries so a timer is never more than one tick late.
+            await asyncio.sleep(self.tick_s - time.monotonic() % self.tick_s)
+            self.advance(time.monotonic())
+
+    def start(self):
+        if self.run_task is None:
+            self.run_task = asyncio.create_task(self.run())
+
+    async def close(self):
+        if self.run_task:
+            self.run_task.cancel()
+            self.run_task = None
+        for task in list(self.callback_tasks):
+            task.cancel()
+
+
+class CallTimeouts:
+    """
+    A call's deadlines on the shared wheel. Components report activity and `on_timeout(reason)` is
+    called once, for the first deadline that passes. A timeout of 0 turns that deadline off.
+    """
+
+    def __init__(self, wheel: TimerWheel, on_timeout, max_duration_s: float, caller_silence_s: float, agent_stall_s: float, provider_idle_s: float):
+        self.wheel = wheel
+        self.on_timeout = on_timeout
+        self.timeouts = {
+            MAX_DURATION: max_duration_s,
+            CALLER_SILENCE: caller_silence_s,
+            AGENT_STALL: agent_stall_s,
+            PROVIDER_IDLE: provider_idle_s,
+        }
+        self.timers: dict = {}
+        self.has_fired = False
+
+    def start(self):
+        for reason in (MAX_DURATION, CALLER_SILENCE, PROVIDER_IDLE):
+            self.arm(reason)
+
+    def arm(self, reason: str, extra_s: float = 0):
+        timeout_s = self.timeouts[reason]
+        if not timeout_s or self.has_fired:
+            return
+
+        timer = self.timers.get(reason)
+        if timer is None:
+            self.timers[reason] = self.wheel.schedule(timeout_s + extra_s, lambda: self.fire(reason))
+        else:
+            timer.rearm(timeout_s + extra_s)
+
+    def disarm(self, reason: str):
+        timer = self.timers.get(reason)
+        if timer:
+            timer.cancel()
+
+    def fire(self, reason: str):
+        if self.has_fired:
+            return None
+        self.has_fired = True
+        self.cancel()
+        CALL_TIMEOUTS.inc(1, reason)
+        return self.on_timeout(reason)
+
+    def caller_active(self):
+        """The caller said something. They are not silent, and the agent isn't expected to answer yet."""
+        self.arm(CALLER_SILENCE)
+        self.disarm(AGENT_STALL)
+
+    def turn_started(self):
+        """A caller turn went to the LLM, its audio has to start within the stall timeout."""
+        self.arm(AGENT_STALL)
+
+    def agent_responded(self, duration_ms: float):
+        """Agent audio was sent. The caller's silence counts from when it finishes playing."""
+        self.disarm(AGENT_STALL)
+        self.arm(CALLER_SILENCE, duration_ms / 1000)
+
+    def provider_active(self):
+        self.arm(PROVIDER_IDLE)
+
+    def cancel(self):
+        for timer in self.timers.values():
+            timer.cancel()
+
+
+@lru_cache
+def get_timer_wheel():
+    wheel = TimerWheel(settings.TIMER_TICK_MS / 1000, settings.TIMER_WHEEL_SLOTS)
+    register(CallbackGauge(
+        "timers_active",
+        "Timers scheduled on the worker's timer wheel.",
+        lambda: wheel.active,
+    ))
+    return wheel
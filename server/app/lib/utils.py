@@ -1,15 +1,14 @@
-
-def add_message(messages: list, message: str):
-    if not message:
-        return messages
-    
-    if not messages or len(messages) == 0:
-        messages.append(message)
-        return messages
-    
-    last_message = messages[-1]
+def clear_queue(queue):
+    """Drop every item currently waiting in an asyncio.Queue. Returns the number of items dropped."""
+    dropped = 0
+    while not queue.empty():
+        queue.get_nowait()
+        dropped += 1
     
-    if message["role"] == last_message["role"]:
-        last_message["content"] += f" {message['content']}"
-    else:
-        messages.append(message)
+    return dropped
+
+
+def normalize_transcript(text: str):
+    """Lowercase, punctuation-free, single-spaced form of a transcript, for comparing hypotheses."""
+    text = "".join(char if char.isalnum() or char.isspace() or char == "'" else " " for char in text.lower())
+    return " ".join(text.split())
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+
+from collections import deque
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class PooledConnections:
+    def __init__(self, connect, keepalive):
+        self.connect = connect          # Coroutine function opening a ready-to-use socket
+        self.keepalive = keepalive      # Coroutine function keeping an idle socket alive on the provider side
+        self.idle: deque = deque()      # (websocket, opened_at) pairs, oldest first
+        self.connecting: int = 0
+
+
+class WebsocketPool:
+    """
+    Process-wide pool of pre-opened provider websockets, keyed by provider and connection parameters.
+    Calls check a socket out with acquire() and hand it back with release(). Sockets that carried a
+    call are closed since the provider stream keeps its state; the pool refills in the background.
+    """
+
+    def __init__(self, size: int, keepalive_interval_s: float, max_idle_s: float):
+        self.size = size
+        self.keepalive_interval_s = keepalive_interval_s
+        self.max_idle_s = max_idle_s
+
+        self.pools: dict = {}
+        self.maintenance_task = None
+        self.fill_tasks: set = set()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def warm(self, key: tuple, connect, keepalive):
+        """Register a key so that `size` connections are kept open for it."""
+        if key not in self.pools:
+            self.pools[key] = PooledConnections(connect, keepalive)
+
+        self.schedule_fill(key)
+
+    async def acquire(self, key: tuple, connect, keepalive):
+        self.warm(key, connect, keepalive)
+        pool: PooledConnections = self.pools[key]
+
+        while pool.idle:
+            websocket, _ = pool.idle.popleft()
+            if websocket.open:
+                self.hits += 1
+                self.schedule_fill(key)
+                return websocket
+
+        # Pool is empty, pay for the handshake on the call's path.
+        self.misses += 1
+        return await connect()
+
+    async def release(self, key: tuple, websocket, reusable: bool = False):
+        pool: PooledConnections = self.pools.get(key)
+
+        if reusable and pool and websocket.open and len(pool.idle) < self.size:
+            pool.idle.append((websocket, time.monotonic()))
+            return
+
+        await self.close_websocket(websocket)
+
+    def schedule_fill(self, key: tuple):
+        pool: PooledConnections = self.pools[key]
+
+        missing = self.size - len(pool.idle) - pool.connecting
+        for _ in range(missing):
+            pool.connecting += 1
+            task = asyncio.create_task(self.open_connection(key, pool))
+            self.fill_tasks.add(task)
+            task.add_done_callback(self.fill_tasks.discard)
+
+    async def open_connection(self, key: tuple, pool: PooledConnections):
+        try:
+            websocket = await pool.connect()
+            pool.idle.append((websocket, time.monotonic()))
+        except Exception as e:
+            logger.error(f"WS POOL CONNECT ERROR for {key[0]}: {e}")
+        finally:
+            pool.connecting -= 1
+
+    async def maintain(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval_s)
+
+            for key, pool in list(self.pools.items()):
+                now = time.monotonic()
+
+                # Iterate over a snapshot, a call may check a socket out while we await the keepalive.
+                for entry in list(pool.idle):
+                    websocket, opened_at = entry
+                    try:
+                        if not websocket.open or now - opened_at > self.max_idle_s:
+                            raise ConnectionError("connection closed or idle for too long")
+
+                        await pool.keepalive(websocket)
+                    except Exception as e:
+                        logger.info(f"Recycling pooled {key[0]} connection: {e}")
+                        if entry in pool.idle:
+                            pool.idle.remove(entry)
+                        await self.close_websocket(websocket)
+
+                self.schedule_fill(key)
+
+    async def close_websocket(self, websocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def start(self):
+        if self.maintenance_task is None:
+            self.maintenance_task = asyncio.create_task(self.maintain())
+
+    async def close(self):
+        if self.maintenance_task:
+            self.maintenance_task.cancel()
+            self.maintenance_task = None
+
+        for task in list(self.fill_tasks):
+            task.cancel()
+
+        for pool in self.pools.values():
+            while pool.idle:
+                websocket, _ = pool.idle.popleft()
+                await self.close_websocket(websocket)
+
+        self.pools = {}
+
+
+@lru_cache
+def get_ws_pool():
+    return WebsocketPool(
+        size=settings.WS_POOL_SIZE,
+        keepalive_interval_s=settings.WS_POOL_KEEPALIVE_INTERVAL_S,
+        max_idle_s=settings.WS_POOL_MAX_IDLE_S,
+    )
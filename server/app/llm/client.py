@@ -0,0 +1,65 @@
+import itertools
+import logging
+
+import httpx
+
+from functools import lru_cache
+from openai import AsyncOpenAI
+
+from app.core.config import get_settings
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+class LLMClientPool:
+    """
+    Application-scoped AsyncOpenAI clients. Each shard owns its own httpx connection pool so that
+    one busy HTTP/2 connection does not become the bottleneck for every call on the worker.
+    Per-call LLM objects borrow a client with get() and never close it.
+    """
+
+    def __init__(self, shards: int, base_url: str = None, api_key: str = None):
+        self.base_url = base_url or settings.OPENAI_BASE_URL
+        self.api_key = api_key or settings.OPENAI_API_KEY
+        self.clients: list = [self.create_client() for _ in range(max(shards, 1))]
+        self.next_shard = itertools.cycle(range(len(self.clients)))
+
+    def create_client(self):
+        http_client = httpx.AsyncClient(
+            http2=settings.LLM_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_S,
+            ),
+            timeout=httpx.Timeout(settings.LLM_TIMEOUT_S, connect=settings.LLM_CONNECT_TIMEOUT_S),
+        )
+
+        if self.base_url:
+            return AsyncOpenAI(base_url=self.base_url, api_key=self.api_key, http_client=http_client)
+        return AsyncOpenAI(api_key=self.api_key, http_client=http_client)
+
+    def get(self):
+        return self.clients[next(self.next_shard)]
+
+    async def warm(self):
+        # Any cheap authenticated request pays for DNS, TCP and TLS before the first caller does.
+        for client in self.clients:
+            try:
+                await client.models.list()
+            except Exception as e:
+                logger.error(f"LLM CLIENT WARMUP ERROR: {e}")
+
+    async def close(self):
+        for client in self.clients:
+            try:
+                await client.close()
+            except Exception:
+                pass
+
+
+@lru_cache
+def get_llm_client_pool():
+    return LLMClientPool(shards=settings.LLM_CLIENT_SHARDS)
@@ -1,86 +1,309 @@
 import asyncio
 import logging
+import re
 import string
+import time
 
-from openai import AsyncOpenAI
+from contextlib import aclosing
 
+from app.agents.registry import AgentConfig
 from app.core.config import get_settings
-from app.lib.utils import add_message
+from app.lib import metrics
+from app.lib.constants import CONVERSATION_SUMMARY_PROMPT, DEFAULT_MODEL
+from app.lib.utils import normalize_transcript
+from app.llm.memory import ConversationMemory
+from app.llm.response_cache import ResponseCache, get_response_cache
+from app.llm.router import LLMRouter, get_llm_router
+from app.llm.segmenter import SentenceSegmenter, WordChunker
+from app.recording.recorder import CallRecorder
 
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+SPECULATIONS = metrics.register(metrics.CounterVec(
+    "llm_speculation_total",
+    "Speculative completions started on interim transcripts, by outcome: hit (the final text matched) or miss.",
+    ("result",),
+))
+SPECULATION_WASTED_TOKENS = metrics.register(metrics.CounterVec(
+    "llm_speculation_wasted_tokens_total",
+    "Tokens streamed by speculative completions that were thrown away.",
+))
+SPECULATION_SAVED_MS = metrics.register(metrics.Histogram(
+    "llm_speculation_saved_ms",
+    "Head start a confirmed speculative completion had over the final transcript.",
+))
+metrics.register(metrics.CallbackGauge(
+    "llm_speculation_hit_ratio",
+    "Share of speculative completions kept.",
+    lambda: SPECULATIONS.get("hit") / max(SPECULATIONS.get("hit") + SPECULATIONS.get("miss"), 1),
+))
+
+
+class Speculation:
+    """A completion streamed ahead of the final transcript, its tokens held back until confirmed."""
+
+    def __init__(self, text: str, response_id: int):
+        self.text = text
+        self.normalized_text = normalize_transcript(text)
+        self.response_id = response_id
+        self.started_at = time.monotonic()
+        
+        self.tokens: list = []
+        self.first_token_ms: float = None
+        self.updated = asyncio.Event()
+        self.task = None
+        self.error: Exception = None
+
 
 class GroqLLM:
-    SPLITTERS = (".", ",", "?", "!", ";", ":", "—", "-")
     PUNCTUATION = set(string.punctuation)
     END_MARKER = "\0"  # Null byte as end marker
 
     def __init__(self, input_queue, output_queue, **kwargs):
-        if settings.OPENAI_BASE_URL:
-            self.client = AsyncOpenAI(base_url=settings.OPENAI_BASE_URL, api_key=settings.OPENAI_API_KEY)
-        else:
-            self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        # Application-wide endpoints on warm connections, hedged and failed over per completion.
+        self.router: LLMRouter = get_llm_router()
 
         self.input_queue: asyncio.Queue = input_queue
         self.output_queue: asyncio.Queue = output_queue
-        self.sentence: str = ""
-        self.messages: list = kwargs["messages"]
+        # Whole sentences, each flushed by the TTS, or words streamed into one generation per response.
+        self.segmenter = WordChunker(settings.TTS_STREAM_FLUSH_FIRST_CLAUSE) if settings.TTS_STREAM_TOKENS else SentenceSegmenter()
+        self.memory: ConversationMemory = kwargs["memory"]
+        self.model: str = kwargs.get("model", DEFAULT_MODEL)
+        self.call_status: dict = kwargs["call_status"]
+        self.turn_latency: metrics.TurnLatencyRecorder = kwargs["turn_latency"]
+        self.recorder: CallRecorder = kwargs.get("recorder", None)
+        self.agent_config: AgentConfig = kwargs.get("agent_config", None)
+        self.response_cache: ResponseCache = get_response_cache()
+        
+        self.generation_task = None
         
+        self.speculation: Speculation = None
+        self.wasted_tokens: int = 0
 
 
-    def add_to_queue(self, text: str):
+    async def add_to_queue(self, text: str, response_id: int):
+        if settings.TTS_STREAM_TOKENS:
+            await self.add_words_to_queue(text, response_id)
+            return
+        
         if text == GroqLLM.END_MARKER:
             # If there's any remaining sentence, queue it.
-            if self.sentence:
-                self.output_queue.put_nowait(self.sentence.strip())
-                self.sentence = ""
+            chunks = [self.segmenter.flush()]
+        else:
+            chunks = self.segmenter.push(text)
+        
+        for chunk in chunks:
+            if chunk:
+                # Blocks when TTS falls behind, which in turn pauses reading the LLM stream.
+                await self.output_queue.put({"text": chunk, "response_id": response_id})
+                self.turn_latency.mark(metrics.FIRST_SENTENCE)
+    
+    async def add_words_to_queue(self, text: str, response_id: int):
+        # Only the first clause and the end of the response are flushed, the TTS generates the rest
+        # from its chunk length schedule with the whole response as context.
+        if text == GroqLLM.END_MARKER:
+            await self.output_queue.put({"text": self.segmenter.flush(), "response_id": response_id, "flush": True})
+            return
+        
+        chunk, flush = self.segmenter.push(text)
+        if chunk:
+            await self.output_queue.put({"text": chunk, "response_id": response_id, "flush": flush})
+            self.turn_latency.mark(metrics.FIRST_SENTENCE)
             
+    async def stream_tokens(self, messages: list, response_id: int):
+        async with aclosing(self.router.stream(messages, self.model)) as tokens:
+            async for content in tokens:
+                if self.call_status["response_id"] != response_id:
+                    logger.info(f"Response {response_id} interrupted, aborting stream")
+                    return
+                yield content
+    
+    async def generate_text(self, response_id: int, cache_key: str = None):
+        messages = self.memory.get_messages()
+        logger.info(f"Generating text for {len(messages)} messages, ~{self.memory.get_token_count()} tokens")
+        logger.debug("Generating text for messages: %s", messages)
+        
+        self.turn_latency.mark(metrics.LLM_REQUEST)
+        started_at = time.monotonic()
+        first_token_ms = None
+        response = []
+        async with aclosing(self.stream_tokens(messages, response_id)) as tokens:
+            async for content in tokens:
+                self.turn_latency.mark(metrics.LLM_FIRST_TOKEN)
+                if first_token_ms is None:
+                    first_token_ms = (time.monotonic() - started_at) * 1000
+                response.append(content)
+                await self.add_to_queue(content, response_id)
+        
+        if self.call_status["response_id"] == response_id:
+            # Add null byte to indicate end of response
+            await self.add_to_queue(GroqLLM.END_MARKER, response_id)
+            # Only a response streamed to the end is reused, an interrupted one is cut short.
+            if cache_key and first_token_ms is not None:
+                self.response_cache.put(cache_key, "".join(response), first_token_ms)
+    
+    async def emit_cached(self, text: str, response_id: int):
+        """Replay a cached response word by word, the way the model would have streamed it."""
+        self.turn_latency.mark(metrics.LLM_REQUEST)
+        for word in re.findall(r"\s*\S+\s*", text):
+            if self.call_status["response_id"] != response_id:
+                return
+            self.turn_latency.mark(metrics.LLM_FIRST_TOKEN)
+            await self.add_to_queue(word, response_id)
+        
+        if self.call_status["response_id"] == response_id:
+            await self.add_to_queue(GroqLLM.END_MARKER, response_id)
+    
+    def speculate(self, text: str, response_id: int):
+        """Start streaming a completion for an interim transcript, replacing any earlier speculation."""
+        if self.speculation and self.speculation.normalized_text == normalize_transcript(text):
+            return
+        self.cancel_speculation()
+        
+        if self.wasted_tokens >= settings.LLM_SPECULATION_MAX_WASTED_TOKENS:
+            return
+        
+        self.speculation = Speculation(text, response_id)
+        self.speculation.task = asyncio.create_task(self.run_speculation(self.speculation))
+    
+    async def run_speculation(self, speculation: Speculation):
+        messages = self.memory.get_messages_with({"role": "user", "content": speculation.text})
+        try:
+            async with aclosing(self.stream_tokens(messages, speculation.response_id)) as tokens:
+                async for content in tokens:
+                    if speculation.first_token_ms is None:
+                        speculation.first_token_ms = (time.monotonic() - speculation.started_at) * 1000
+                    speculation.tokens.append(content)
+                    speculation.updated.set()
+        except Exception as e:
+            # Raised by emit_speculation if the speculation is confirmed, ignored if it's discarded.
+            speculation.error = e
+        finally:
+            speculation.updated.set()
+    
+    def cancel_speculation(self):
+        speculation, self.speculation = self.speculation, None
+        if speculation is None:
             return
         
-        stripped_text = text.strip()
-        self.sentence += text
+        speculation.task.cancel()
+        SPECULATIONS.inc(1, "miss")
+        SPECULATION_WASTED_TOKENS.inc(len(speculation.tokens))
+        self.wasted_tokens += len(speculation.tokens)
+        if self.wasted_tokens >= settings.LLM_SPECULATION_MAX_WASTED_TOKENS:
+            logger.info(f"Speculation wasted {self.wasted_tokens} tokens, disabled for the rest of the call")
+    
+    def take_speculation(self, text: str, response_id: int):
+        """The running speculation if the final transcript confirms it, otherwise cancel it."""
+        speculation = self.speculation
+        if speculation is None:
+            return None
+        
+        if speculation.response_id != response_id or speculation.normalized_text != normalize_transcript(text):
+            self.cancel_speculation()
+            return None
         
-        if stripped_text.endswith(GroqLLM.SPLITTERS):
-            self.output_queue.put_nowait(self.sentence)
-            self.sentence = ""
+        self.speculation = None
+        SPECULATIONS.inc(1, "hit")
+        SPECULATION_SAVED_MS.observe((time.monotonic() - speculation.started_at) * 1000)
+        return speculation
+    
+    async def emit_speculation(self, speculation: Speculation, response_id: int, cache_key: str = None):
+        """Release a confirmed speculation's tokens, first the ones held back, then live as they stream."""
+        self.turn_latency.mark(metrics.LLM_REQUEST)
+        try:
+            emitted = 0
+            while True:
+                while emitted < len(speculation.tokens):
+                    self.turn_latency.mark(metrics.LLM_FIRST_TOKEN)
+                    await self.add_to_queue(speculation.tokens[emitted], response_id)
+                    emitted += 1
+                
+                if speculation.task.done():
+                    break
+                speculation.updated.clear()
+                await speculation.updated.wait()
             
-    async def generate_text(self):
-        logger.info(f"Generating text for messages: {self.messages}")
+            if speculation.error:
+                raise speculation.error
+        finally:
+            speculation.task.cancel()
         
-        response = await self.client.chat.completions.create(
-            model="mixtral-8x7b-32768",
-            messages=self.messages,
-            stream=True,
+        if self.call_status["response_id"] == response_id:
+            await self.add_to_queue(GroqLLM.END_MARKER, response_id)
+            if cache_key and speculation.first_token_ms is not None:
+                self.response_cache.put(cache_key, "".join(speculation.tokens), speculation.first_token_ms)
+    
+    async def summarize(self, summary: str, messages: list):
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        content = await self.router.complete(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": CONVERSATION_SUMMARY_PROMPT},
+                {"role": "user", "content": f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}"},
+            ],
+            max_tokens=200,
         )
+        return content or summary
+    
+    def interrupt(self):
+        self.segmenter.reset()
+        self.cancel_speculation()
         
-        async for chunk in response:
-            if chunk.choices:
-                content = chunk.choices[0].delta.content
-                if content and content.strip() != "":
-                    self.add_to_queue(content)
-                    
-        # Add null byte to indicate end of response
-        self.add_to_queue(GroqLLM.END_MARKER)
+        if self.generation_task and not self.generation_task.done():
+            self.generation_task.cancel()
         
     async def run(self):
         while True:
             try:
-                text = await self.input_queue.get()
-                logger.info(f"Transcribe user message: {text}")
-                add_message(self.messages, {"role": "user", "content": text})
-                await self.generate_text()
+                data: dict = await self.input_queue.get()
+                
+                if data.get("is_interim"):
+                    if data["response_id"] == self.call_status["response_id"]:
+                        self.speculate(data["text"], data["response_id"])
+                    continue
+                
+                logger.info(f"Transcribe user message: {data['text']}")
+                self.memory.add_message({"role": "user", "content": data["text"]})
+                if self.recorder:
+                    self.recorder.record_text("user", data["text"], data["response_id"])
+
+                # Caller already spoke again, the next turn's text will carry the whole request.
+                if data["response_id"] != self.call_status["response_id"]:
+                    self.cancel_speculation()
+                    continue
+
+                # Run the generation as its own task so an interruption can cancel it without killing this loop.
+                cache_key = self.response_cache.get_key(self.agent_config, self.memory.messages) if self.response_cache else None
+                cached = self.response_cache.get(cache_key) if cache_key else None
+                speculation = None if cached else self.take_speculation(data["text"], data["response_id"])
+                if cached:
+                    self.cancel_speculation()
+                    logger.info(f"Response {data['response_id']} served from the response cache")
+                    self.generation_task = asyncio.create_task(self.emit_cached(cached.text, data["response_id"]))
+                elif speculation:
+                    self.generation_task = asyncio.create_task(self.emit_speculation(speculation, data["response_id"], cache_key))
+                else:
+                    self.generation_task = asyncio.create_task(self.generate_text(data["response_id"], cache_key))
+                await asyncio.wait([self.generation_task])
+                
+                if not self.generation_task.cancelled() and self.generation_task.exception():
+                    raise self.generation_task.exception()
+                
+                # The caller is listening now, a good time to compact older turns.
+                self.memory.schedule_summary(self.summarize)
             except Exception as e:
                 logger.error(f"GROQ LLM RUNNER ERROR: {e}", exc_info=True)
     
     async def close_connection(self):
-        self.sentence = ""
+        self.segmenter.reset()
+        self.cancel_speculation()
         
-        if self.client:
-            try:
-                await self.client.close()
-            except Exception:
-                pass
-            finally:
-                self.client = None
\ No newline at end of file
+        if self.generation_task:
+            self.generation_task.cancel()
+            self.generation_task = None
+        
+        # The router is shared across calls, only drop the reference.
+        self.router = None
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str):
+    # Roughly four characters per token for English, good enough for budgeting.
+    return len(text) // 4 + 1
+
+
+class ConversationMemory:
+    """
+    Conversation history for one call, kept under a token budget.
+
+    The system prompt and the most recent `min_recent_messages` messages are always sent verbatim.
+    Older messages are evicted from the window once the budget is exceeded and folded into a running
+    summary by a background task between turns. Until that summary lands, evicted messages are
+    still sent verbatim so no context is lost.
+    """
+
+    SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+    def __init__(self, system_prompt: str, token_budget: int, min_recent_messages: int):
+        self.system_message: dict = {"role": "system", "content": system_prompt}
+        self.token_budget = token_budget
+        self.min_recent_messages = min_recent_messages
+
+        self.messages: list = []            # Verbatim window, oldest first
+        self.message_tokens: list = []      # Token estimate for each message in the window
+        self.window_tokens: int = 0
+
+        self.evicted: list = []             # Left the window, not yet in the summary
+        self.evicted_message_tokens: list = []  # Token estimate for each evicted message, carried over from the window
+        self.evicted_tokens: int = 0
+        self.summary: str = ""
+        self.summary_tokens: int = 0
+        self.summary_task = None
+
+        self.fixed_tokens: int = estimate_tokens(system_prompt)
+
+    def add_message(self, message: dict):
+        """Append a message, merging it into the last one when the role repeats."""
+        if not message or not message["content"]:
+            return
+
+        if self.messages and self.messages[-1]["role"] == message["role"]:
+            addition = f" {message['content']}"
+            self.messages[-1]["content"] += addition
+            tokens = estimate_tokens(addition)
+            self.message_tokens[-1] += tokens
+        else:
+            self.messages.append({"role": message["role"], "content": message["content"]})
+            tokens = estimate_tokens(message["content"])
+            self.message_tokens.append(tokens)
+
+        self.window_tokens += tokens
+        self.trim()
+
+    def get_last_content(self, role: str):
+        """Content of the last message if it has this role, otherwise empty."""
+        if self.messages and self.messages[-1]["role"] == role:
+            return self.messages[-1]["content"]
+        return ""
+
+    def replace_last_message(self, message: dict):
+        """
+        Replace the last message's content if it has the same role, otherwise add the message. Empty
+        content removes a replaced message.
+        """
+        if not self.messages or self.messages[-1]["role"] != message["role"]:
+            self.add_message(message)
+            return
+
+        self.window_tokens -= self.message_tokens[-1]
+        if message["content"]:
+            self.messages[-1]["content"] = message["content"]
+            self.message_tokens[-1] = estimate_tokens(message["content"])
+            self.window_tokens += self.message_tokens[-1]
+            self.trim()
+        else:
+            self.messages.pop()
+            self.message_tokens.pop()
+
+    def trim(self):
+        while (
+            self.fixed_tokens + self.summary_tokens + self.window_tokens > self.token_budget
+            and len(self.messages) > self.min_recent_messages
+        ):
+            self.evicted.append(self.messages.pop(0))
+            tokens = self.message_tokens.pop(0)
+            self.evicted_message_tokens.append(tokens)
+            self.window_tokens -= tokens
+            self.evicted_tokens += tokens
+
+    def get_messages(self):
+        messages = [self.system_message]
+        if self.summary:
+            messages.append({"role": "system", "content": f"{ConversationMemory.SUMMARY_PREFIX}{self.summary}"})
+        return messages + self.evicted + self.messages
+
+    def get_messages_with(self, message: dict):
+        """The messages as they would be after `message` is added, without adding it."""
+        messages = self.get_messages()
+        if messages[-1]["role"] == message["role"]:
+            return messages[:-1] + [{"role": message["role"], "content": f"{messages[-1]['content']} {message['content']}"}]
+        return messages + [{"role": message["role"], "content": message["content"]}]
+    
+    def get_token_count(self):
+        return self.fixed_tokens + self.summary_tokens + self.evicted_tokens + self.window_tokens
+
+    def schedule_summary(self, summarize):
+        """
+        Fold evicted messages into the summary in the background. `summarize(summary, messages)` is a
+        coroutine function returning the new summary. Call between turns, never on the response path.
+        """
+        if not self.evicted or (self.summary_task and not self.summary_task.done()):
+            return
+
+        self.summary_task = asyncio.create_task(self.update_summary(summarize, len(self.evicted)))
+
+    async def update_summary(self, summarize, count: int):
+        folded = self.evicted[:count]
+        try:
+            summary = await summarize(self.summary, folded)
+        except Exception as e:
+            logger.error(f"CONVERSATION SUMMARY ERROR: {e}")
+            return
+
+        # Messages evicted while we were summarizing stay pending for the next round.
+        # Keep the estimates the messages were counted with in the window, so the totals never drift.
+        self.evicted = self.evicted[count:]
+        self.evicted_tokens -= sum(self.evicted_message_tokens[:count])
+        self.evicted_message_tokens = self.evicted_message_tokens[count:]
+        self.summary = summary.strip()
+        self.summary_tokens = estimate_tokens(self.summary)
+        self.trim()
+
+    def close(self):
+        if self.summary_task:
+            self.summary_task.cancel()
+            self.summary_task = None
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+import time
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+from app.agents.registry import AgentConfig
+from app.core.config import get_settings
+from app.lib.metrics import CallbackGauge, CounterVec, Histogram, register
+from app.lib.utils import normalize_transcript
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_LOOKUPS = register(CounterVec(
+    "llm_response_cache_lookups_total",
+    "Response cache lookups for allowlisted caller phrases by result: hit, miss or expired.",
+    ("result",),
+))
+RESPONSE_CACHE_SAVED_MS = register(Histogram(
+    "llm_response_cache_saved_ms",
+    "Model time to first token skipped by a response cache hit, as measured when the entry was stored.",
+))
+register(CallbackGauge(
+    "llm_response_cache_hit_ratio",
+    "Share of response cache lookups answered from the cache.",
+    lambda: RESPONSE_CACHE_LOOKUPS.get("hit") / max(sum(RESPONSE_CACHE_LOOKUPS.values.values()), 1),
+))
+
+
+class CachedResponse(NamedTuple):
+    text: str
+    first_token_ms: float       # What the model took to start answering when this was generated
+    stored_at: float
+
+
+class ResponseCache:
+    """
+    Complete LLM responses to short, stateless caller turns ("what are your hours"), replayed
+    without calling the model. Only phrases on the agent's `cached_phrases` allowlist are cached.
+    Keys cover the agent and its config version, the normalized caller text and the last
+    `context_messages` messages before it, so an edited prompt or, when context is on, a different
+    preceding exchange never gets a stale answer. Entries live for `ttl_s` in an LRU of
+    `max_entries` shared by every agent on the worker.
+    """
+
+    def __init__(self, ttl_s: float, max_entries: int, context_messages: int = 0):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.context_messages = context_messages
+        self.entries: OrderedDict = OrderedDict()
+
+    def get_key(self, agent_config: AgentConfig, messages: list):
+        """Key for a turn whose caller message is last in `messages`, None when it isn't allowlisted."""
+        if agent_config is None or not agent_config.cached_phrases or not messages or messages[-1]["role"] != "user":
+            return None
+
+        text = normalize_transcript(messages[-1]["content"])
+        if text not in agent_config.cached_phrases:
+            return None
+
+        context = messages[-1 - self.context_messages:-1] if self.context_messages else []
+        state = [(message["role"], normalize_transcript(message["content"])) for message in context]
+        payload = json.dumps([agent_config.agent_id, agent_config.version, state, text])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str):
+        entry: CachedResponse = self.entries.get(key)
+        if entry is None:
+            RESPONSE_CACHE_LOOKUPS.inc(1, "miss")
+            return None
+
+        if time.monotonic() - entry.stored_at > self.ttl_s:
+            del self.entries[key]
+            RESPONSE_CACHE_LOOKUPS.inc(1, "expired")
+            return None
+
+        self.entries.move_to_end(key)
+        RESPONSE_CACHE_LOOKUPS.inc(1, "hit")
+        RESPONSE_CACHE_SAVED_MS.observe(entry.first_token_ms)
+        return entry
+
+    def put(self, key: str, text: str, first_token_ms: float):
+        if not text.strip():
+            return
+
+        self.entries[key] = CachedResponse(text, first_token_ms, time.monotonic())
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+@lru_cache
+def get_response_cache():
+    if not settings.LLM_RESPONSE_CACHE_ENABLED:
+        return None
+
+    cache = ResponseCache(settings.LLM_RESPONSE_CACHE_TTL_S, settings.LLM_RESPONSE_CACHE_MAX_ENTRIES, settings.LLM_RESPONSE_CACHE_CONTEXT_MESSAGES)
+    register(CallbackGauge("llm_response_cache_entries", "Responses held by the worker's response cache.", lambda: len(cache.entries)))
+    return cache
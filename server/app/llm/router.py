@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import time
+
+from collections import deque
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.lib.metrics import CounterVec, GaugeVec, HistogramVec, register
+from app.llm.client import LLMClientPool, get_llm_client_pool
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+LLM_ENDPOINT_REQUESTS = register(CounterVec(
+    "llm_endpoint_requests_total",
+    "Streamed completions per endpoint by result: ok, error, or lost (cancelled because another endpoint answered first).",
+    ("endpoint", "result"),
+))
+LLM_HEDGES = register(CounterVec(
+    "llm_hedges_total",
+    "Completions that started a second endpoint, by why (slow: no first token within the hedge delay, failover: the first one failed) and which won.",
+    ("reason", "winner"),
+))
+LLM_ENDPOINT_FIRST_TOKEN_MS = register(HistogramVec(
+    "llm_endpoint_first_token_ms",
+    "Time from request to first token per endpoint, for the endpoint that was streamed from.",
+    ("endpoint",),
+))
+LLM_ENDPOINT_HEALTHY = register(GaugeVec(
+    "llm_endpoint_healthy",
+    "1 while an endpoint takes traffic, 0 while it is ejected after repeated failures.",
+    ("endpoint",),
+))
+
+# Marks the end of an attempt's token stream.
+END = object()
+
+
+class LLMEndpoint:
+    """
+    An OpenAI-compatible endpoint with its recent first-token latencies and a circuit breaker.
+    `failure_threshold` consecutive errors or lost hedges eject it for `eject_s`; after that it
+    takes traffic again and a single success closes the breaker.
+    """
+
+    def __init__(self, name: str, client_pool: LLMClientPool, model: str = "", window: int = 200, failure_threshold: int = 3, eject_s: float = 30.0):
+        self.name = name
+        self.client_pool = client_pool
+        self.model = model                  # Overrides the requested model when set
+        self.failure_threshold = failure_threshold
+        self.eject_s = eject_s
+
+        self.first_token_ms: deque = deque(maxlen=window)
+        self.consecutive_failures: int = 0
+        self.ejected_until: float = 0.0
+        LLM_ENDPOINT_HEALTHY.set(1, self.name)
+
+    def is_healthy(self):
+        return time.monotonic() >= self.ejected_until
+
+    def get_first_token_percentile(self, q: float):
+        """q-th percentile (0-100) of recent first-token latencies, or None with too few samples."""
+        if len(self.first_token_ms) < 20:
+            return None
+        samples = sorted(self.first_token_ms)
+        return samples[min(int(len(samples) * q / 100), len(samples) - 1)]
+
+    def record_first_token(self, latency_ms: float):
+        self.first_token_ms.append(latency_ms)
+        LLM_ENDPOINT_FIRST_TOKEN_MS.labels(self.name).observe(latency_ms)
+        self.consecutive_failures = 0
+        if self.ejected_until:
+            self.ejected_until = 0.0
+            LLM_ENDPOINT_HEALTHY.set(1, self.name)
+            logger.info(f"LLM endpoint {self.name} recovered")
+
+    def record_failure(self, slow_ms: float = None):
+        """An error, or a lost hedge that was still waiting on its first token after `slow_ms`."""
+        if slow_ms is not None:
+            # A lower bound on its latency, so its hedge delay and ordering reflect how slow it is.
+            self.first_token_ms.append(slow_ms)
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold and self.is_healthy():
+            self.ejected_until = time.monotonic() + self.eject_s
+            LLM_ENDPOINT_HEALTHY.set(0, self.name)
+            logger.warning(f"LLM endpoint {self.name} ejected for {self.eject_s}s after {self.consecutive_failures} failures")
+
+
+class Attempt:
+    """One streamed completion against one endpoint, feeding its tokens into a queue."""
+
+    def __init__(self, endpoint: LLMEndpoint, messages: list, model: str):
+        self.endpoint = endpoint
+        self.started_at = time.monotonic()
+        self.tokens = asyncio.Queue()
+        self.task = asyncio.create_task(self.run(messages, model))
+        self.first = asyncio.create_task(self.tokens.get())
+
+    async def run(self, messages: list, model: str):
+        response = None
+        try:
+            response = await self.endpoint.client_pool.get().chat.completions.create(
+                model=self.endpoint.model or model,
+                messages=messages,
+                stream=True,
+            )
+            async for chunk in response:
+                if chunk.choices:
+                    content = chunk.choices[0].delta.content
+                    # Whitespace-only tokens matter too, they confirm sentence boundaries.
+                    if content:
+                        self.tokens.put_nowait(content)
+            self.tokens.put_nowait(END)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.tokens.put_nowait(e)
+        finally:
+            # Closing the stream drops the underlying HTTP response so the provider stops generating.
+            if response is not None:
+                await response.close()
+
+    def elapsed_ms(self):
+        return (time.monotonic() - self.started_at) * 1000
+
+    def cancel(self):
+        self.first.cancel()
+        self.task.cancel()
+
+
+class LLMRouter:
+    """
+    Streams completions from a list of endpoints in preference order, skipping ejected ones.
+
+    With hedging on, if the first endpoint has not produced a token within its hedge delay (the
+    `hedge_percentile` of its recent first-token latencies, clamped to the min and max) the same
+    request goes to the next endpoint, and whichever yields a token first is streamed while the
+    other is cancelled. An endpoint that fails before its first token fails over to the next one
+    right away. Once tokens have been streamed a failure is raised, a retry would repeat them.
+    """
+
+    def __init__(self, endpoints: list, hedge: bool = True, hedge_percentile: float = 95, hedge_default_ms: float = 800, hedge_min_ms: float = 300, hedge_max_ms: float = 2000):
+        self.endpoints = endpoints
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_ms = hedge_default_ms
+        self.hedge_min_ms = hedge_min_ms
+        self.hedge_max_ms = hedge_max_ms
+
+    def get_endpoints(self):
+        """Healthy endpoints in preference order, then ejected ones as a last resort."""
+        healthy = [endpoint for endpoint in self.endpoints if endpoint.is_healthy()]
+        return healthy + [endpoint for endpoint in self.endpoints if endpoint not in healthy]
+
+    def get_hedge_delay_s(self, endpoint: LLMEndpoint):
+        latency_ms = endpoint.get_first_token_percentile(self.hedge_percentile)
+        if latency_ms is None:
+            latency_ms = self.hedge_default_ms
+        return min(max(latency_ms, self.hedge_min_ms), self.hedge_max_ms) / 1000
+
+    async def stream(self, messages: list, model: str):
+        """Yields content tokens from whichever endpoint answers first."""
+        candidates = self.get_endpoints()
+        attempts = [Attempt(candidates.pop(0), messages, model)]
+        hedge_reason = None
+        winner = None
+        first_item = None
+        last_error = None
+
+        try:
+            while winner is None:
+                # Hedge once, and only onto a healthy endpoint. Ejected ones are kept for failover.
+                can_hedge = self.hedge and len(attempts) == 1 and candidates and candidates[0].is_healthy()
+                delay = self.get_hedge_delay_s(attempts[0].endpoint) if can_hedge else None
+                done, _ = await asyncio.wait([attempt.first for attempt in attempts], timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # Slow first token, race the next endpoint against it.
+                    hedge_reason = hedge_reason or "slow"
+                    attempts.append(Attempt(candidates.pop(0), messages, model))
+                    continue
+
+                for attempt in list(attempts):
+                    if not attempt.first.done():
+                        continue
+                    item = attempt.first.result()
+                    if isinstance(item, Exception):
+                        last_error = item
+                        attempt.endpoint.record_failure()
+                        LLM_ENDPOINT_REQUESTS.inc(1, attempt.endpoint.name, "error")
+                        logger.error(f"LLM ENDPOINT ERROR: {attempt.endpoint.name}: {item}")
+                        attempts.remove(attempt)
+                    elif winner is None:
+                        winner, first_item = attempt, item
+
+                if winner is None and not attempts:
+                    if not candidates:
+                        raise last_error
+                    hedge_reason = hedge_reason or "failover"
+                    attempts.append(Attempt(candidates.pop(0), messages, model))
+
+            winner.endpoint.record_first_token(winner.elapsed_ms())
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.cancel()
+                    LLM_ENDPOINT_REQUESTS.inc(1, attempt.endpoint.name, "lost")
+                    # Only the endpoint that was hedged against was slow, the other simply started later.
+                    if attempt.started_at < winner.started_at:
+                        attempt.endpoint.record_failure(slow_ms=attempt.elapsed_ms())
+            if hedge_reason:
+                LLM_HEDGES.inc(1, hedge_reason, winner.endpoint.name)
+            attempts = [winner]
+
+            item = first_item
+            while item is not END:
+                if isinstance(item, Exception):
+                    winner.endpoint.record_failure()
+                    LLM_ENDPOINT_REQUESTS.inc(1, winner.endpoint.name, "error")
+                    raise item
+                yield item
+                item = await winner.tokens.get()
+
+            LLM_ENDPOINT_REQUESTS.inc(1, winner.endpoint.name, "ok")
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def complete(self, messages: list, model: str, **kwargs):
+        """Non-streamed completion, failing over through the endpoints in order. Returns the text."""
+        last_error = None
+        for endpoint in self.get_endpoints():
+            try:
+                response = await endpoint.client_pool.get().chat.completions.create(model=endpoint.model or model, messages=messages, **kwargs)
+                return response.choices[0].message.content
+            except Exception as e:
+                last_error = e
+                endpoint.record_failure()
+                logger.error(f"LLM ENDPOINT ERROR: {endpoint.name}: {e}")
+        raise last_error
+
+    async def warm(self):
+        for endpoint in self.endpoints:
+            await endpoint.client_pool.warm()
+
+    async def close(self):
+        for endpoint in self.endpoints:
+            await endpoint.client_pool.close()
+
+
+@lru_cache
+def get_llm_router():
+    endpoint_args = dict(failure_threshold=settings.LLM_ENDPOINT_FAILURE_THRESHOLD, eject_s=settings.LLM_ENDPOINT_EJECT_S)
+    endpoints = [LLMEndpoint("primary", get_llm_client_pool(), **endpoint_args)]
+    if settings.LLM_FALLBACK_BASE_URL:
+        fallback_pool = LLMClientPool(settings.LLM_CLIENT_SHARDS, settings.LLM_FALLBACK_BASE_URL, settings.LLM_FALLBACK_API_KEY or None)
+        endpoints.append(LLMEndpoint("fallback", fallback_pool, settings.LLM_FALLBACK_MODEL, **endpoint_args))
+
+    return LLMRouter(
+        endpoints,
+        hedge=settings.LLM_HEDGE_ENABLED,
+        hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+        hedge_default_ms=settings.LLM_HEDGE_DEFAULT_DELAY_MS,
+        hedge_min_ms=settings.LLM_HEDGE_MIN_DELAY_MS,
+        hedge_max_ms=settings.LLM_HEDGE_MAX_DELAY_MS,
+    )
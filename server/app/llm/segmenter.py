@@ -0,0 +1,204 @@
+import re
+
+
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "vs", "etc", "e.g", "i.e", "approx",
+    "no", "inc", "ltd", "co", "corp", "dept", "est", "fig", "jan", "feb", "mar", "apr", "jun",
+    "jul", "aug", "sep", "sept", "oct", "nov", "dec", "a.m", "p.m", "u.s",
+}
+SENTENCE_ENDINGS = {".", "!", "?", ";", ":"}
+CLAUSE_ENDINGS = {",", "—", "–", "-", ")"}
+# Characters that may sit between the punctuation and the whitespace that confirms the boundary.
+CLOSERS = {"\"", "'", ")", "]", "”", "’", "*", "_", "`"}
+
+MARKDOWN_PATTERNS = (
+    (re.compile(r"\[([^\]]*)\]\([^)]*\)"), r"\1"),     # [text](url) -> text
+    (re.compile(r"^\s*#{1,6}\s+", re.MULTILINE), ""),   # headings
+    (re.compile(r"^\s*(?:[-*+]|\d+\.)\s+", re.MULTILINE), ""),  # list markers
+    (re.compile(r"(\*\*|__|\*|`)"), ""),                # emphasis and code spans
+)
+
+
+def clean_markdown(text: str):
+    for pattern, replacement in MARKDOWN_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return " ".join(text.split())
+
+
+class SentenceSegmenter:
+    """
+    Incrementally splits streamed LLM tokens into chunks for TTS.
+
+    The first chunk of a response is cut at the first clause or sentence boundary past
+    `first_min_chars` to get audio started early. Later chunks wait for a sentence boundary past
+    `min_chars` so the TTS gets enough context for natural prosody. Any chunk running past its
+    max length is cut at the last space. A boundary is only confirmed once whitespace follows the
+    punctuation, so decimals, hyphenated words and URLs never split.
+    """
+
+    def __init__(self, first_min_chars: int = 4, first_max_chars: int = 40, min_chars: int = 60, max_chars: int = 220):
+        self.first_min_chars = first_min_chars
+        self.first_max_chars = first_max_chars
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.reset()
+
+    def reset(self):
+        self.parts: list = []                   # Tokens not yet emitted, joined only when a chunk is cut
+        self.offset: int = 0                    # Stream position where `parts` starts
+        self.total: int = 0                     # Stream position after the last pushed token
+        self.is_first_chunk: bool = True
+
+        self.word: list = []                    # Characters of the word being read
+        self.is_line_start: bool = True         # Current word is the first one on its line
+        self.pending_boundary = None            # "sentence" or "clause" awaiting whitespace to confirm it
+        self.pending_boundary_at: int = 0       # Stream position right after the punctuation
+        self.pending_word: str = ""             # Word the pending punctuation ended
+        self.last_space_at: int = 0             # Stream position after the last whitespace, for forced cuts
+
+    def push(self, text: str):
+        """Feed one streamed token. Returns the chunks that became ready, possibly none."""
+        chunks = []
+        start = self.total
+        self.parts.append(text)
+        self.total += len(text)
+
+        for i, char in enumerate(text):
+            position = start + i
+
+            if char.isspace():
+                if self.pending_boundary and self.confirm_boundary():
+                    self.emit(self.pending_boundary_at, chunks)
+                # The word just read would take the chunk past its max, cut before it. Checked per word
+                # so a token carrying many words still never yields an oversize chunk.
+                if position - self.offset > self.get_max_chars() and self.last_space_at > self.offset:
+                    self.emit(self.last_space_at, chunks)
+
+                if char == "\n":
+                    if self.should_emit("line", position + 1):
+                        self.emit(position + 1, chunks)
+                    self.is_line_start = True
+                elif self.word:
+                    self.is_line_start = False
+
+                self.word = []
+                self.pending_boundary = None
+                self.last_space_at = position + 1
+                continue
+
+            if char in SENTENCE_ENDINGS or char in CLAUSE_ENDINGS:
+                self.pending_boundary = "sentence" if char in SENTENCE_ENDINGS else "clause"
+                self.pending_boundary_at = position + 1
+                self.pending_word = "".join(self.word).lower()
+                # Hyphens only separate clauses when spaced out, as in "yes - maybe".
+                if char == "-" and self.word:
+                    self.pending_boundary = None
+            elif self.pending_boundary and char in CLOSERS:
+                self.pending_boundary_at = position + 1
+            else:
+                self.pending_boundary = None
+
+            self.word.append(char)
+
+        if self.total - self.offset > self.get_max_chars() and self.last_space_at > self.offset:
+            self.emit(self.last_space_at, chunks)
+
+        return chunks
+
+    def get_max_chars(self):
+        return self.first_max_chars if self.is_first_chunk else self.max_chars
+
+    def flush(self):
+        """End of response. Returns whatever is left, or an empty string."""
+        chunk = clean_markdown("".join(self.parts))
+        self.reset()
+        return chunk
+
+    def confirm_boundary(self):
+        if self.pending_boundary == "sentence":
+            word = self.pending_word.rstrip(".")
+            # "Dr. Smith", "e.g. this", "J. Doe", and markdown list markers like "1. item".
+            if word in ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                return False
+            if self.is_line_start and word.isdigit():
+                return False
+
+        return self.should_emit(self.pending_boundary, self.pending_boundary_at)
+
+    def should_emit(self, boundary: str, end: int):
+        length = end - self.offset
+        # Line breaks end list items and paragraphs, always worth a pause.
+        if self.is_first_chunk or boundary == "line":
+            return length >= self.first_min_chars
+        if boundary == "clause":
+            # Long clauses in later chunks are still worth cutting before the forced max.
+            return length >= self.max_chars // 2
+        return length >= self.min_chars
+
+    def emit(self, end: int, chunks: list):
+        buffer = "".join(self.parts)
+        split_at = end - self.offset
+        chunk = clean_markdown(buffer[:split_at])
+        rest = buffer[split_at:]
+
+        self.parts = [rest] if rest else []
+        self.offset = end
+        self.pending_boundary = None
+
+        if chunk:
+            chunks.append(chunk)
+            self.is_first_chunk = False
+
+
+class WordChunker:
+    """
+    Streams LLM tokens to TTS word by word instead of sentence by sentence.
+
+    Tokens are passed on up to the last whitespace seen, so every piece ends on a word boundary
+    with a trailing space, as ElevenLabs' stream-input expects. The provider then decides when to
+    generate from its chunk_length_schedule. With `flush_first_clause`, the piece that completes the
+    first clause of a response (past `first_min_chars`) is marked for a flush so audio starts as
+    early as in sentence mode; everything after it streams. Markdown emphasis and code markers are
+    dropped on the way, since full markdown cleanup needs the whole sentence.
+    """
+
+    STRIPPED = str.maketrans("", "", "*`")
+
+    def __init__(self, flush_first_clause: bool = True, first_min_chars: int = 4):
+        self.flush_first_clause = flush_first_clause
+        self.first_min_chars = first_min_chars
+        self.reset()
+
+    def reset(self):
+        self.parts: list = []
+        self.sent_chars: int = 0
+        self.is_first_clause: bool = self.flush_first_clause
+
+    def push(self, text: str):
+        """Feed one streamed token. Returns (text ready to send, possibly empty, and whether to flush after it)."""
+        text = text.translate(WordChunker.STRIPPED)
+        last_space = max(text.rfind(" "), text.rfind("\n"))
+        if last_space == -1:
+            self.parts.append(text)
+            return "", False
+
+        self.parts.append(text[:last_space + 1])
+        ready = " ".join("".join(self.parts).split())
+        self.parts = [text[last_space + 1:]]
+        if not ready:
+            return "", False
+
+        self.sent_chars += len(ready) + 1
+        flush = False
+        if self.is_first_clause and self.sent_chars > self.first_min_chars:
+            last_word = ready.rsplit(" ", 1)[-1].rstrip("".join(CLOSERS))
+            if last_word and last_word[-1] in SENTENCE_ENDINGS | CLAUSE_ENDINGS:
+                flush = True
+                self.is_first_clause = False
+        return f"{ready} ", flush
+
+    def flush(self):
+        """End of response. Returns the last word, or an empty string."""
+        rest = " ".join("".join(self.parts).split())
+        self.reset()
+        return f"{rest} " if rest else ""
@@ -1,41 +1,164 @@
 import asyncio
+import hmac
+import json
 import logging
+import uuid
 
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Header, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.agents.registry import get_agent_registry
+from app.audio.convert import INPUT_FORMATS, get_audio_format
+from app.core.config import get_settings
+from app.lib.log import setup_logging
+from app.lib.metrics import render_prometheus
+from app.lib.sessions import ADMIT, REDIRECT, get_session_registry
+from app.lib.timers import get_timer_wheel
+from app.lib.ws_pool import get_ws_pool
+from app.llm.router import get_llm_router
 from app.manager.task_manager import TaskManager
+from app.recording.recorder import get_recording_manager
+from app.transcriber import deepgram
+from app.tts import elevenlabs
+from app.tts.fillers import get_filler_bank
 
 
 load_dotenv(override=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
-
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_QUEUE_MAXSIZE)
 
 
-@app.websocket("/ws/chat/{agent_id}")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    agent_registry = get_agent_registry()
+    if settings.FILLER_ENABLED:
+        # Render every agent's fillers in the default output format as it is compiled.
+        filler_bank = get_filler_bank()
+        output_format = get_audio_format(settings.AUDIO_OUTPUT_FORMAT)
+        agent_registry.add_load_listener(lambda agent_config: filler_bank.prepare(agent_config, output_format))
+    await agent_registry.start()
+    
+    ws_pool = get_ws_pool()
+    ws_pool.start()
+    
+    # Open provider sockets for the default agent and call settings before the first call arrives.
+    default_agent = agent_registry.get_default()
+    deepgram.warm_connection_pool(get_audio_format(settings.AUDIO_INPUT_FORMAT, INPUT_FORMATS), default_agent.stt_params)
+    elevenlabs.warm_connection_pool(default_agent.voice_id, default_agent.voice_model_id, dict(default_agent.voice_settings))
+    
+    llm_router = get_llm_router()
+    await llm_router.warm()
+    
+    session_registry = get_session_registry()
+    session_registry.start()
+    
+    timer_wheel = get_timer_wheel()
+    timer_wheel.start()
+    
+    if settings.RECORDING_ENABLED:
+        get_recording_manager().start()
     
+    yield
     
-    agent_config = {
-        "max_call_duration_ms": 300000,
-    }
+    await session_registry.close()
+    await timer_wheel.close()
+    await agent_registry.close()
+    await ws_pool.close()
+    await llm_router.close()
+    if settings.RECORDING_ENABLED:
+        await get_recording_manager().close()
+    if settings.FILLER_ENABLED:
+        await get_filler_bank().close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/sessions")
+async def sessions():
+    return get_session_registry().get_state()
+
 
-    manager = TaskManager(agent_config, websocket=websocket)
+@app.get("/health/ready")
+async def ready():
+    # Load balancers stop sending calls to a worker that is full or draining.
+    session_registry = get_session_registry()
+    return JSONResponse(session_registry.get_state(), status_code=200 if session_registry.has_capacity() else 503)
+
+
+def check_admin_token(authorization: str):
+    # Without a configured token the admin endpoints are off, rather than open to anyone who can reach the worker.
+    expected = f"Bearer {settings.ADMIN_TOKEN}"
+    if not settings.ADMIN_TOKEN or not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.post("/sessions/drain")
+async def drain(wait_s: float = 0, authorization: str = Header(default="")):
+    """Stop admitting calls, optionally waiting up to `wait_s` for the running ones to end."""
+    check_admin_token(authorization)
+    session_registry = get_session_registry()
+    session_registry.drain()
+    drained = await session_registry.wait_drained(wait_s) if wait_s else not session_registry.sessions
+    return {**session_registry.get_state(), "drained": drained}
+
+
+@app.websocket("/ws/chat/{agent_id}")
+async def websocket_endpoint(websocket: WebSocket, agent_id: str):
+    # Clients pick their audio formats with ?input_format=ulaw_8000&output_format=ulaw_8000
+    try:
+        input_format = get_audio_format(websocket.query_params.get("input_format", settings.AUDIO_INPUT_FORMAT), INPUT_FORMATS)
+        output_format = get_audio_format(websocket.query_params.get("output_format", settings.AUDIO_OUTPUT_FORMAT))
+    except ValueError as e:
+        logger.error(f"AUDIO FORMAT NEGOTIATION ERROR: {e}")
+        await websocket.close(code=1003, reason=str(e))
+        return
+    
+    # Compiled at startup or on the agent's first call, so this is a dict lookup.
+    agent_config = await get_agent_registry().get(agent_id)
+    
+    call_id = str(uuid.uuid4())
+    session_registry = get_session_registry()
+    admission, peer_url = session_registry.admit(call_id, agent_id)
+    
+    if admission == REDIRECT:
+        # Tell the client where to reconnect, then close with "try again later".
+        await websocket.accept()
+        await websocket.send_text(json.dumps({"type": "redirect", "url": f"{peer_url}{websocket.url.path}?{websocket.url.query}"}))
+        await websocket.close(code=1013)
+        return
+    if admission != ADMIT:
+        logger.info(f"Worker at capacity, rejected call for agent {agent_id}")
+        await websocket.close(code=1013)
+        return
+    
+    try:
+        await websocket.accept()
+    except Exception:
+        session_registry.remove(call_id)
+        raise
+    
+    manager = None
     manager_task = None
     try:
+        manager = TaskManager(agent_config, websocket=websocket, call_id=call_id, agent_id=agent_config.agent_id, input_format=input_format, output_format=output_format)
         manager_task = asyncio.create_task(manager.run())
         await manager_task
     except WebSocketDisconnect:
         logger.info("WebSocket connection closed")
     finally:
-        await manager.cleanup()
+        # The capacity slot is freed even if the manager failed to build.
+        if manager:
+            await manager.cleanup()
+        session_registry.remove(call_id)
         logger.info("Task manager cleaned up")
\ No newline at end of file
@@ -1,32 +1,79 @@
 import asyncio
 import logging
+import time
+import uuid
 
+from functools import partial
+
+from app.agents.registry import AgentConfig
+from app.core.config import get_settings
 from app.llm.groq import GroqLLM
 from app.tts.elevenlabs import ElevenLabsTTS
 from app.transcriber.deepgram import DeepgramTranscriber
+from app.tts.fillers import FillerBank, get_filler_bank
 from app.io_handler.ws import WebsocketIOHandler
-from app.lib.constants import DEFAULT_SYSTEM_PROMPT
+from app.audio.convert import INPUT_FORMATS, AudioFormat, get_audio_format
+from app.lib.log import bind_call_context
+from app.lib.metrics import BARGE_IN_TIME_TO_SILENCE_MS, TurnLatencyRecorder
+from app.lib.queues import BLOCK, COALESCE, DROP_OLDEST, PipelineQueue, coalesce_audio
+from app.lib.timers import CallTimeouts, get_timer_wheel
+from app.lib.utils import clear_queue
+from app.llm.memory import ConversationMemory
+from app.recording.recorder import CallRecorder, get_recording_manager
 
 from fastapi import WebSocket
 
+settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
 class TaskManager:
-    def __init__(self, agent_config, **kwargs):
-        self.audio_queue = asyncio.Queue()
-        self.transcriber_output_queue = asyncio.Queue()
-        self.llm_output_queue = asyncio.Queue()
-        self.synthesizer_output_queue = asyncio.Queue()
+    def __init__(self, agent_config: AgentConfig, **kwargs):
+        self.audio_queue = PipelineQueue("audio", settings.AUDIO_QUEUE_MAXSIZE, DROP_OLDEST)
+        self.transcriber_output_queue = PipelineQueue("transcriber", settings.TRANSCRIBER_QUEUE_MAXSIZE, BLOCK)
+        self.llm_output_queue = PipelineQueue("llm", settings.LLM_QUEUE_MAXSIZE, BLOCK)
+        # Merged chunks stay within the smallest playback target, so pacing still sends them a bit at a time.
+        merge_audio = partial(coalesce_audio, max_duration_ms=settings.PLAYBACK_MIN_DEPTH_MS)
+        self.synthesizer_output_queue = PipelineQueue("synthesizer", settings.SYNTHESIZER_QUEUE_MAXSIZE, COALESCE, merge=merge_audio)
         
         self.kwargs: dict = kwargs
-        self.agent_config: dict = agent_config
+        self.agent_config: AgentConfig = agent_config
         
-        # Auto end call if the call duration exceeds the maximum call duration. Default is 2 hours.
-        self.max_call_duration_ms: int = agent_config.get("max_call_duration_ms", 7200000)
+        # Ends the call past the agent's maximum duration, or when the caller, the agent or the
+        # transcriber has gone quiet for too long. Components report activity as it happens.
+        self.timeouts = CallTimeouts(
+            get_timer_wheel(),
+            self.end_call_on_timeout,
+            max_duration_s=agent_config.max_call_duration_ms / 1000,
+            caller_silence_s=settings.CALL_CALLER_SILENCE_TIMEOUT_S,
+            agent_stall_s=settings.CALL_AGENT_STALL_TIMEOUT_S,
+            provider_idle_s=settings.CALL_PROVIDER_IDLE_TIMEOUT_S,
+        )
         
         self.websocket: WebSocket = kwargs.get("websocket", None)
         
+        self.call_id: str = kwargs.get("call_id") or str(uuid.uuid4())
+        self.agent_id: str = kwargs.get("agent_id", agent_config.agent_id)
+        self.input_format: AudioFormat = kwargs.get("input_format", get_audio_format(settings.AUDIO_INPUT_FORMAT, INPUT_FORMATS))
+        self.output_format: AudioFormat = kwargs.get("output_format", get_audio_format(settings.AUDIO_OUTPUT_FORMAT))
+        self.turn_latency = TurnLatencyRecorder(self.call_id, self.agent_id)
+        
+        # Filler clips for this agent's voice, synthesized in the background if this is the first call to need them.
+        self.filler_bank: FillerBank = None
+        if settings.FILLER_ENABLED:
+            self.filler_bank = get_filler_bank()
+            self.filler_bank.prepare(agent_config, self.output_format)
+        
+        # Both audio legs and the transcripts, written by the worker's recording thread.
+        self.recorder: CallRecorder = None
+        if settings.RECORDING_ENABLED:
+            self.recorder = get_recording_manager().create_recorder(self.call_id, {
+                "agent_id": self.agent_id,
+                "agent_version": agent_config.version,
+                "input_format": self.input_format.name,
+                "output_format": self.output_format.name,
+            })
+        
         self.io_handler = None
         self.llm = None
         self.transcriber = None
@@ -36,13 +83,15 @@ class TaskManager:
         self.stt_task = None
         self.llm_task = None
         self.tts_task = None
-        self.call_timeout_task = None
         self.tasks = []
+        # When local VAD last heard the caller start speaking, the start of a barge-in.
+        self.speech_started_at: float = None
         
-        self.messages = [{
-            "role": "system",
-            "content": DEFAULT_SYSTEM_PROMPT
-        }]
+        self.memory = ConversationMemory(
+            agent_config.system_prompt,
+            token_budget=settings.LLM_CONTEXT_TOKEN_BUDGET,
+            min_recent_messages=settings.LLM_MIN_RECENT_MESSAGES,
+        )
         
         self.call_status = {
             "response_id": 0,
@@ -51,34 +100,90 @@ class TaskManager:
             "is_call_ended": False
         }
         
+        # Tasks started from here on log with this call's ids.
+        bind_call_context(self.call_id, self.agent_id, self.call_status)
+        
     async def end_call(self):
         self.call_status["is_call_ended"] = True
         self.call_status["is_agent_speaking"] = False
         self.call_status["is_callee_speaking"] = False
         await self.websocket.close()
     
-    # End the call if the call duration exceeds the maximum call duration
-    async def end_call_on_timeout(self):
-        await asyncio.sleep(self.max_call_duration_ms / 1000)
+    async def handle_interruption(self):
+        # Without local VAD the interruption is only known once the transcript arrives.
+        interrupted_at = self.speech_started_at or time.monotonic()
+        self.speech_started_at = None
+        
+        is_response_in_flight = (
+            self.io_handler.is_playing()
+            or (self.llm.generation_task is not None and not self.llm.generation_task.done())
+            or not self.llm_output_queue.empty()
+            or not self.synthesizer_output_queue.empty()
+        )
+        
+        # Every queued item tagged with an older response id is now stale and gets dropped downstream.
+        self.call_status["response_id"] += 1
+        self.call_status["is_agent_speaking"] = False
+        
+        if not is_response_in_flight:
+            return
+        
+        self.llm.interrupt()
+        clear_queue(self.llm_output_queue)
+        clear_queue(self.synthesizer_output_queue)
+        await self.io_handler.clear_buffer()
+        
+        time_to_silence_ms = (time.monotonic() - interrupted_at) * 1000
+        BARGE_IN_TIME_TO_SILENCE_MS.observe(time_to_silence_ms)
+        logger.info(f"Caller interrupted response {self.call_status['response_id'] - 1}, clear sent {time_to_silence_ms:.1f}ms after they started speaking")
+        
+        # Reconnecting the synthesizer takes a handshake, it happens in the background.
+        self.synthesizer.interrupt()
+    
+    async def handle_end_of_turn(self):
+        # Mask a slow response with a filler. The turn's text is queued, so the response id is final.
+        clips = self.filler_bank.get(self.agent_config, self.output_format) if self.filler_bank else None
+        if clips:
+            self.io_handler.schedule_filler(clips, self.call_status["response_id"])
+    
+    async def handle_speech_start(self):
+        self.call_status["is_callee_speaking"] = True
+        self.speech_started_at = time.monotonic()
+        self.timeouts.caller_active()
+    
+    async def handle_speech_end(self):
+        self.call_status["is_callee_speaking"] = False
+        # Start the turn on local silence instead of waiting out the provider's endpointing window.
+        # If the caller carries on, their next transcript interrupts the response like any barge-in.
+        await self.transcriber.finalize()
+    
+    async def end_call_on_timeout(self, reason: str):
+        if self.call_status["is_call_ended"]:
+            return
+        logger.info(f"Call timed out ({reason}), ending call")
         await self.end_call()
-        logger.info(f"Maxium call duration reached. Call ended after {self.max_call_duration_ms / 1000}s.")
 
     async def run(self):
         try:
-            self.io_handler = WebsocketIOHandler(self.audio_queue, self.synthesizer_output_queue, websocket=self.websocket, messages=self.messages, call_status=self.call_status)
-            self.transcriber = DeepgramTranscriber(self.audio_queue, self.transcriber_output_queue, call_status=self.call_status)
-            self.llm = GroqLLM(self.transcriber_output_queue, self.llm_output_queue, messages=self.messages, call_status=self.call_status)
-            self.synthesizer = ElevenLabsTTS(self.llm_output_queue, self.synthesizer_output_queue, call_status=self.call_status)
+            self.io_handler = WebsocketIOHandler(self.audio_queue, self.synthesizer_output_queue, websocket=self.websocket, input_format=self.input_format, memory=self.memory, call_status=self.call_status, turn_latency=self.turn_latency, timeouts=self.timeouts, recorder=self.recorder, on_speech_start=self.handle_speech_start, on_speech_end=self.handle_speech_end)
+            self.transcriber = DeepgramTranscriber(self.audio_queue, self.transcriber_output_queue, input_format=self.input_format, stt_params=self.agent_config.stt_params, call_status=self.call_status, on_interrupt=self.handle_interruption, on_end_of_turn=self.handle_end_of_turn, turn_latency=self.turn_latency, timeouts=self.timeouts)
+            self.llm = GroqLLM(self.transcriber_output_queue, self.llm_output_queue, model=self.agent_config.llm_model, agent_config=self.agent_config, memory=self.memory, call_status=self.call_status, turn_latency=self.turn_latency, recorder=self.recorder)
+            self.synthesizer = ElevenLabsTTS(self.llm_output_queue, self.synthesizer_output_queue, output_format=self.output_format, voice_id=self.agent_config.voice_id, model_id=self.agent_config.voice_model_id, voice_settings=dict(self.agent_config.voice_settings), call_status=self.call_status, turn_latency=self.turn_latency)
             
             await asyncio.gather(self.transcriber.establish_connection(), self.synthesizer.establish_connection())
             
+            if self.agent_config.greeting:
+                # The agent speaks first. Short greetings come out of the phrase cache after the first call.
+                await self.llm_output_queue.put({"text": self.agent_config.greeting, "response_id": self.call_status["response_id"]})
+                self.transcriber.allow_interruption()
+            
             self.io_task = asyncio.create_task(self.io_handler.run())
             self.stt_task = asyncio.create_task(self.transcriber.transcribe())
             self.llm_task = asyncio.create_task(self.llm.run())
             self.tts_task = asyncio.create_task(self.synthesizer.synthesize())
-            self.call_timeout_task = asyncio.create_task(self.end_call_on_timeout())
+            self.timeouts.start()
 
-            self.tasks = [self.io_task, self.stt_task, self.llm_task, self.tts_task, self.call_timeout_task]
+            self.tasks = [self.io_task, self.stt_task, self.llm_task, self.tts_task]
             await asyncio.gather(*self.tasks)
         except Exception as e:
             logger.error(f"TASK MANAGER ERROR: {e}", exc_info=True)
@@ -98,7 +203,12 @@ class TaskManager:
         if self.io_handler:
             cleanup_tasks.append(self.io_handler.close_connection())
         
+        self.timeouts.cancel()
         await asyncio.gather(*cleanup_tasks)
+        self.turn_latency.close()
+        self.memory.close()
+        if self.recorder:
+            get_recording_manager().close_recorder(self.recorder)
         
         for task in self.tasks:
             if task is not None:
@@ -0,0 +1,342 @@
+"""
+Call recordings: both audio legs plus transcripts, written without touching disk on the event loop.
+
+A call's CallRecorder packs records into an in-memory batch on the event loop. Full batches, and
+every batch once per flush interval, are handed to the worker's RecordingWriter thread, which appends
+them to the call's file in one write each. A recording is a single append-only file:
+
+    header   magic, u32 metadata length, metadata JSON (call, agent, audio formats, start time)
+    records  u8 kind, u32 response id, u64 microseconds since the call started, u32 length, payload
+    index    an INDEX record holding the turn index as JSON: role, response id, offset, timestamp
+    footer   u64 offset of the INDEX record, end magic
+
+The file is named .rec.part until the footer is written. A recording without a footer (the worker
+died mid-call) is still readable, RecordingReader rebuilds the index by scanning its records.
+"""
+import asyncio
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+
+from functools import lru_cache
+from typing import NamedTuple
+
+from app.core.config import get_settings
+from app.lib import codec
+from app.lib.metrics import CallbackGauge, CounterVec, Histogram, register
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CVREC\x00\x01\x00"
+END_MAGIC = b"CVRECEND"
+METADATA_LENGTH = struct.Struct("<I")
+RECORD_HEADER = struct.Struct("<BIQI")
+FOOTER = struct.Struct("<Q8s")
+
+# Record kinds.
+INBOUND_AUDIO = 1       # Caller audio as received
+OUTBOUND_AUDIO = 2      # Agent audio as sent to the caller
+USER_TEXT = 3           # Final transcript of a caller turn
+ASSISTANT_TEXT = 4      # Text of the agent audio that was sent
+INDEX = 5
+
+AUDIO_KINDS = (INBOUND_AUDIO, OUTBOUND_AUDIO)
+TEXT_ROLES = {USER_TEXT: "user", ASSISTANT_TEXT: "assistant"}
+
+RECORDING_BYTES_WRITTEN = register(CounterVec(
+    "recording_bytes_written_total",
+    "Bytes appended to call recordings by the writer thread.",
+))
+RECORDING_DROPPED = register(CounterVec(
+    "recording_dropped_total",
+    "Audio records left out of recordings because the writer thread was too far behind, by kind.",
+    ("kind",),
+))
+RECORDING_WRITE_MS = register(Histogram(
+    "recording_write_ms",
+    "Time the writer thread took to append one batch.",
+))
+
+
+class Turn(NamedTuple):
+    role: str               # "user" or "assistant"
+    response_id: int
+    offset: int             # Of the turn's first record
+    timestamp_ms: float
+
+
+class Record(NamedTuple):
+    kind: int
+    response_id: int
+    timestamp_ms: float
+    payload: memoryview
+    offset: int
+
+
+class RecordingWriter:
+    """
+    Appends batches to recording files from one background thread, shared by every call on the
+    worker. Pending bytes are bounded: past `max_pending_bytes`, recorders drop audio records rather
+    than let a slow disk grow memory without limit. Text, index and footer records are never dropped.
+    """
+
+    def __init__(self, max_pending_bytes: int):
+        self.max_pending_bytes = max_pending_bytes
+        self.pending_bytes: int = 0
+        self.lock = threading.Lock()
+        self.jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread: threading.Thread = None
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name="recording-writer", daemon=True)
+            self.thread.start()
+
+    def has_room(self, size: int):
+        return self.pending_bytes + size <= self.max_pending_bytes
+
+    def submit(self, path: str, data: bytes, final_path: str = None):
+        """Append `data` to `path`; with `final_path`, close the file and rename it afterwards."""
+        with self.lock:
+            self.pending_bytes += len(data)
+        self.jobs.put((path, data, final_path))
+
+    def run(self):
+        files = {}
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+
+            path, data, final_path = job
+            started_at = time.perf_counter()
+            try:
+                f = files.get(path)
+                if f is None:
+                    f = files[path] = open(path, "ab", buffering=0)
+                if data:
+                    f.write(data)
+                if final_path:
+                    files.pop(path).close()
+                    os.replace(path, final_path)
+            except Exception as e:
+                logger.error(f"RECORDING WRITE ERROR: {path}: {e}")
+                if path in files and final_path:
+                    files.pop(path).close()
+            finally:
+                with self.lock:
+                    self.pending_bytes -= len(data)
+
+            RECORDING_BYTES_WRITTEN.inc(len(data))
+            RECORDING_WRITE_MS.observe((time.perf_counter() - started_at) * 1000)
+
+        for f in files.values():
+            f.close()
+
+    async def close(self):
+        """Write everything already submitted, then stop the thread."""
+        if self.thread is not None:
+            self.jobs.put(None)
+            await asyncio.to_thread(self.thread.join)
+            self.thread = None
+
+
+class CallRecorder:
+    """
+    Records one call. Every record_* method only appends to the in-memory batch; offsets in the turn
+    index are known up front since the file is only ever appended to by this recorder.
+    """
+
+    def __init__(self, writer: RecordingWriter, directory: str, call_id: str, metadata: dict, batch_bytes: int = 262144):
+        self.writer = writer
+        self.batch_bytes = batch_bytes
+        self.final_path = os.path.join(directory, f"{call_id}.rec")
+        self.path = f"{self.final_path}.part"
+        self.started_at = time.monotonic()
+
+        metadata = codec.dumps({**metadata, "call_id": call_id, "started_at": time.time()}).encode()
+        self.batch = bytearray(MAGIC + METADATA_LENGTH.pack(len(metadata)) + metadata)
+        self.offset: int = len(self.batch)   # File offset the next record lands at
+        self.turns: list = []
+        self.closed = False
+
+    def record(self, kind: int, payload: bytes, response_id: int = 0):
+        if self.closed:
+            return
+        size = RECORD_HEADER.size + len(payload)
+        if kind in AUDIO_KINDS and not self.writer.has_room(len(self.batch) + size):
+            RECORDING_DROPPED.inc(1, str(kind))
+            return
+
+        timestamp_us = int((time.monotonic() - self.started_at) * 1e6)
+        if kind in TEXT_ROLES or kind == OUTBOUND_AUDIO:
+            self.index_turn("user" if kind == USER_TEXT else "assistant", response_id, timestamp_us / 1000)
+
+        self.batch += RECORD_HEADER.pack(kind, response_id, timestamp_us, len(payload))
+        self.batch += payload
+        self.offset += size
+        if len(self.batch) >= self.batch_bytes:
+            self.flush()
+
+    def index_turn(self, role: str, response_id: int, timestamp_ms: float):
+        # A new turn starts whenever the speaker or the response changes.
+        if self.turns and self.turns[-1].role == role and (role == "user" or self.turns[-1].response_id == response_id):
+            return
+        self.turns.append(Turn(role, response_id, self.offset, timestamp_ms))
+
+    def record_inbound(self, audio: bytes):
+        self.record(INBOUND_AUDIO, audio)
+
+    def record_outbound(self, audio: bytes, response_id: int):
+        self.record(OUTBOUND_AUDIO, audio, response_id)
+
+    def record_text(self, role: str, text: str, response_id: int):
+        self.record(USER_TEXT if role == "user" else ASSISTANT_TEXT, text.encode(), response_id)
+
+    def flush(self):
+        if self.batch:
+            self.writer.submit(self.path, bytes(self.batch))
+            self.batch.clear()
+
+    def close(self):
+        """Append the turn index and footer and hand the recording over to be finalized."""
+        if self.closed:
+            return
+        index_offset = self.offset
+        self.record(INDEX, codec.dumps([turn._asdict() for turn in self.turns]).encode())
+        self.batch += FOOTER.pack(index_offset, END_MAGIC)
+        self.closed = True
+
+        self.writer.submit(self.path, bytes(self.batch), final_path=self.final_path)
+        self.batch.clear()
+
+
+class RecordingManager:
+    """Creates per-call recorders and flushes every partial batch once per interval."""
+
+    def __init__(self, directory: str, max_pending_bytes: int, batch_bytes: int, flush_interval_s: float):
+        self.directory = directory
+        self.batch_bytes = batch_bytes
+        self.flush_interval_s = flush_interval_s
+        self.writer = RecordingWriter(max_pending_bytes)
+        self.recorders: set = set()
+        self.flush_task = None
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def start(self):
+        self.writer.start()
+        if self.flush_task is None:
+            self.flush_task = asyncio.create_task(self.flush_periodically())
+
+    def create_recorder(self, call_id: str, metadata: dict):
+        recorder = CallRecorder(self.writer, self.directory, call_id, metadata, self.batch_bytes)
+        self.recorders.add(recorder)
+        return recorder
+
+    def close_recorder(self, recorder: CallRecorder):
+        recorder.close()
+        self.recorders.discard(recorder)
+
+    async def flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_s)
+            for recorder in self.recorders:
+                recorder.flush()
+
+    async def close(self):
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        for recorder in list(self.recorders):
+            self.close_recorder(recorder)
+        await self.writer.close()
+
+
+class RecordingReader:
+    """
+    Memory-mapped view of a recording. Payloads are memoryviews into the map, so playing a turn
+    or a time range only pages in that part of the file.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a call recording")
+        metadata_length, = METADATA_LENGTH.unpack_from(self.map, len(MAGIC))
+        start = len(MAGIC) + METADATA_LENGTH.size
+        self.metadata: dict = codec.loads(self.map[start:start + metadata_length])
+        self.records_offset = start + metadata_length
+        self.end = len(self.map)
+        self.turns = self.read_index()
+
+    def read_index(self):
+        if self.end >= self.records_offset + FOOTER.size:
+            index_offset, end_magic = FOOTER.unpack_from(self.map, self.end - FOOTER.size)
+            if end_magic == END_MAGIC:
+                self.end = index_offset
+                kind, _, _, length = RECORD_HEADER.unpack_from(self.map, index_offset)
+                start = index_offset + RECORD_HEADER.size
+                return [Turn(**turn) for turn in codec.loads(self.map[start:start + length])]
+
+        # Unfinished recording, rebuild the index the way the recorder would have.
+        turns = []
+        for record in self.records():
+            if record.kind in TEXT_ROLES or record.kind == OUTBOUND_AUDIO:
+                role = "user" if record.kind == USER_TEXT else "assistant"
+                if turns and turns[-1].role == role and (role == "user" or turns[-1].response_id == record.response_id):
+                    continue
+                turns.append(Turn(role, record.response_id, record.offset, record.timestamp_ms))
+        return turns
+
+    def records(self, offset: int = None, end: int = None):
+        """Records from `offset` (a turn's offset, defaults to the first record) up to `end`."""
+        offset = self.records_offset if offset is None else offset
+        end = self.end if end is None else min(end, self.end)
+        view = memoryview(self.map)
+        while offset + RECORD_HEADER.size <= end:
+            kind, response_id, timestamp_us, length = RECORD_HEADER.unpack_from(self.map, offset)
+            start = offset + RECORD_HEADER.size
+            if kind == INDEX or start + length > end:
+                # A torn final write in an unfinished recording.
+                break
+            yield Record(kind, response_id, timestamp_us / 1000, view[start:start + length], offset)
+            offset = start + length
+
+    def turn_records(self, turn_index: int):
+        """Records from the start of a turn to the start of the next one."""
+        end = self.turns[turn_index + 1].offset if turn_index + 1 < len(self.turns) else None
+        return self.records(self.turns[turn_index].offset, end)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+@lru_cache
+def get_recording_manager():
+    manager = RecordingManager(
+        settings.RECORDING_DIR,
+        max_pending_bytes=settings.RECORDING_MAX_PENDING_BYTES,
+        batch_bytes=settings.RECORDING_BATCH_BYTES,
+        flush_interval_s=settings.RECORDING_FLUSH_INTERVAL_S,
+    )
+    register(CallbackGauge(
+        "recording_pending_bytes",
+        "Recording bytes handed to the writer thread and not yet written.",
+        lambda: manager.writer.pending_bytes,
+    ))
+    register(CallbackGauge(
+        "recordings_active",
+        "Calls currently being recorded.",
+        lambda: len(manager.recorders),
+    ))
+    return manager
@@ -1,34 +1,84 @@
 import asyncio
 import aiohttp
-import json
 import logging
 import websockets
 
+from urllib.parse import urlencode
+
+from app.audio.convert import RAW_ENCODINGS, WEBM, AudioFormat
 from app.core.config import get_settings
+from app.lib import codec
+from app.lib.metrics import CounterVec, TurnLatencyRecorder, register
+from app.lib.timers import CallTimeouts
+from app.lib.utils import normalize_transcript
+from app.lib.ws_pool import get_ws_pool
 
 
 settings = get_settings()
+ws_pool = get_ws_pool()
 logger = logging.getLogger(__name__)
 
 DEEPGRAM_API_KEY = settings.DEEPGRAM_API_KEY
 
+END_OF_TURN = register(CounterVec(
+    "end_of_turn_total",
+    "Caller turns handed to the LLM, by what ended them: Deepgram's speech_final or a finalize after local VAD silence.",
+    ("source",),
+))
+
+
+def get_pool_args(url: str):
+    """Pool key plus the connect and keepalive coroutines for a Deepgram listen socket."""
+    async def connect():
+        return await websockets.connect(
+            url,
+            extra_headers={
+                "Authorization": f"Token {DEEPGRAM_API_KEY}"
+            }
+        )
+    
+    async def keepalive(deepgram_ws):
+        # Deepgram closes a stream that sees neither audio nor KeepAlive for 10 seconds.
+        await deepgram_ws.send(codec.dumps({"type": "KeepAlive"}))
+    
+    return ("deepgram", url), connect, keepalive
+
+
+def warm_connection_pool(input_format: AudioFormat = WEBM, stt_params: tuple = ()):
+    ws_pool.warm(*get_pool_args(DeepgramTranscriber.get_deepgram_ws_url(input_format, stt_params)))
+
 
 class DeepgramTranscriber:
     def __init__(self, input_queue, output_queue, **kwargs):
         self.input_queue: asyncio.Queue = input_queue
         self.output_queue: asyncio.Queue = output_queue
+        self.input_format: AudioFormat = kwargs.get("input_format", WEBM)
+        # Extra listen parameters from the agent config, as (key, value) pairs.
+        self.stt_params: tuple = kwargs.get("stt_params", ())
         self.deepgram_ws = None
+        # A socket that never received audio is still clean and can go back to the pool.
+        self.has_sent_audio: bool = False
         self.sentence: str = ""
         
         self.sender_task = None
         self.receiver_task = None
         
         self.call_status = kwargs["call_status"]
+        self.on_interrupt = kwargs.get("on_interrupt", None)
+        self.on_end_of_turn = kwargs.get("on_end_of_turn", None)
+        self.turn_latency: TurnLatencyRecorder = kwargs["turn_latency"]
+        self.timeouts: CallTimeouts = kwargs["timeouts"]
         self.speech_final = False
+        self.is_finalize_pending: bool = False
+        # Interim results are only requested to let the LLM speculate on them.
+        self.is_speculating: bool = settings.LLM_SPECULATION_ENABLED
+        self.last_interim: str = ""
+        self.decoder = codec.DeepgramDecoder()
         
         self.is_call_ended: bool = False
      
-    def get_deepgram_ws_url(self):
+    @staticmethod
+    def get_deepgram_ws_url(input_format: AudioFormat = WEBM, stt_params: tuple = ()):
         # dg_params = {
         #     'model': "nova-2",
         #     'filler_words': 'true',
@@ -36,28 +86,32 @@ class DeepgramTranscriber:
         #     'vad_events' :'true'
         # }
         
-        # dg_params['encoding'] = "linear16"
-        # dg_params['sample_rate'] = 16000
-        # dg_params['channels'] = "1"
-        # dg_params['interim_results'] = 'true'
         # dg_params['utterance_end_ms'] = 1000
         # dg_params['endpointing'] = 400
+        
+        dg_params = dict(stt_params)
+        
+        # Raw audio has no header to detect, containers like the browser's webm are detected by Deepgram.
+        if input_format.encoding in RAW_ENCODINGS:
+            dg_params['encoding'] = input_format.encoding
+            dg_params['sample_rate'] = input_format.sample_rate
+            dg_params['channels'] = 1
+        
+        if settings.LLM_SPECULATION_ENABLED:
+            dg_params['interim_results'] = 'true'
 
-        ws = "wss://api.deepgram.com/v1/listen"  
+        ws = settings.DEEPGRAM_WS_URL
+        if dg_params:
+            ws += f"?{urlencode(dg_params)}"
         return ws
 
     async def establish_connection(self):
         try:
-            self.deepgram_ws = await websockets.connect(
-                self.get_deepgram_ws_url(),
-                extra_headers={
-                    "Authorization": f"Token {DEEPGRAM_API_KEY}"
-                }
-            )
+            self.deepgram_ws = await ws_pool.acquire(*get_pool_args(self.get_deepgram_ws_url(self.input_format, self.stt_params)))
             logger.info("Connected to Deepgram WebSocket")
         except Exception as e:
             async with aiohttp.ClientSession() as session:
-                async with session.get(self.get_deepgram_ws_url(), headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"}) as resp:
+                async with session.get(self.get_deepgram_ws_url(self.input_format, self.stt_params), headers={"Authorization": f"Token {DEEPGRAM_API_KEY}"}) as resp:
                     response_body = await resp.text()
                     logger.error(f"WebSocket connection rejected. Status: {resp.status}, Response: {response_body}")
         
@@ -68,31 +122,97 @@ class DeepgramTranscriber:
             try:
                 audio = await self.input_queue.get()
                 await self.deepgram_ws.send(audio)
+                self.has_sent_audio = True
             except Exception as e:
                 logger.error(f"DEEPGRAM SENDER ERROR: {e}")
     
+    async def finalize(self):
+        """Ask Deepgram to return the final transcript of the audio so far, without waiting for endpointing."""
+        if not self.deepgram_ws or not self.has_sent_audio:
+            return
+        
+        try:
+            self.is_finalize_pending = True
+            await self.deepgram_ws.send('{"type": "Finalize"}')
+        except Exception as e:
+            logger.error(f"DEEPGRAM FINALIZE ERROR: {e}")
+    
+    async def end_turn(self, source: str):
+        if self.sentence.strip() != "":
+            self.turn_latency.start_turn()
+            self.timeouts.turn_started()
+            await self.output_queue.put({
+                "text": self.sentence,
+                "response_id": self.call_status["response_id"],
+            })
+            END_OF_TURN.inc(1, source)
+            if self.on_end_of_turn:
+                await self.on_end_of_turn()
+        
+        self.speech_final = True
+        self.sentence = ""
+        self.last_interim = ""
+    
+    def allow_interruption(self):
+        """The agent is speaking without a caller turn before it, so the caller's next words interrupt it."""
+        self.speech_final = True
+    
+    async def send_hypothesis(self, data: codec.TranscriptMessage, transcript: str):
+        """Pass a stable hypothesis of the turn so far to the LLM to speculate on."""
+        if data.is_final:
+            if data.speech_final or data.from_finalize:
+                return
+            # A finalized segment is stable, though the caller may still carry on.
+            hypothesis = self.sentence
+        else:
+            # An interim is stable once Deepgram repeats it.
+            hypothesis = f"{self.sentence} {transcript}".strip()
+            normalized = normalize_transcript(hypothesis)
+            is_stable = normalized == self.last_interim
+            self.last_interim = normalized
+            if not is_stable:
+                return
+        
+        await self.output_queue.put({
+            "text": hypothesis,
+            "response_id": self.call_status["response_id"],
+            "is_interim": True,
+        })
+    
     async def receiver(self):
         async for message in self.deepgram_ws:
-            data: dict = json.loads(message)
+            # Deepgram answers all the audio it is sent, even silence; nothing at all means no audio is arriving.
+            self.timeouts.provider_active()
             
             try:
-                transcript: str = data["channel"]["alternatives"][0]["transcript"]
+                data = self.decoder.decode(message)
+                # SpeechStarted, UtteranceEnd and Metadata carry no transcript.
+                if data.type != "Results":
+                    continue
+                
+                transcript: str = data.transcript
                 
                 if transcript and transcript.strip() != "":
-                    self.sentence += transcript
+                    self.timeouts.caller_active()
+                    if data.is_final:
+                        self.sentence = f"{self.sentence} {transcript.strip()}".strip()
                     
+                    # Caller started speaking again after their last turn, interrupt whatever the agent is doing.
+                    # Awaited so the response id is bumped before this turn's text is queued.
                     if self.speech_final:
-                        self.call_status = self.call_status["response_id"] + 1
                         self.speech_final = False
-                        # Call interupt handler call back.
+                        if self.on_interrupt:
+                            await self.on_interrupt()
                     
-                if data["speech_final"]:
-                    if self.sentence.strip() != "":
-                        await self.output_queue.put(self.sentence)
-                
-                    self.speech_final = True
+                    if self.is_speculating:
+                        await self.send_hypothesis(data, transcript.strip())
                     
-                    self.sentence = ""
+                if data.speech_final:
+                    await self.end_turn("speech_final")
+                elif data.from_finalize and self.is_finalize_pending:
+                    # Local VAD heard the caller stop, so this is the end of their turn.
+                    self.is_finalize_pending = False
+                    await self.end_turn("vad")
             except Exception as e:
                 logger.error(f"DEEPGRAM RECEIVER ERROR: {e}")
             
@@ -105,9 +225,11 @@ class DeepgramTranscriber:
         self.is_call_ended = True
         
         if self.deepgram_ws:
+            key, _, _ = get_pool_args(self.get_deepgram_ws_url(self.input_format, self.stt_params))
             try:
-                await self.deepgram_ws.send('{"type": "CloseStream"}')
-                await self.deepgram_ws.close()
+                if self.has_sent_audio:
+                    await self.deepgram_ws.send('{"type": "CloseStream"}')
+                await ws_pool.release(key, self.deepgram_ws, reusable=not self.has_sent_audio)
             except Exception:
                 pass
             
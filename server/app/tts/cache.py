@@ -0,0 +1,185 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import struct
+
+from collections import OrderedDict
+from functools import lru_cache
+
+from app.core.config import get_settings
+from app.lib.metrics import CallbackGauge, CounterVec, register
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Disk entry layout: little-endian u32 header length, JSON header, raw audio bytes.
+HEADER_LENGTH = struct.Struct("<I")
+
+TTS_CACHE_LOOKUPS = register(CounterVec(
+    "tts_cache_lookups_total",
+    "Phrase cache lookups by result (memory hit, disk hit, miss).",
+    ("result",),
+))
+TTS_CACHE_BYTES_SAVED = register(CounterVec(
+    "tts_cache_bytes_saved_total",
+    "Audio bytes served from the phrase cache instead of the TTS provider.",
+))
+
+
+def normalize_text(text: str):
+    return " ".join(text.split())
+
+
+class PhraseCache:
+    """
+    Synthesized audio for short, repeated phrases. A byte-bounded in-memory LRU sits in front of
+    a directory of one file per phrase, shared by every worker on the host. Files are written
+    atomically and read whole off the event loop; workers share the OS page cache for them, so a
+    phrase read by one worker is usually served from memory to the others.
+    """
+
+    def __init__(self, directory: str, max_memory_bytes: int, max_disk_bytes: int, max_phrase_chars: int):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.max_phrase_chars = max_phrase_chars
+
+        self.entries: OrderedDict = OrderedDict()
+        self.memory_bytes: int = 0
+        self.writes_since_eviction: int = 0
+        self.write_tasks: set = set()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_key(self, text: str, voice_id: str, model_id: str, voice_settings: dict, output_format: str):
+        """Returns None for text that should not be cached."""
+        text = normalize_text(text)
+        if not text or len(text) > self.max_phrase_chars:
+            return None
+
+        payload = json.dumps([voice_id, model_id, voice_settings, output_format, text], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.record_hit("memory", entry)
+            return entry
+
+        entry = await asyncio.to_thread(self.read_from_disk, key)
+        if entry is None:
+            TTS_CACHE_LOOKUPS.inc(1, "miss")
+            return None
+
+        self.add_to_memory(key, entry)
+        self.record_hit("disk", entry)
+        return entry
+
+    def put(self, key: str, audio: bytes, text: str, duration_ms: float):
+        entry = {"audio": audio, "text": text, "duration_ms": duration_ms}
+        self.add_to_memory(key, entry)
+
+        # Persist in the background, the caller is usually the TTS receiver loop.
+        task = asyncio.create_task(self.persist(key, entry))
+        self.write_tasks.add(task)
+        task.add_done_callback(self.write_tasks.discard)
+
+    async def persist(self, key: str, entry: dict):
+        try:
+            await asyncio.to_thread(self.write_to_disk, key, entry)
+        except Exception as e:
+            logger.error(f"TTS CACHE WRITE ERROR: {e}")
+
+    def record_hit(self, result: str, entry: dict):
+        TTS_CACHE_LOOKUPS.inc(1, result)
+        TTS_CACHE_BYTES_SAVED.inc(len(entry["audio"]))
+
+    def add_to_memory(self, key: str, entry: dict):
+        if key in self.entries:
+            return
+
+        self.entries[key] = entry
+        self.memory_bytes += len(entry["audio"])
+
+        while self.memory_bytes > self.max_memory_bytes and self.entries:
+            _, evicted = self.entries.popitem(last=False)
+            self.memory_bytes -= len(evicted["audio"])
+
+    def get_path(self, key: str):
+        return os.path.join(self.directory, f"{key}.bin")
+
+    def read_from_disk(self, key: str):
+        path = self.get_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            (header_length,) = HEADER_LENGTH.unpack_from(data, 0)
+            header = json.loads(data[HEADER_LENGTH.size:HEADER_LENGTH.size + header_length])
+            audio = data[HEADER_LENGTH.size + header_length:]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"TTS CACHE READ ERROR: {e}")
+            return None
+
+        # Touch so that disk eviction keeps recently used phrases.
+        os.utime(path)
+        return {"audio": audio, "text": header["text"], "duration_ms": header["duration_ms"]}
+
+    def write_to_disk(self, key: str, entry: dict):
+        header = json.dumps({"text": entry["text"], "duration_ms": entry["duration_ms"]}).encode()
+        path = self.get_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+
+        with open(temp_path, "wb") as f:
+            f.write(HEADER_LENGTH.pack(len(header)) + header + entry["audio"])
+        # Atomic on POSIX, other workers either see the whole file or none of it.
+        os.replace(temp_path, path)
+
+        self.writes_since_eviction += 1
+        if self.writes_since_eviction >= 100:
+            self.writes_since_eviction = 0
+            self.evict_disk()
+
+    def evict_disk(self):
+        files = []
+        total_bytes = 0
+        for dir_entry in os.scandir(self.directory):
+            if dir_entry.name.endswith(".bin"):
+                stat = dir_entry.stat()
+                files.append((stat.st_mtime, stat.st_size, dir_entry.path))
+                total_bytes += stat.st_size
+
+        # Least recently used first.
+        for _, size, path in sorted(files):
+            if total_bytes <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def hit_rate(self):
+        hits = TTS_CACHE_LOOKUPS.get("memory") + TTS_CACHE_LOOKUPS.get("disk")
+        lookups = hits + TTS_CACHE_LOOKUPS.get("miss")
+        return hits / lookups if lookups else 0.0
+
+
+@lru_cache
+def get_phrase_cache():
+    if not settings.TTS_CACHE_ENABLED:
+        return None
+
+    phrase_cache = PhraseCache(
+        directory=settings.TTS_CACHE_DIR,
+        max_memory_bytes=settings.TTS_CACHE_MEMORY_BYTES,
+        max_disk_bytes=settings.TTS_CACHE_DISK_BYTES,
+        max_phrase_chars=settings.TTS_CACHE_MAX_PHRASE_CHARS,
+    )
+    register(CallbackGauge("tts_cache_hit_ratio", "Share of phrase cache lookups served from cache.", phrase_cache.hit_rate))
+    return phrase_cache
@@ -1,48 +1,163 @@
 import asyncio
-import base64
-import json
 import logging
 import websockets
 
+from collections import deque
+
+from app.audio.convert import AudioConverter, AudioFormat, can_convert, get_audio_format
 from app.core.config import get_settings
+from app.lib import codec, metrics
+from app.lib.constants import DEFAULT_VOICE_ID, DEFAULT_VOICE_SETTINGS, DEFAULT_VOICE_MODEL_ID as DEFAULT_MODEL_ID
+from app.lib.log import LogSampler
+from app.lib.ws_pool import get_ws_pool
+from app.tts.cache import get_phrase_cache
 
 
 settings = get_settings()
+ws_pool = get_ws_pool()
 logger = logging.getLogger(__name__)
 
 ELEVENLABS_API_KEY = settings.ELEVENLABS_API_KEY
 
+DEFAULT_INACTIVITY_TIMEOUT = 180
+
+
+def get_spoken_chars(text: str):
+    return "".join(text.split())
+
+
+def build_xi_ws_url(voice_id: str, model_id: str, inactivity_timeout: int, output_format: AudioFormat):
+    return f"{settings.ELEVENLABS_WS_BASE_URL}/v1/text-to-speech/{voice_id}/stream-input?model_id={model_id}&inactivity_timeout={inactivity_timeout}&output_format={output_format.name}"
+
+
+def get_provider_format(output_format: AudioFormat):
+    """The format to request from ElevenLabs for a call that wants `output_format`."""
+    if settings.TTS_PROVIDER_FORMAT:
+        provider_format = get_audio_format(settings.TTS_PROVIDER_FORMAT)
+        if can_convert(provider_format, output_format):
+            return provider_format
+    return output_format
+
+
+def get_generation_config():
+    """Generation triggers for the stream-input socket. Sentence mode flushes instead, so keeps the provider's."""
+    if settings.TTS_STREAM_TOKENS:
+        return {"chunk_length_schedule": settings.TTS_CHUNK_LENGTH_SCHEDULE}
+    return None
+
+
+def get_pool_args(url: str, voice_settings: dict):
+    """Pool key plus the connect and keepalive coroutines for an ElevenLabs stream-input socket."""
+    generation_config = get_generation_config()
+    
+    async def connect():
+        elevenlabs_ws = await websockets.connect(url)
+        bos_message = {
+            "text": " ",
+            "voice_settings": voice_settings,
+            "xi_api_key": ELEVENLABS_API_KEY
+        }
+        if generation_config:
+            bos_message["generation_config"] = generation_config
+        await elevenlabs_ws.send(codec.dumps(bos_message))
+        return elevenlabs_ws
+    
+    async def keepalive(elevenlabs_ws):
+        # A lone space resets the inactivity timeout without producing any audio.
+        await elevenlabs_ws.send(codec.dumps({"text": " "}))
+    
+    key = ("elevenlabs", url, tuple(sorted(voice_settings.items())))
+    return key, connect, keepalive
+
+
+def warm_connection_pool(voice_id: str = DEFAULT_VOICE_ID, model_id: str = DEFAULT_MODEL_ID, voice_settings: dict = DEFAULT_VOICE_SETTINGS):
+    provider_format = get_provider_format(get_audio_format(settings.AUDIO_OUTPUT_FORMAT))
+    ws_pool.warm(*get_pool_args(build_xi_ws_url(voice_id, model_id, DEFAULT_INACTIVITY_TIMEOUT, provider_format), voice_settings))
+
+
+async def synthesize_phrase(text: str, voice_id: str = DEFAULT_VOICE_ID, model_id: str = DEFAULT_MODEL_ID, voice_settings: dict = DEFAULT_VOICE_SETTINGS, output_format: AudioFormat = None):
+    """Synthesizes one short phrase on a socket of its own. Returns the audio and its duration in ms."""
+    output_format = output_format or get_audio_format(settings.AUDIO_OUTPUT_FORMAT)
+    provider_format = get_provider_format(output_format)
+    converter = AudioConverter(provider_format, output_format) if provider_format != output_format else None
+    _, connect, _ = get_pool_args(build_xi_ws_url(voice_id, model_id, DEFAULT_INACTIVITY_TIMEOUT, provider_format), voice_settings)
+    decoder = codec.XiDecoder()
+    
+    chunks = []
+    duration_ms = 0
+    elevenlabs_ws = await connect()
+    try:
+        await elevenlabs_ws.send(codec.dumps({"text": f"{text} ", "flush": True}))
+        # End of stream, the provider answers with isFinal once the audio is out.
+        await elevenlabs_ws.send(codec.dumps({"text": ""}))
+        async for message in elevenlabs_ws:
+            data = decoder.decode(message)
+            if data.audio:
+                chunks.append(converter.convert(data.audio) if converter else data.audio)
+                duration_ms += sum(data.char_durations_ms)
+            if data.is_final:
+                break
+    finally:
+        await elevenlabs_ws.close()
+    
+    return b"".join(chunks), duration_ms
+
 
 class ElevenLabsTTS:
     def __init__(self, input_queue, output_queue, **kwargs):
         self.input_queue: asyncio.Queue = input_queue
         self.output_queue: asyncio.Queue = output_queue
-        self.voice_id: str = kwargs.get("voice_id", "21m00Tcm4TlvDq8ikWAM")
-        self.model_id: str = kwargs.get("model_id", "eleven_flash_v2_5")
-        self.inactivity_timeout: int = kwargs.get("inactivity_timeout", 180)
+        self.voice_id: str = kwargs.get("voice_id", DEFAULT_VOICE_ID)
+        self.model_id: str = kwargs.get("model_id", DEFAULT_MODEL_ID)
+        self.inactivity_timeout: int = kwargs.get("inactivity_timeout", DEFAULT_INACTIVITY_TIMEOUT)
+        self.voice_settings: dict = kwargs.get("voice_settings", DEFAULT_VOICE_SETTINGS)
+        self.output_format: AudioFormat = kwargs.get("output_format", get_audio_format(settings.AUDIO_OUTPUT_FORMAT))
+        self.provider_format: AudioFormat = get_provider_format(self.output_format)
+        self.converter = self.create_converter()
         self.elevenlabs_ws = None
+        # A socket that never received text is still clean and can go back to the pool.
+        self.has_sent_text: bool = False
+        # Cleared while an interruption swaps the socket, so the next response's text waits for the new one.
+        self.connection_ready = asyncio.Event()
+        self.swap_task = None
         self.call_status = kwargs["call_status"]
+        self.turn_latency: metrics.TurnLatencyRecorder = kwargs["turn_latency"]
         self.is_call_ended = False
+        
+        # Response id of the text currently being synthesized, used to tag the audio coming back.
+        self.response_id: int = self.call_status["response_id"]
+        
+        # Streamed words aren't whole sentences, so there is nothing to cache.
+        self.phrase_cache = None if settings.TTS_STREAM_TOKENS else get_phrase_cache()
+        # Character start times let the IO handler tell which characters the caller actually heard.
+        self.decoder = codec.XiDecoder(start_times=True)
+        self.audio_log_sampler = LogSampler(settings.LOG_SAMPLE_INTERVAL_S)
+        # Sentences sent to the provider whose audio hasn't fully arrived, oldest first. Only tracked
+        # when the phrase cache is enabled. Once alignment stops matching the text, audio can't be
+        # attributed to a sentence any more and nothing is cached until the next response.
+        self.pending_segments: deque = deque()
+        self.segments_in_sync: bool = True
+        
+        self.sender_task = None
+        self.receiver_task = None
     
     def get_xi_ws_url(self):
-        ws = f"wss://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}/stream-input?model_id={self.model_id}&inactivity_timeout={self.inactivity_timeout}"
-        return ws
+        return build_xi_ws_url(self.voice_id, self.model_id, self.inactivity_timeout, self.provider_format)
+    
+    def create_converter(self):
+        if self.provider_format == self.output_format:
+            return None
+        return AudioConverter(self.provider_format, self.output_format)
     
     async def establish_connection(self):
         try:
-            self.elevenlabs_ws = await websockets.connect(self.get_xi_ws_url())
-            bos_message = {
-                "text": " ",
-                "voice_settings": {
-                    "stability": 0.5,
-                    "similarity_boost": 0.8
-                },
-                "xi_api_key": ELEVENLABS_API_KEY
-            }
-            await self.elevenlabs_ws.send(json.dumps(bos_message))
+            self.elevenlabs_ws = await ws_pool.acquire(*get_pool_args(self.get_xi_ws_url(), self.voice_settings))
+            self.has_sent_text = False
             logger.info("Connected to ElevenLabs WebSocket")
         except Exception as e:
             logger.error(f"FAILED TO CONNECT WITH XI WS: {e}")
+        finally:
+            self.connection_ready.set()
     
     async def sender(self):
         while True:
@@ -50,12 +165,61 @@ class ElevenLabsTTS:
                 break
             
             try:
-                text: str = await self.input_queue.get()
-                logger.info(f"Sending text: {text}")
+                data: dict = await self.input_queue.get()
+                text: str = data["text"]
+                
+                if data["response_id"] != self.call_status["response_id"]:
+                    continue
+                
+                # Text sent before an interruption's socket swap completes would go to the stale socket.
+                if not self.connection_ready.is_set():
+                    await self.connection_ready.wait()
+                    if data["response_id"] != self.call_status["response_id"]:
+                        continue
+                
+                logger.debug("Sending text: %s", text)
+                
+                # Streamed words carry a flush flag, set on the last item of the response only.
+                # Sentence items have none and are flushed one by one below.
+                if "flush" in data:
+                    self.response_id = data["response_id"]
+                    self.has_sent_text = True
+                    if text:
+                        await self.elevenlabs_ws.send(codec.dumps({"text": text}))
+                    if data["flush"]:
+                        await self.elevenlabs_ws.send(codec.dumps({"text": " ", "flush": True}))
+                    continue
 
                 if text and text.strip() != "":
-                    await self.elevenlabs_ws.send(json.dumps({"text": text}))
-                    await self.elevenlabs_ws.send(json.dumps({"text": " ", "flush": True}))
+                    if data["response_id"] != self.response_id:
+                        self.segments_in_sync = True
+                    self.response_id = data["response_id"]
+                    
+                    # A cache hit only plays when no provider audio is due ahead of it, otherwise it
+                    # goes to the provider too so the order of sentences never depends on alignment.
+                    cache_key = None
+                    cached = None
+                    if self.phrase_cache and self.segments_in_sync:
+                        cache_key = self.phrase_cache.get_key(text, self.voice_id, self.model_id, self.voice_settings, self.output_format.name)
+                        if cache_key and not self.pending_segments:
+                            cached = await self.phrase_cache.get(cache_key)
+                    
+                    if cached:
+                        await self.output_cached(cached, self.response_id)
+                        continue
+                    
+                    if self.phrase_cache and self.segments_in_sync:
+                        self.pending_segments.append({
+                            "response_id": self.response_id,
+                            "cache_key": cache_key,
+                            "spoken_chars": get_spoken_chars(text),
+                            "matched_chars": 0,
+                            "chunks": [],
+                        })
+                    
+                    self.has_sent_text = True
+                    await self.elevenlabs_ws.send(codec.dumps({"text": text}))
+                    await self.elevenlabs_ws.send(codec.dumps({"text": " ", "flush": True}))
 
             except Exception as e:
                 logger.error(f"XI SENDER ERROR: {e}")
@@ -83,22 +247,116 @@ class ElevenLabsTTS:
             if self.is_call_ended:
                 break
             
+            elevenlabs_ws = self.elevenlabs_ws
             try:
-                message = await self.elevenlabs_ws.recv()
-                data: dict = json.loads(message)
-                if data.get("audio"):
-                    logger.info(f"Received audio data: {len(data.get('audio'))} bytes")
-                    await self.output_queue.put({
-                        "audio": base64.b64decode(data.get("audio")),
-                        "text": "".join(data.get("alignment", {}).get("chars", [])),
-                        "duration_ms": sum(data.get("alignment", {}).get("charDurationsMs", [])),
-                    })
-                if data.get('isFinal'):
-                    logger.info("Received isFinal")
+                message = await elevenlabs_ws.recv()
+                # Audio from a socket swapped out by interrupt() belongs to an interrupted response.
+                if elevenlabs_ws is not self.elevenlabs_ws:
+                    continue
+                data = self.decoder.decode(message)
+                if data.audio:
+                    if self.response_id == self.call_status["response_id"]:
+                        self.turn_latency.mark(metrics.TTS_FIRST_AUDIO)
+                    logger.debug("Received audio data: %d bytes", len(data.audio))
+                    sampled = self.audio_log_sampler.sample(len(data.audio))
+                    if sampled:
+                        count, total_bytes, interval_s = sampled
+                        logger.info(f"Received {count} audio chunks, {total_bytes / 1024:.0f} KB in the last {interval_s:.1f}s")
+                    audio = data.audio
+                    if self.converter:
+                        audio = self.converter.convert(audio)
+                    chunk = {
+                        "audio": audio,
+                        "text": "".join(data.chars),
+                        "duration_ms": sum(data.char_durations_ms),
+                        "char_start_times_ms": data.char_start_times_ms,
+                        "response_id": self.response_id,
+                    }
+                    await self.output_queue.put(chunk)
+                    
+                    if self.pending_segments:
+                        await self.track_segment(chunk)
+                if data.is_final:
+                    logger.debug("Received isFinal")
             
+            except websockets.exceptions.ConnectionClosed as e:
+                # Expected when interrupt() swapped the connection, keep reading from the new one.
+                if elevenlabs_ws is self.elevenlabs_ws:
+                    logger.error(f"XI RECEIVER ERROR: {e}")
             except Exception as e:
                 logger.error(f"XI RECEIVER ERROR: {e}")    
                 
+    async def output_cached(self, cached: dict, response_id: int):
+        if response_id != self.call_status["response_id"]:
+            return
+        
+        self.turn_latency.mark(metrics.TTS_FIRST_AUDIO)
+        await self.output_queue.put({
+            "audio": cached["audio"],
+            "text": cached["text"],
+            "duration_ms": cached["duration_ms"],
+            "response_id": response_id,
+        })
+    
+    async def track_segment(self, chunk: dict):
+        # Provider audio belongs to the oldest sentence still waiting on the provider. With a flush after
+        # every sentence, a sentence is complete once its alignment spells out exactly its non-space
+        # characters. Anything else (no alignment, normalized numbers, SSML) means the boundaries are
+        # unknown: every pending sentence is given up on rather than cached with the wrong audio.
+        segment: dict = self.pending_segments[0]
+        if segment["response_id"] != chunk["response_id"]:
+            return
+        
+        spoken_chars = get_spoken_chars(chunk["text"])
+        matched_chars = segment["matched_chars"] + len(spoken_chars)
+        if not spoken_chars or segment["spoken_chars"][segment["matched_chars"]:matched_chars] != spoken_chars:
+            logger.debug("Alignment doesn't match the sentence sent, not caching this response")
+            self.pending_segments.clear()
+            self.segments_in_sync = False
+            return
+        
+        segment["chunks"].append(chunk)
+        segment["matched_chars"] = matched_chars
+        if matched_chars < len(segment["spoken_chars"]):
+            return
+        
+        self.pending_segments.popleft()
+        if segment["cache_key"]:
+            chunks = segment["chunks"]
+            self.phrase_cache.put(
+                segment["cache_key"],
+                b"".join(c["audio"] for c in chunks),
+                "".join(c["text"] for c in chunks),
+                sum(c["duration_ms"] for c in chunks),
+            )
+    
+    def interrupt(self):
+        """
+        The stream-input socket cannot cancel a generation in progress, so a socket that was sent text
+        is swapped for a fresh one in the background and closed. The sender holds new text until the
+        swap is done, and whatever the stale socket still produces is dropped.
+        """
+        self.pending_segments.clear()
+        self.segments_in_sync = True
+        if not self.has_sent_text or (self.swap_task and not self.swap_task.done()):
+            return
+        
+        self.connection_ready.clear()
+        self.swap_task = asyncio.create_task(self.swap_connection())
+    
+    async def swap_connection(self):
+        stale_ws = self.elevenlabs_ws
+        try:
+            await self.establish_connection()
+        finally:
+            self.connection_ready.set()
+        # Drop resampler state left over from the interrupted audio.
+        self.converter = self.create_converter()
+        
+        if stale_ws and stale_ws is not self.elevenlabs_ws:
+            key, _, _ = get_pool_args(self.get_xi_ws_url(), self.voice_settings)
+            await ws_pool.release(key, stale_ws, reusable=False)
+    
     async def synthesize(self):
         self.sender_task = asyncio.create_task(self.sender())
         self.receiver_task = asyncio.create_task(self.receiver())
@@ -108,9 +366,11 @@ class ElevenLabsTTS:
         self.is_call_ended = True
         
         if self.elevenlabs_ws:
+            key, _, _ = get_pool_args(self.get_xi_ws_url(), self.voice_settings)
             try:
-                await self.elevenlabs_ws.send(json.dumps({"text": ""}))
-                await self.elevenlabs_ws.close()
+                if self.has_sent_text:
+                    await self.elevenlabs_ws.send(codec.dumps({"text": ""}))
+                await ws_pool.release(key, self.elevenlabs_ws, reusable=not self.has_sent_text)
             except Exception:
                 pass
             
@@ -120,6 +380,8 @@ class ElevenLabsTTS:
             logger.info("XI WebSocket already closed")
         
         try:
+            if self.swap_task:
+                self.swap_task.cancel()
             if self.sender_task:
                 self.sender_task.cancel()
             if self.receiver_task:
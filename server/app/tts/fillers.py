@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import time
+
+from collections import OrderedDict
+from functools import lru_cache
+from typing import NamedTuple
+
+from app.agents.registry import AgentConfig
+from app.audio.convert import AudioFormat
+from app.core.config import get_settings
+from app.lib.metrics import CallbackGauge, CounterVec, Histogram, register
+from app.tts.cache import get_phrase_cache
+from app.tts.elevenlabs import synthesize_phrase
+
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+FILLERS = register(CounterVec(
+    "filler_turns_total",
+    "Caller turns by what the filler did: played (no audio within the delay), not_needed (audio came first) or interrupted.",
+    ("result",),
+))
+FILLER_MASKED_MS = register(Histogram(
+    "filler_masked_ms",
+    "Silence a filler covered: from the filler being sent to the response's first audio being sent.",
+))
+FILLER_SYNTHESIS_ERRORS = register(CounterVec(
+    "filler_synthesis_errors_total",
+    "Filler phrases that failed to synthesize.",
+))
+register(CallbackGauge(
+    "filler_play_ratio",
+    "Share of caller turns that needed a filler.",
+    lambda: FILLERS.get("played") / max(sum(FILLERS.values.values()), 1),
+))
+
+# Voices synthesized at once, so loading many agents doesn't open a socket each.
+SYNTHESIS_CONCURRENCY = 4
+# A voice whose fillers all failed is retried after this long rather than on every call.
+RETRY_AFTER_S = 60.0
+
+
+class FillerClip(NamedTuple):
+    text: str
+    audio: bytes
+    duration_ms: float
+
+
+class FillerBank:
+    """
+    Pre-rendered filler clips per voice and output format, held in memory. Clips are synthesized in
+    the background when an agent is loaded or first called with a format; until then the agent's
+    calls go without fillers. Goes through the phrase cache when enabled, so restarts and other
+    workers on the host don't synthesize them again.
+    """
+
+    def __init__(self, max_voices: int):
+        self.max_voices = max_voices
+        self.clips: OrderedDict = OrderedDict()
+        self.synthesizing: dict = {}
+        self.failed: dict = {}          # key -> when its synthesis last failed
+        self.semaphore = asyncio.Semaphore(SYNTHESIS_CONCURRENCY)
+
+    @staticmethod
+    def get_key(agent_config: AgentConfig, output_format: AudioFormat):
+        return (agent_config.fillers, agent_config.voice_id, agent_config.voice_model_id, agent_config.voice_settings, output_format.name)
+
+    def get(self, agent_config: AgentConfig, output_format: AudioFormat):
+        """The agent's clips in this format, or None while they're not ready."""
+        key = self.get_key(agent_config, output_format)
+        clips = self.clips.get(key)
+        if clips is None:
+            self.prepare(agent_config, output_format)
+            return None
+
+        self.clips.move_to_end(key)
+        return clips
+
+    def prepare(self, agent_config: AgentConfig, output_format: AudioFormat):
+        key = self.get_key(agent_config, output_format)
+        if not agent_config.fillers or key in self.clips or key in self.synthesizing:
+            return
+        if time.monotonic() - self.failed.get(key, -RETRY_AFTER_S) < RETRY_AFTER_S:
+            return
+
+        task = asyncio.create_task(self.synthesize(key, agent_config, output_format))
+        self.synthesizing[key] = task
+        task.add_done_callback(lambda _: self.synthesizing.pop(key, None))
+
+    async def synthesize(self, key: tuple, agent_config: AgentConfig, output_format: AudioFormat):
+        voice_settings = dict(agent_config.voice_settings)
+        phrase_cache = get_phrase_cache()
+        clips = []
+
+        async with self.semaphore:
+            for text in agent_config.fillers:
+                try:
+                    cache_key = phrase_cache.get_key(text, agent_config.voice_id, agent_config.voice_model_id, voice_settings, output_format.name) if phrase_cache else None
+                    cached = await phrase_cache.get(cache_key) if cache_key else None
+                    if cached:
+                        clips.append(FillerClip(text, cached["audio"], cached["duration_ms"]))
+                        continue
+
+                    audio, duration_ms = await synthesize_phrase(text, agent_config.voice_id, agent_config.voice_model_id, voice_settings, output_format)
+                    if not audio:
+                        raise ValueError("no audio")
+                    clips.append(FillerClip(text, audio, duration_ms))
+                    if cache_key:
+                        phrase_cache.put(cache_key, audio, text, duration_ms)
+                except Exception as e:
+                    FILLER_SYNTHESIS_ERRORS.inc()
+                    logger.error(f"FILLER SYNTHESIS ERROR: {text!r} for voice {agent_config.voice_id}: {e}")
+
+        if not clips:
+            self.failed[key] = time.monotonic()
+            return
+
+        self.failed.pop(key, None)
+        self.clips[key] = tuple(clips)
+        while len(self.clips) > self.max_voices:
+            self.clips.popitem(last=False)
+        logger.info(f"Synthesized {len(clips)} fillers for voice {agent_config.voice_id} in {output_format.name}")
+
+    async def close(self):
+        for task in list(self.synthesizing.values()):
+            task.cancel()
+
+
+@lru_cache
+def get_filler_bank():
+    return FillerBank(settings.FILLER_MAX_VOICES)
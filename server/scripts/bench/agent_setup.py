@@ -0,0 +1,84 @@
+"""
+Agent config cost at call setup: reading and validating the agent on every call vs the compiled
+registry, for the file and SQLite stores.
+
+Creates --agents agents in a temporary store and sets up --calls calls spread across them.
+
+    cd server && python -m scripts.bench.agent_setup --agents 500 --calls 20000
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from app.agents.registry import AgentRegistry, FileAgentStore, SqliteAgentStore, compile_agent
+
+
+def make_agent(index: int):
+    return {
+        "name": f"Agent {index}",
+        "system_prompt": f"You are agent {index}, a voice assistant for a dental clinic. Keep answers under 50 characters. " * 8,
+        "greeting": "Hi, this is {name}. How can I help?",
+        "voice_settings": {"stability": 0.5, "similarity_boost": 0.8},
+        "stt_params": {"model": "nova-2", "language": "en-US", "endpointing": 300, "smart_format": True},
+        "max_call_duration_ms": 300000,
+    }
+
+
+def percentile(values: list, p: float):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+async def measure(setup, agent_ids: list, calls: int):
+    latencies = []
+    for i in range(calls):
+        started_at = time.perf_counter()
+        await setup(agent_ids[i % len(agent_ids)])
+        latencies.append((time.perf_counter() - started_at) * 1e6)
+    return latencies
+
+
+async def run_store(name: str, store, agent_ids: list, args):
+    async def read_per_call(agent_id: str):
+        raw, version = await asyncio.to_thread(store.load, agent_id)
+        return compile_agent(agent_id, raw, version)
+
+    registry = AgentRegistry(store, reload_interval_s=0)
+
+    started_at = time.perf_counter()
+    await registry.start()
+    startup_ms = (time.perf_counter() - started_at) * 1000
+
+    for mode, setup in (("read per call", read_per_call), ("registry", registry.get)):
+        latencies = await measure(setup, agent_ids, args.calls)
+        print(f"{name:>7}  {mode:>14}  {percentile(latencies, 50):9.1f}  {percentile(latencies, 99):9.1f}  {max(latencies):9.1f}")
+
+    print(f"{name:>7}  {'startup load':>14}  {startup_ms * 1000 / len(agent_ids):9.1f}  ({len(agent_ids)} agents in {startup_ms:.0f}ms)")
+    await registry.close()
+
+
+async def main(args):
+    agent_ids = [f"agent-{i}" for i in range(args.agents)]
+    print(f"{args.calls} call setups over {args.agents} agents, latency in us")
+    print(f"{'store':>7}  {'mode':>14}  {'p50':>9}  {'p99':>9}  {'max':>9}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_store = FileAgentStore(os.path.join(directory, "agents"))
+        sqlite_store = SqliteAgentStore(os.path.join(directory, "agents.db"))
+        for index, agent_id in enumerate(agent_ids):
+            with open(os.path.join(file_store.directory, f"{agent_id}.json"), "w") as f:
+                json.dump(make_agent(index), f)
+            sqlite_store.save(agent_id, make_agent(index))
+
+        await run_store("file", file_store, agent_ids, args)
+        await run_store("sqlite", sqlite_store, agent_ids, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--agents", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=20000)
+    asyncio.run(main(parser.parse_args()))
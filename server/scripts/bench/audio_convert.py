@@ -0,0 +1,57 @@
+"""
+Throughput of the NumPy audio converters, in seconds of audio converted per CPU-second.
+
+Each conversion streams --seconds of speech-band noise through an AudioConverter in chunks of
+--chunk-ms, the way ElevenLabs chunks arrive, so per-chunk overhead is included.
+
+    cd server && python -m scripts.bench.audio_convert --seconds 60 --chunk-ms 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.audio.convert import AUDIO_FORMATS, AudioConverter, pcm_to_ulaw
+
+
+CONVERSIONS = [
+    ("pcm_24000", "ulaw_8000"),
+    ("pcm_16000", "ulaw_8000"),
+    ("ulaw_8000", "pcm_16000"),
+    ("pcm_24000", "pcm_16000"),
+    ("pcm_16000", "pcm_24000"),
+]
+
+
+def make_audio(audio_format, seconds: float, rng):
+    samples = np.clip(rng.normal(0, 6000, int(seconds * audio_format.sample_rate)), -32768, 32767).astype("<i2")
+    if audio_format.encoding == "mulaw":
+        return pcm_to_ulaw(samples).tobytes()
+    return samples.tobytes()
+
+
+def main(args):
+    rng = np.random.default_rng(0)
+    print(f"{'conversion':>24}  {'audio s / cpu s':>16}  {'us / chunk':>10}")
+
+    for source_name, target_name in CONVERSIONS:
+        source, target = AUDIO_FORMATS[source_name], AUDIO_FORMATS[target_name]
+        audio = make_audio(source, args.seconds, rng)
+        bytes_per_sample = 1 if source.encoding == "mulaw" else 2
+        chunk_bytes = source.sample_rate * args.chunk_ms // 1000 * bytes_per_sample
+        chunks = [audio[i:i + chunk_bytes] for i in range(0, len(audio), chunk_bytes)]
+
+        converter = AudioConverter(source, target)
+        started_at = time.process_time()
+        for chunk in chunks:
+            converter.convert(chunk)
+        cpu_s = time.process_time() - started_at
+
+        print(f"{source_name + ' -> ' + target_name:>24}  {args.seconds / cpu_s:16.0f}  {cpu_s / len(chunks) * 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    main(parser.parse_args())
@@ -0,0 +1,113 @@
+"""
+CPU per concurrent call of the caller audio path with and without frame coalescing.
+
+Each simulated call pushes --seconds of 16 kHz linear16 audio, in messages of --message-ms with
+random jitter, through a bounded audio queue into a websocket send, like WebsocketIOHandler and
+DeepgramTranscriber do. Audio is pushed as fast as the pipeline takes it, and the process CPU time
+is reported per call per second of audio (i.e. the share of a core one live call costs). The
+websocket sink runs in a child process so its CPU is not counted.
+
+    cd server && python -m scripts.bench.audio_framing --calls 50 --message-ms 10 --frame-ms 40
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+import time
+
+import websockets
+
+from app.audio.framer import AudioFramer, get_frame_bytes
+from app.lib.queues import DROP_OLDEST, PipelineQueue
+
+
+SINK_HOST = "127.0.0.1"
+SINK_PORT = 8791
+SAMPLE_RATE = 16000
+QUEUE_MAXSIZE = 100
+
+
+def run_sink():
+    async def sink(websocket, *args):
+        async for _ in websocket:
+            pass
+
+    async def serve():
+        async with websockets.serve(sink, SINK_HOST, SINK_PORT, max_size=None):
+            await asyncio.Future()
+
+    asyncio.run(serve())
+
+
+def make_messages(args):
+    # Browser-like message sizes: nominally --message-ms, never aligned to the frame size.
+    audio = random.randbytes(SAMPLE_RATE * 2 * int(args.seconds))
+    nominal = SAMPLE_RATE * 2 * args.message_ms // 1000
+    messages, position = [], 0
+    while position < len(audio):
+        size = max(2, int(nominal * random.uniform(0.5, 1.5))) // 2 * 2
+        messages.append(audio[position:position + size])
+        position += size
+    return messages
+
+
+async def run_call(messages: list, frame_ms: int):
+    queue = PipelineQueue("audio", QUEUE_MAXSIZE, DROP_OLDEST)
+    framer = AudioFramer(get_frame_bytes("linear16", SAMPLE_RATE, frame_ms), QUEUE_MAXSIZE + 2) if frame_ms else None
+
+    async with websockets.connect(f"ws://{SINK_HOST}:{SINK_PORT}", max_size=None) as websocket:
+        async def send():
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    return
+                await websocket.send(frame)
+
+        sender = asyncio.create_task(send())
+        for message in messages:
+            if framer is None:
+                await queue.put(message)
+            else:
+                for frame in framer.push(message):
+                    await queue.put(frame)
+            # Yield like a socket read would, so the sender keeps up and nothing is dropped.
+            await asyncio.sleep(0)
+
+        if framer is not None:
+            tail = framer.flush()
+            if tail is not None:
+                await queue.put(tail)
+        await queue.put(None)
+        await sender
+
+
+async def measure(args, frame_ms: int):
+    messages = make_messages(args)
+    started_at = time.process_time()
+    await asyncio.gather(*(run_call(messages, frame_ms) for _ in range(args.calls)))
+    cpu_s = time.process_time() - started_at
+
+    sends = len(messages) if not frame_ms else -(-len(b"".join(messages)) // get_frame_bytes("linear16", SAMPLE_RATE, frame_ms))
+    return cpu_s / (args.calls * args.seconds) * 1000, sends
+
+
+async def main(args):
+    sink = multiprocessing.Process(target=run_sink, daemon=True)
+    sink.start()
+    await asyncio.sleep(1)
+
+    try:
+        for name, frame_ms in (("per-message", 0), (f"{args.frame_ms}ms frames", args.frame_ms)):
+            cpu_ms, sends = await measure(args, frame_ms)
+            print(f"{name:>16}: {sends:6d} sends/call  cpu={cpu_ms:6.3f}ms per call per audio second ({cpu_ms / 10:.3f}% of a core)")
+    finally:
+        sink.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=30, help="Audio per call")
+    parser.add_argument("--message-ms", type=int, default=10, help="Nominal size of inbound messages")
+    parser.add_argument("--frame-ms", type=int, default=40)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""
+Messages per second decoding provider messages: the old inline stdlib path vs each codec backend.
+
+ElevenLabs messages carry --chunk-ms of audio in --format with alignment and normalizedAlignment
+for ~15 characters per 100 ms, like stream-input sends. Deepgram messages are Results with word
+timings and metadata.
+
+    cd server && python -m scripts.bench.codec --chunk-ms 500 --format pcm_16000
+"""
+import argparse
+import base64
+import json
+import random
+import time
+
+from app.lib import codec
+
+
+BYTES_PER_MS = {"pcm_16000": 32, "pcm_24000": 48, "ulaw_8000": 8, "mp3": 16}
+
+
+def make_xi_message(chunk_ms: int, audio_format: str):
+    chars = list("Sure, I can help with that order today. " * (chunk_ms // 250 + 1))[:max(chunk_ms * 15 // 100, 1)]
+    durations = [random.randint(40, 90) for _ in chars]
+    starts = [sum(durations[:i]) for i in range(len(chars))]
+    alignment = {"chars": chars, "charStartTimesMs": starts, "charDurationsMs": durations}
+    return json.dumps({
+        "audio": base64.b64encode(random.randbytes(BYTES_PER_MS[audio_format] * chunk_ms)).decode(),
+        "isFinal": False,
+        "normalizedAlignment": alignment,
+        "alignment": alignment,
+    })
+
+
+def make_deepgram_message():
+    words = "hi I would like to check on my order please".split()
+    return json.dumps({
+        "type": "Results",
+        "channel_index": [0, 1],
+        "duration": 2.1,
+        "start": 10.5,
+        "is_final": True,
+        "speech_final": True,
+        "channel": {"alternatives": [{
+            "transcript": " ".join(words),
+            "confidence": 0.99,
+            "words": [
+                {"word": word, "start": 10.5 + i * 0.2, "end": 10.7 + i * 0.2, "confidence": 0.98, "punctuated_word": word}
+                for i, word in enumerate(words)
+            ],
+        }]},
+        "metadata": {"request_id": "9f7c1b8e-0000-4000-8000-000000000000", "model_info": {"name": "2-general-nova", "version": "2024-01-18", "arch": "nova-2"}, "model_uuid": "c0d1a568-0000-4000-8000-000000000000"},
+        "from_finalize": False,
+    })
+
+
+def legacy_xi(message):
+    # What ElevenLabsTTS.receiver did before the codec layer.
+    data = json.loads(message)
+    audio = base64.b64decode(data.get("audio"))
+    return audio, "".join(data.get("alignment", {}).get("chars", [])), sum(data.get("alignment", {}).get("charDurationsMs", []))
+
+
+def codec_xi(decoder):
+    def decode(message):
+        data = decoder.decode(message)
+        return data.audio, "".join(data.chars), sum(data.char_durations_ms)
+    return decode
+
+
+def legacy_deepgram(message):
+    data = json.loads(message)
+    return data["channel"]["alternatives"][0]["transcript"], data["speech_final"]
+
+
+def codec_deepgram(decoder):
+    def decode(message):
+        data = decoder.decode(message)
+        return data.transcript, data.speech_final
+    return decode
+
+
+def rate(decode, message, seconds: float):
+    count = 0
+    started_at = time.perf_counter()
+    while time.perf_counter() - started_at < seconds:
+        for _ in range(100):
+            decode(message)
+        count += 100
+    return count / (time.perf_counter() - started_at)
+
+
+def main(args):
+    backends = ["json"] + [backend for backend, module in (("orjson", codec.orjson), ("msgspec", codec.msgspec)) if module is not None]
+
+    xi_message = make_xi_message(args.chunk_ms, args.format).encode()
+    deepgram_message = make_deepgram_message().encode()
+
+    for name, message, legacy, make in (
+        (f"ElevenLabs {args.chunk_ms}ms {args.format} ({len(xi_message) / 1024:.0f} KB)", xi_message, legacy_xi, lambda b: codec_xi(codec.XiDecoder(backend=b))),
+        (f"Deepgram Results ({len(deepgram_message) / 1024:.1f} KB)", deepgram_message, legacy_deepgram, lambda b: codec_deepgram(codec.DeepgramDecoder(backend=b))),
+    ):
+        print(name)
+        baseline = rate(legacy, message, args.seconds)
+        print(f"  {'legacy inline':>14}: {baseline:10.0f} msg/s")
+        for backend in backends:
+            result = rate(make(backend), message, args.seconds)
+            print(f"  {backend:>14}: {result:10.0f} msg/s  ({result / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-ms", type=int, default=500, help="Audio per ElevenLabs message")
+    parser.add_argument("--format", default="mp3", choices=sorted(BYTES_PER_MS))
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent on each measurement")
+    main(parser.parse_args())
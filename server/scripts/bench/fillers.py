@@ -0,0 +1,69 @@
+"""
+Filler clips vs silence after the caller's turn, simulated with the load test stub latencies.
+
+Each turn's first response audio arrives after the LLM's first token, the rest of the first
+sentence and the TTS first-audio delay (log-normal, like scripts/loadtest/fake_providers.py). With
+fillers, a clip of --clip-ms starts at the filler delay if no audio has arrived by then, and the
+response plays once the clip is over.
+
+Reports, per filler delay, how often a filler plays, the silence the caller hears after their turn
+(p50 / p95 / p99), and how much later the response itself starts because a clip was playing.
+
+    cd server && python -m scripts.bench.fillers --turns 20000 --delays 500,700,1000
+"""
+import argparse
+import math
+import random
+
+
+class LatencyDistribution:
+    """Log-normal latency from a median and a 95th percentile, in milliseconds."""
+
+    def __init__(self, spec: str):
+        median_ms, p95_ms = (float(value) for value in spec.split(","))
+        self.mu = math.log(max(median_ms, 0.001))
+        self.sigma = max(math.log(max(p95_ms, median_ms, 0.001)) - self.mu, 0.0) / 1.645
+
+    def sample_ms(self):
+        return random.lognormvariate(self.mu, self.sigma)
+
+
+def percentile(values: list, p: float):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def main(args):
+    llm_first_token = LatencyDistribution(args.llm_first_token)
+    llm_token_interval = LatencyDistribution(args.llm_token_interval)
+    tts_first_audio = LatencyDistribution(args.tts_first_audio)
+
+    first_audio = []
+    for _ in range(args.turns):
+        sentence_ms = sum(llm_token_interval.sample_ms() for _ in range(args.first_sentence_tokens - 1))
+        first_audio.append(llm_first_token.sample_ms() + sentence_ms + tts_first_audio.sample_ms())
+
+    def summary(values: list):
+        return f"{percentile(values, 50):5.0f} / {percentile(values, 95):5.0f} / {percentile(values, 99):5.0f}"
+
+    print(f"{args.turns} turns, {args.clip_ms}ms clips, ms after end of turn")
+    print(f"{'delay':>8}  {'fired':>6}  {'silence p50/p95/p99':>21}  {'response later p50/p95':>22}")
+    print(f"{'off':>8}  {0:5.1f}%  {summary(first_audio):>21}  {'-':>22}")
+    for delay_ms in (int(value) for value in args.delays.split(",")):
+        silence = [min(latency_ms, delay_ms) for latency_ms in first_audio]
+        fired = [latency_ms for latency_ms in first_audio if latency_ms > delay_ms]
+        # The response waits for the end of the clip when it arrives while the clip is playing.
+        later = [max(delay_ms + args.clip_ms - latency_ms, 0) for latency_ms in fired] or [0]
+        print(f"{delay_ms:>6}ms  {len(fired) / len(first_audio) * 100:5.1f}%  {summary(silence):>21}  {percentile(later, 50):10.0f} / {percentile(later, 95):9.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=20000)
+    parser.add_argument("--delays", default="500,700,1000", help="Filler delays to compare, in ms")
+    parser.add_argument("--clip-ms", type=int, default=450, help="Length of a filler clip")
+    parser.add_argument("--first-sentence-tokens", type=int, default=8)
+    parser.add_argument("--llm-first-token", default="300,800", help="median_ms,p95_ms")
+    parser.add_argument("--llm-token-interval", default="15,40", help="median_ms,p95_ms")
+    parser.add_argument("--tts-first-audio", default="200,500", help="median_ms,p95_ms")
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+"""
+First-token latency on turn 1 with a cold per-call AsyncOpenAI client vs the shared, warmed client pool.
+
+Runs against a local stub that streams chat-completion chunks, or against a real endpoint with --base-url.
+
+    cd server && python -m scripts.bench.llm_client_warmup --trials 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from aiohttp import web
+
+from scripts.loadtest.fake_providers import FakeProviders, add_arguments
+
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8790
+
+
+async def start_stub():
+    # The fake OpenAI endpoint from the load test kit, with no artificial latency.
+    fake_parser = argparse.ArgumentParser()
+    add_arguments(fake_parser)
+    fake_args = fake_parser.parse_args(["--llm-first-token", "0,0", "--llm-token-interval", "0,0"])
+
+    runner = web.AppRunner(FakeProviders(fake_args).create_app())
+    await runner.setup()
+    await web.TCPSite(runner, STUB_HOST, STUB_PORT).start()
+    return runner
+
+
+async def first_token_ms(client, model):
+    started_at = time.perf_counter()
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": "Hello"}],
+        stream=True,
+    )
+
+    latency = None
+    async for chunk in response:
+        if latency is None and chunk.choices and chunk.choices[0].delta.content:
+            latency = (time.perf_counter() - started_at) * 1000
+
+    return latency
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:>6}: mean={statistics.mean(samples):7.2f}ms  p50={statistics.median(samples):7.2f}ms  p95={p95:7.2f}ms")
+
+
+async def main(args):
+    runner = None
+    if not args.base_url:
+        runner = await start_stub()
+        os.environ["OPENAI_BASE_URL"] = f"http://{STUB_HOST}:{STUB_PORT}/v1"
+        os.environ.setdefault("OPENAI_API_KEY", "stub")
+    else:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+
+    os.environ.setdefault("ELEVENLABS_API_KEY", "stub")
+    os.environ.setdefault("DEEPGRAM_API_KEY", "stub")
+
+    from openai import AsyncOpenAI
+    from app.llm.client import LLMClientPool
+
+    cold = []
+    for _ in range(args.trials):
+        # What GroqLLM did before: a fresh client per call, closed at hangup.
+        client = AsyncOpenAI(base_url=os.environ["OPENAI_BASE_URL"], api_key=os.environ["OPENAI_API_KEY"])
+        cold.append(await first_token_ms(client, args.model))
+        await client.close()
+
+    pool = LLMClientPool(shards=1)
+    await pool.warm()
+    warm = [await first_token_ms(pool.get(), args.model) for _ in range(args.trials)]
+    await pool.close()
+
+    summarize("cold", cold)
+    summarize("warm", warm)
+
+    if runner:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=50)
+    parser.add_argument("--base-url", default=None, help="Benchmark a real OpenAI-compatible endpoint instead of the stub")
+    parser.add_argument("--model", default="mixtral-8x7b-32768")
+    asyncio.run(main(parser.parse_args()))
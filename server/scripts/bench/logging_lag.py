@@ -0,0 +1,119 @@
+"""
+Event loop lag under logging load: the old synchronous per-frame INFO logging vs the queue handler
+with sampled per-frame logs.
+
+Each simulated call receives a TTS audio chunk every --chunk-ms and logs it the way
+ElevenLabsTTS.receiver does, plus a sentence log every 20 chunks. Logs go to a pipe drained by a
+child process, like stdout under a container runtime; --sink-kbps throttles the reader to mimic a
+log shipper falling behind. A monitor task sleeps 5ms at a time and records how late it wakes up.
+
+    cd server && python -m scripts.bench.logging_lag --calls 200 --seconds 10 --sink-kbps 256
+"""
+import argparse
+import asyncio
+import io
+import logging
+import subprocess
+import sys
+import time
+
+from app.lib.log import LOG_RECORDS_DROPPED, LogSampler, bind_call_context, setup_logging, stop_logging
+
+
+logger = logging.getLogger("app.tts.elevenlabs")
+
+MONITOR_INTERVAL_S = 0.005
+
+# Reads stdin at most `kbps` KB per second, or as fast as it can when 0.
+SINK = """
+import sys, time
+kbps = float(sys.argv[1])
+while True:
+    block = sys.stdin.buffer.read1(4096)
+    if not block:
+        break
+    if kbps:
+        time.sleep(len(block) / (kbps * 1024))
+"""
+
+
+async def simulate_call(index: int, mode: str, args, deadline: float):
+    bind_call_context(f"call-{index}", "bench-agent", {"response_id": 0})
+    sampler = LogSampler(args.sample_interval_s)
+    chunk = 0
+
+    # Spread calls across the chunk interval like real calls would be.
+    await asyncio.sleep(args.chunk_ms / 1000 * index / args.calls)
+    while time.monotonic() < deadline:
+        chunk += 1
+        size = 16 * args.chunk_ms
+        if mode == "sync":
+            logger.info(f"Received audio data: {size} bytes")
+            if chunk % 20 == 0:
+                logger.info(f"Sending text: Sure, I can help you with order number {chunk}.")
+        else:
+            logger.debug("Received audio data: %d bytes", size)
+            sampled = sampler.sample(size)
+            if sampled:
+                count, total_bytes, interval_s = sampled
+                logger.info(f"Received {count} audio chunks, {total_bytes / 1024:.0f} KB in the last {interval_s:.1f}s")
+            if chunk % 20 == 0:
+                logger.debug("Sending text: %s", f"Sure, I can help you with order number {chunk}.")
+        await asyncio.sleep(args.chunk_ms / 1000)
+
+
+async def monitor(deadline: float, lags: list):
+    while time.monotonic() < deadline:
+        started_at = time.monotonic()
+        await asyncio.sleep(MONITOR_INTERVAL_S)
+        lags.append((time.monotonic() - started_at - MONITOR_INTERVAL_S) * 1000)
+
+
+async def run(mode: str, args):
+    lags = []
+    deadline = time.monotonic() + args.seconds
+    await asyncio.gather(monitor(deadline, lags), *(simulate_call(i, mode, args, deadline) for i in range(args.calls)))
+    return lags
+
+
+def percentile(values: list, p: float):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def main(args):
+    print(f"{args.calls} calls, {args.chunk_ms}ms chunks, {args.seconds:.0f}s per mode")
+    print(f"{'mode':>6}  {'lag p50 ms':>10}  {'lag p99 ms':>10}  {'lag max ms':>10}  {'dropped':>8}")
+
+    for mode in ("sync", "queue"):
+        sink = subprocess.Popen([sys.executable, "-c", SINK, str(args.sink_kbps)], stdin=subprocess.PIPE)
+        stream = io.TextIOWrapper(sink.stdin, line_buffering=True)
+
+        if mode == "sync":
+            # What main.py configured before: a StreamHandler writing from the event loop.
+            handler = logging.StreamHandler(stream)
+            handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s", "%Y-%m-%d %H:%M:%S"))
+            logging.getLogger().handlers = [handler]
+            logging.getLogger().setLevel(logging.INFO)
+        else:
+            setup_logging("INFO", args.log_format, stream=stream)
+
+        dropped_before = sum(LOG_RECORDS_DROPPED.values.values())
+        lags = asyncio.run(run(mode, args))
+        dropped = sum(LOG_RECORDS_DROPPED.values.values()) - dropped_before
+        stop_logging()
+        stream.close()
+        sink.wait()
+
+        print(f"{mode:>6}  {percentile(lags, 50):10.2f}  {percentile(lags, 99):10.2f}  {max(lags):10.2f}  {dropped:8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--chunk-ms", type=int, default=100, help="Interval between audio chunks per call")
+    parser.add_argument("--sample-interval-s", type=float, default=5.0)
+    parser.add_argument("--sink-kbps", type=float, default=0, help="Throttle the log reader, 0 for unthrottled")
+    parser.add_argument("--log-format", default="text", choices=("text", "json"))
+    main(parser.parse_args())
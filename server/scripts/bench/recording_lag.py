@@ -0,0 +1,111 @@
+"""
+Event loop lag with every call recorded vs none.
+
+Each simulated call sends caller audio every --frame-ms (linear16 at 16kHz, like forward_audio
+receives it), gets agent audio every --chunk-ms, and a user transcript followed by an agent reply
+every --turn-s. With recording on, every piece goes through a CallRecorder the way the IO handler
+and LLM record it. A monitor task sleeps 5ms at a time and records how late it wakes up. Afterwards
+one recording is read back to check its turn index.
+
+    cd server && python -m scripts.bench.recording_lag --calls 200 --seconds 20
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from app.recording.recorder import RECORDING_BYTES_WRITTEN, RECORDING_DROPPED, RecordingManager, RecordingReader
+
+
+MONITOR_INTERVAL_S = 0.005
+BYTES_PER_MS = 32
+
+
+async def simulate_call(index: int, manager: RecordingManager, args, deadline: float):
+    recorder = manager.create_recorder(f"call-{index}", {"agent_id": "bench-agent"}) if manager else None
+    inbound = bytes(BYTES_PER_MS * args.frame_ms)
+    outbound = bytes(BYTES_PER_MS * args.chunk_ms)
+    frames_per_chunk = max(args.chunk_ms // args.frame_ms, 1)
+    chunks_per_turn = max(int(args.turn_s * 1000 / args.chunk_ms), 1)
+    frame = 0
+    response_id = 0
+
+    # Spread calls across the frame interval like real calls would be.
+    await asyncio.sleep(args.frame_ms / 1000 * index / args.calls)
+    while time.monotonic() < deadline:
+        frame += 1
+        if recorder:
+            recorder.record_inbound(inbound)
+
+        if frame % frames_per_chunk == 0:
+            chunk = frame // frames_per_chunk
+            if chunk % chunks_per_turn == 0:
+                response_id += 1
+                if recorder:
+                    recorder.record_text("user", "Can you move my appointment to Tuesday afternoon?", response_id)
+            if recorder:
+                recorder.record_outbound(outbound, response_id)
+                recorder.record_text("assistant", "Sure, one moment. ", response_id)
+        await asyncio.sleep(args.frame_ms / 1000)
+
+    if recorder:
+        manager.close_recorder(recorder)
+
+
+async def monitor(deadline: float, lags: list):
+    while time.monotonic() < deadline:
+        started_at = time.monotonic()
+        await asyncio.sleep(MONITOR_INTERVAL_S)
+        lags.append((time.monotonic() - started_at - MONITOR_INTERVAL_S) * 1000)
+
+
+async def run(manager: RecordingManager, args):
+    lags = []
+    if manager:
+        manager.start()
+    deadline = time.monotonic() + args.seconds
+    await asyncio.gather(monitor(deadline, lags), *(simulate_call(i, manager, args, deadline) for i in range(args.calls)))
+    if manager:
+        await manager.close()
+    return lags
+
+
+def percentile(values: list, p: float):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def main(args):
+    print(f"{args.calls} calls, {args.frame_ms}ms caller frames, {args.chunk_ms}ms agent chunks, {args.seconds:.0f}s per mode")
+    print(f"{'mode':>9}  {'lag p50 ms':>10}  {'lag p99 ms':>10}  {'lag max ms':>10}  {'written MB':>10}  {'dropped':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("off", "recorded"):
+            manager = None
+            if mode == "recorded":
+                manager = RecordingManager(directory, args.max_pending_mb * 1024 * 1024, args.batch_kb * 1024, args.flush_interval_s)
+
+            lags = asyncio.run(run(manager, args))
+            written_mb = sum(RECORDING_BYTES_WRITTEN.values.values()) / 1024 / 1024
+            dropped = sum(RECORDING_DROPPED.values.values())
+            print(f"{mode:>9}  {percentile(lags, 50):10.2f}  {percentile(lags, 99):10.2f}  {max(lags):10.2f}  {written_mb:10.1f}  {dropped:8.0f}")
+
+        reader = RecordingReader(os.path.join(directory, "call-0.rec"))
+        turns = reader.turns
+        records = sum(1 for _ in reader.turn_records(len(turns) // 2))
+        print(f"call-0.rec: {os.path.getsize(os.path.join(directory, 'call-0.rec')) / 1024 / 1024:.1f} MB, {len(turns)} turns, {records} records in turn {len(turns) // 2}")
+        reader.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--frame-ms", type=int, default=20, help="Interval between caller audio frames per call")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="Interval between agent audio chunks per call")
+    parser.add_argument("--turn-s", type=float, default=5.0)
+    parser.add_argument("--batch-kb", type=int, default=256)
+    parser.add_argument("--flush-interval-s", type=float, default=1.0)
+    parser.add_argument("--max-pending-mb", type=int, default=64)
+    main(parser.parse_args())
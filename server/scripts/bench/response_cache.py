@@ -0,0 +1,78 @@
+"""
+Response cache hit rate and model time saved for a mix of FAQ and free-form caller turns.
+
+Turns arrive at --turns-per-s across the worker. A --faq-share of them are one of --phrases
+allowlisted phrases picked with a Zipf distribution, the rest never match. Each miss on an
+allowlisted phrase stores the response with a log-normal model time to first token, like
+scripts/loadtest/fake_providers.py, and each hit skips that time. Time is simulated, so long TTLs
+run instantly.
+
+Reports, per TTL, the hit ratio of allowlisted turns, the share of all turns answered without the
+model, the first-token time saved per hit, and the cost of a lookup.
+
+    cd server && python -m scripts.bench.response_cache --turns 200000 --ttls 60,600,3600
+"""
+import argparse
+import math
+import random
+import time
+
+from unittest import mock
+
+from app.agents.registry import compile_agent
+from app.llm.response_cache import ResponseCache
+
+
+def main(args):
+    phrases = [f"faq question number {i}" for i in range(args.phrases)]
+    agent = compile_agent("bench", {"cached_phrases": phrases}, "1")
+    weights = [1 / (rank + 1) ** args.zipf for rank in range(args.phrases)]
+    mu = math.log(args.first_token_median_ms)
+    sigma = max(math.log(args.first_token_p95_ms) - mu, 0.0) / 1.645
+
+    print(f"{args.turns} turns at {args.turns_per_s}/s, {args.faq_share * 100:.0f}% FAQ over {args.phrases} phrases, {args.max_entries} entries")
+    print(f"{'ttl':>8}  {'faq hit':>7}  {'no model':>8}  {'saved p50 ms':>12}  {'us/lookup':>9}")
+    for ttl_s in (float(value) for value in args.ttls.split(",")):
+        random.seed(1)
+        cache = ResponseCache(ttl_s, args.max_entries)
+        clock = [0.0]
+        hits = faq_turns = 0
+        saved = []
+        lookup_s = 0.0
+
+        with mock.patch("app.llm.response_cache.time.monotonic", lambda: clock[0]):
+            for _ in range(args.turns):
+                clock[0] += random.expovariate(args.turns_per_s)
+                text = random.choices(phrases, weights)[0] if random.random() < args.faq_share else f"something else {random.random()}"
+                messages = [{"role": "user", "content": text}]
+
+                started_at = time.perf_counter()
+                key = cache.get_key(agent, messages)
+                entry = cache.get(key) if key else None
+                lookup_s += time.perf_counter() - started_at
+
+                if key is None:
+                    continue
+                faq_turns += 1
+                if entry:
+                    hits += 1
+                    saved.append(entry.first_token_ms)
+                else:
+                    cache.put(key, "Cached answer.", random.lognormvariate(mu, sigma))
+
+        saved_p50 = sorted(saved)[len(saved) // 2] if saved else 0.0
+        print(f"{ttl_s:>7.0f}s  {hits / max(faq_turns, 1) * 100:6.1f}%  {hits / args.turns * 100:7.1f}%  {saved_p50:12.0f}  {lookup_s / args.turns * 1e6:9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200000)
+    parser.add_argument("--turns-per-s", type=float, default=5.0)
+    parser.add_argument("--faq-share", type=float, default=0.2, help="Share of turns that are an allowlisted phrase")
+    parser.add_argument("--phrases", type=int, default=50)
+    parser.add_argument("--zipf", type=float, default=1.0)
+    parser.add_argument("--max-entries", type=int, default=10000)
+    parser.add_argument("--ttls", default="60,600,3600", help="Entry lifetimes to compare, in seconds")
+    parser.add_argument("--first-token-median-ms", type=float, default=300)
+    parser.add_argument("--first-token-p95-ms", type=float, default=800)
+    main(parser.parse_args())
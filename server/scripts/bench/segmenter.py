@@ -0,0 +1,142 @@
+"""
+Chunk latency and chunk quality of the streaming sentence segmenter vs the old splitter in GroqLLM.
+
+Responses are tokenized into BPE-like pieces that arrive every --token-ms of virtual time. Reports
+time to first chunk, chunk sizes, bad splits (mid-word, after an abbreviation) and CPU per token.
+
+    cd server && python -m scripts.bench.segmenter
+    cd server && python -m scripts.bench.segmenter --corpus responses.txt --token-ms 20
+"""
+import argparse
+import re
+import statistics
+import time
+
+from app.llm.segmenter import ABBREVIATIONS, SentenceSegmenter, clean_markdown
+
+
+CORPUS = [
+    "Sure, I can help with that. What's your account number?",
+    "Got it. Your appointment with Dr. Patel is on March 3rd at 4.30 p.m., and the co-pay is $25.50.",
+    "You can e-mail us at support@example.com or visit https://example.com/help?topic=billing for more details.",
+    "Our hours are 9-5 on weekdays. On Saturdays we open at 10 a.m. and close around 2 p.m. We're closed on Sundays.",
+    "Here's what you need:\n1. A photo ID\n2. Your insurance card\n3. A list of current medications",
+    "**Important:** please arrive 15 minutes early. If you're running late, call us at 555-0123 so we can hold your slot.",
+    "I understand this has been frustrating and I'm sorry about the wait, let me check what happened with your order and see whether we can get it delivered by tomorrow afternoon instead",
+    "The total comes to 1,249.99 dollars, i.e. the base price plus tax. Would you like to pay by card?",
+    "Yes - that works. I've booked it for you.",
+    "Hmm, let me think. The quickest route is via I-95 north; it should take about 45 minutes depending on traffic.",
+]
+
+TOKEN_PATTERN = re.compile(r"\s*\S{1,4}|\s+")
+
+
+class LegacySplitter:
+    """The splitter GroqLLM.add_to_queue used before the segmenter."""
+
+    SPLITTERS = (".", ",", "?", "!", ";", ":", "—", "-")
+
+    def __init__(self):
+        self.sentence = ""
+
+    def push(self, text: str):
+        # The old generate_text dropped whitespace-only tokens.
+        if text.strip() == "":
+            return []
+
+        self.sentence += text
+        if text.strip().endswith(self.SPLITTERS):
+            chunk, self.sentence = self.sentence, ""
+            return [chunk]
+        return []
+
+    def flush(self):
+        chunk, self.sentence = self.sentence.strip(), ""
+        return chunk
+
+
+def run(splitter, response: str, token_ms: float):
+    chunks = []
+    first_chunk_ms = None
+    cpu_ns = 0
+    tokens = TOKEN_PATTERN.findall(response)
+
+    for i, token in enumerate(tokens):
+        started_at = time.perf_counter_ns()
+        ready = splitter.push(token)
+        cpu_ns += time.perf_counter_ns() - started_at
+
+        if ready and first_chunk_ms is None:
+            first_chunk_ms = (i + 1) * token_ms
+        chunks.extend(ready)
+
+    started_at = time.perf_counter_ns()
+    last = splitter.flush()
+    cpu_ns += time.perf_counter_ns() - started_at
+
+    if last:
+        chunks.append(last)
+    if first_chunk_ms is None:
+        first_chunk_ms = len(tokens) * token_ms
+
+    return chunks, first_chunk_ms, cpu_ns / max(len(tokens), 1)
+
+
+def count_bad_splits(response: str, chunks: list):
+    source_words = set(clean_markdown(response).split())
+    mid_word = abbreviation = tiny = 0
+
+    for previous, following in zip(chunks, chunks[1:]):
+        previous_words, following_words = previous.split(), following.split()
+        if not previous_words or not following_words:
+            continue
+
+        if previous_words[-1] + following_words[0] in source_words:
+            mid_word += 1
+        if previous_words[-1].lower().rstrip(".") in ABBREVIATIONS:
+            abbreviation += 1
+        if len(following_words) < 3:
+            tiny += 1
+
+    return mid_word, abbreviation, tiny
+
+
+def report(name, corpus, make_splitter, token_ms):
+    first_chunk, chunk_chars, cpu_per_token = [], [], []
+    mid_word = abbreviation = tiny = chunk_count = 0
+
+    for response in corpus:
+        chunks, first_chunk_ms, ns_per_token = run(make_splitter(), response, token_ms)
+        bad = count_bad_splits(response, chunks)
+
+        first_chunk.append(first_chunk_ms)
+        chunk_chars.extend(len(chunk) for chunk in chunks)
+        cpu_per_token.append(ns_per_token)
+        chunk_count += len(chunks)
+        mid_word += bad[0]
+        abbreviation += bad[1]
+        tiny += bad[2]
+
+    print(
+        f"{name:>9}: first chunk p50={statistics.median(first_chunk):6.0f}ms max={max(first_chunk):6.0f}ms"
+        f"  chunks={chunk_count:3d} mean chars={statistics.mean(chunk_chars):5.1f} max chars={max(chunk_chars):3d}"
+        f"  bad splits: mid-word={mid_word} abbreviation={abbreviation} tiny={tiny}"
+        f"  cpu={statistics.mean(cpu_per_token) / 1000:5.2f}us/token"
+    )
+
+
+def main(args):
+    corpus = CORPUS
+    if args.corpus:
+        with open(args.corpus) as f:
+            corpus = [line.rstrip("\n").replace("\\n", "\n") for line in f if line.strip()]
+
+    report("legacy", corpus, LegacySplitter, args.token_ms)
+    report("segmenter", corpus, SentenceSegmenter, args.token_ms)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus", default=None, help="One response per line, \\n for line breaks")
+    parser.add_argument("--token-ms", type=float, default=15.0, help="Virtual time between streamed tokens")
+    main(parser.parse_args())
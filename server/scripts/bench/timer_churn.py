@@ -0,0 +1,168 @@
+"""
+Call deadline churn: the shared TimerWheel vs asyncio's own timers.
+
+Every simulated call keeps the four call deadlines (max duration, caller silence, agent stall,
+provider idle) and pushes its activity deadlines back on every event, --events-per-s per call, the
+way the transcriber and IO handler report activity. Deadlines are either wheel timers, or
+loop.call_later handles that are cancelled and re-created on every rearm, or one sleeping task per
+deadline that is cancelled and restarted, like end_call_on_timeout was. A tenth of the calls go
+silent halfway through so their idle deadlines fire. A monitor task sleeps 5ms at a time and
+records how late it wakes up.
+
+Reports CPU time per rearm, event loop lag, and how late deadlines fired.
+
+    cd server && python -m scripts.bench.timer_churn --calls 5000 --seconds 10
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.lib.timers import TimerWheel
+
+
+MONITOR_INTERVAL_S = 0.005
+DEADLINES_S = (300.0, 60.0, 20.0, 3.0)
+
+
+class WheelDeadlines:
+    def __init__(self, wheel: TimerWheel, on_fire):
+        self.timers = [wheel.schedule(delay_s, lambda delay_s=delay_s: on_fire(delay_s)) for delay_s in DEADLINES_S]
+
+    def rearm(self, index: int):
+        self.timers[index].rearm(DEADLINES_S[index])
+
+    def cancel(self):
+        for timer in self.timers:
+            timer.cancel()
+
+
+class CallLaterDeadlines:
+    def __init__(self, loop: asyncio.AbstractEventLoop, on_fire):
+        self.loop = loop
+        self.on_fire = on_fire
+        self.handles = [self.schedule(delay_s) for delay_s in DEADLINES_S]
+
+    def schedule(self, delay_s: float):
+        return self.loop.call_later(delay_s, self.on_fire, delay_s)
+
+    def rearm(self, index: int):
+        self.handles[index].cancel()
+        self.handles[index] = self.schedule(DEADLINES_S[index])
+
+    def cancel(self):
+        for handle in self.handles:
+            handle.cancel()
+
+
+class TaskDeadlines:
+    def __init__(self, on_fire):
+        self.on_fire = on_fire
+        self.tasks = [asyncio.create_task(self.sleep(delay_s)) for delay_s in DEADLINES_S]
+
+    async def sleep(self, delay_s: float):
+        await asyncio.sleep(delay_s)
+        self.on_fire(delay_s)
+
+    def rearm(self, index: int):
+        self.tasks[index].cancel()
+        self.tasks[index] = asyncio.create_task(self.sleep(DEADLINES_S[index]))
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+
+async def simulate_call(index: int, deadlines, args, deadline: float, stats: dict):
+    interval_s = 1 / args.events_per_s
+    goes_silent_at = time.monotonic() + args.seconds / 2 if index % 10 == 0 else deadline
+    await asyncio.sleep(interval_s * random.random())
+
+    while time.monotonic() < min(deadline, goes_silent_at):
+        started_at = time.perf_counter()
+        # Provider idle and caller silence on every event.
+        deadlines.rearm(3)
+        deadlines.rearm(1)
+        stats["rearm_s"] += time.perf_counter() - started_at
+        stats["rearms"] += 2
+        await asyncio.sleep(interval_s)
+
+    await asyncio.sleep(max(deadline - time.monotonic(), 0))
+    deadlines.cancel()
+
+
+async def monitor(deadline: float, lags: list):
+    while time.monotonic() < deadline:
+        started_at = time.monotonic()
+        await asyncio.sleep(MONITOR_INTERVAL_S)
+        lags.append((time.monotonic() - started_at - MONITOR_INTERVAL_S) * 1000)
+
+
+async def run(mode: str, args):
+    lags = []
+    fire_lags = []
+    stats = {"rearm_s": 0.0, "rearms": 0}
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(args.tick_ms / 1000, args.slots)
+    if mode == "wheel":
+        wheel.start()
+
+    def create_deadlines():
+        # The deadline's expected fire time is captured now and pushed back on rearm by the caller.
+        scheduled_at = {}
+
+        def on_fire(delay_s: float):
+            fire_lags.append((time.monotonic() - scheduled_at[delay_s]) * 1000 - delay_s * 1000)
+
+        if mode == "wheel":
+            deadlines = WheelDeadlines(wheel, on_fire)
+        elif mode == "call_later":
+            deadlines = CallLaterDeadlines(loop, on_fire)
+        else:
+            deadlines = TaskDeadlines(on_fire)
+
+        rearm = deadlines.rearm
+
+        def tracked_rearm(index: int):
+            scheduled_at[DEADLINES_S[index]] = time.monotonic()
+            rearm(index)
+
+        for delay_s in DEADLINES_S:
+            scheduled_at[delay_s] = time.monotonic()
+        deadlines.rearm = tracked_rearm
+        return deadlines
+
+    deadline = time.monotonic() + args.seconds
+    calls = [simulate_call(i, create_deadlines(), args, deadline, stats) for i in range(args.calls)]
+    await asyncio.gather(monitor(deadline, lags), *calls)
+    await wheel.close()
+    return lags, fire_lags, stats
+
+
+def percentile(values: list, p: float):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def main(args):
+    print(f"{args.calls} calls, {args.events_per_s} events/s per call, {args.seconds:.0f}s per mode, wheel tick {args.tick_ms}ms")
+    print(f"{'mode':>10}  {'rearms/s':>9}  {'us/rearm':>8}  {'lag p50 ms':>10}  {'lag p99 ms':>10}  {'fired':>6}  {'fire late p50':>13}  {'p99 ms':>7}")
+    for mode in ("tasks", "call_later", "wheel"):
+        lags, fire_lags, stats = asyncio.run(run(mode, args))
+        us_per_rearm = stats["rearm_s"] / max(stats["rearms"], 1) * 1e6
+        print(
+            f"{mode:>10}  {stats['rearms'] / args.seconds:9.0f}  {us_per_rearm:8.2f}  {percentile(lags, 50):10.2f}  {percentile(lags, 99):10.2f}"
+            f"  {len(fire_lags):6}  {percentile(fire_lags, 50):13.1f}  {percentile(fire_lags, 99):7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--events-per-s", type=float, default=10, help="Activity events per call, each rearming two deadlines")
+    parser.add_argument("--tick-ms", type=int, default=100)
+    parser.add_argument("--slots", type=int, default=512)
+    main(parser.parse_args())
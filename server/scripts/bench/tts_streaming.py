@@ -0,0 +1,151 @@
+"""
+Sentence flushing vs token streaming into TTS, simulated with the load test stub latencies.
+
+Each trial streams a reply from a fake LLM (log-normal first token and token interval, like
+scripts/loadtest/fake_providers.py) through the SentenceSegmenter or WordChunker. TTS generations
+run one at a time; each one starts delivering audio after a log-normal first-audio delay and
+produces 60ms of audio per character. Sentence mode flushes every chunk, streaming mode triggers
+generations from the chunk_length_schedule and flushes at the end of the response, and
+stream+1st also flushes the first clause (TTS_STREAM_FLUSH_FIRST_CLAUSE).
+
+Reports, from the end of the caller's turn: first audio, last audio received, and when playback
+ends, along with how long playback stalled waiting on the next generation mid-response.
+
+    cd server && python -m scripts.bench.tts_streaming --trials 2000 --schedule 50,120,160,250
+"""
+import argparse
+import math
+import random
+import re
+
+from app.llm.segmenter import SentenceSegmenter, WordChunker
+
+
+REPLIES = [
+    "Sure, I can help with that. Let me take a quick look. It should arrive by Thursday afternoon.",
+    "We're open from nine to six on weekdays, and ten to four on Saturdays. We're closed on Sundays and public holidays.",
+    "Okay. I've moved your appointment to Tuesday at three. You'll get a text confirming it shortly. Is there anything else?",
+]
+AUDIO_MS_PER_CHAR = 60
+# Time a generation spends producing audio per character once it has started, far faster than real time.
+GENERATION_MS_PER_CHAR = 3
+
+
+class LatencyDistribution:
+    """Log-normal latency from a median and a 95th percentile, in milliseconds."""
+
+    def __init__(self, spec: str):
+        median_ms, p95_ms = (float(value) for value in spec.split(","))
+        self.mu = math.log(max(median_ms, 0.001))
+        self.sigma = max(math.log(max(p95_ms, median_ms, 0.001)) - self.mu, 0.0) / 1.645
+
+    def sample_ms(self):
+        return random.lognormvariate(self.mu, self.sigma)
+
+
+def stream_llm(reply: str, args):
+    """(time_ms, token) pairs of a streamed reply."""
+    now = args.llm_first_token.sample_ms()
+    tokens = []
+    for i, token in enumerate(re.findall(r"\S+\s*", reply)):
+        if i:
+            now += args.llm_token_interval.sample_ms()
+        tokens.append((now, token))
+    return now, tokens
+
+
+def sentence_generations(tokens: list, end_ms: float):
+    """(trigger_ms, text) for every flushed sentence."""
+    segmenter = SentenceSegmenter()
+    generations = []
+    for now, token in tokens:
+        generations.extend((now, chunk) for chunk in segmenter.push(token))
+    generations.append((end_ms, segmenter.flush()))
+    return [(now, text) for now, text in generations if text]
+
+
+def streamed_generations(tokens: list, end_ms: float, schedule: list, flush_first_clause: bool):
+    """(trigger_ms, text) for every generation a flush or the chunk_length_schedule starts."""
+    chunker = WordChunker(flush_first_clause)
+    generations = []
+    buffer = ""
+    scheduled = 0
+    for now, token in tokens:
+        text, flush = chunker.push(token)
+        buffer += text
+        if buffer and (flush or len(buffer) >= schedule[min(scheduled, len(schedule) - 1)]):
+            generations.append((now, buffer))
+            buffer = ""
+            # A flush starts the schedule over.
+            scheduled = 0 if flush else scheduled + 1
+    buffer += chunker.flush()
+    if buffer.strip():
+        generations.append((end_ms, buffer))
+    return generations
+
+
+def play(generations: list, args):
+    """First audio, last audio and playback end times, plus playback stall, all in ms."""
+    generator_free_at = 0.0
+    playback_at = None
+    stall_ms = 0.0
+    first_audio_ms = None
+    last_audio_ms = 0.0
+
+    for trigger_ms, text in generations:
+        chars = len(text.strip())
+        audio_at = max(trigger_ms, generator_free_at) + args.tts_first_audio.sample_ms()
+        generator_free_at = audio_at + chars * GENERATION_MS_PER_CHAR
+        last_audio_ms = generator_free_at
+
+        if playback_at is None:
+            first_audio_ms = playback_at = audio_at
+        elif audio_at > playback_at:
+            stall_ms += audio_at - playback_at
+            playback_at = audio_at
+        playback_at += chars * AUDIO_MS_PER_CHAR
+
+    return first_audio_ms, last_audio_ms, playback_at, stall_ms
+
+
+def percentile(values: list, p: float):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def main(args):
+    args.llm_first_token = LatencyDistribution(args.llm_first_token)
+    args.llm_token_interval = LatencyDistribution(args.llm_token_interval)
+    args.tts_first_audio = LatencyDistribution(args.tts_first_audio)
+    schedule = [int(value) for value in args.schedule.split(",")]
+
+    results = {"sentence": [], "stream": [], "stream+1st": []}
+    for trial in range(args.trials):
+        end_ms, tokens = stream_llm(REPLIES[trial % len(REPLIES)], args)
+        seed = random.random()
+        for mode, generations in (
+            ("sentence", sentence_generations(tokens, end_ms)),
+            ("stream", streamed_generations(tokens, end_ms, schedule, flush_first_clause=False)),
+            ("stream+1st", streamed_generations(tokens, end_ms, schedule, flush_first_clause=True)),
+        ):
+            # Same LLM timing and TTS draws for every mode.
+            random.seed(seed)
+            results[mode].append((*play(generations, args), len(generations)))
+
+    print(f"{args.trials} replies, schedule {schedule}, ms from end of turn (p50 / p95)")
+    print(f"{'mode':>10}  {'first audio':>13}  {'last audio':>13}  {'playback end':>13}  {'stall':>11}  {'generations':>11}")
+    for mode, rows in results.items():
+        columns = list(zip(*rows))
+        cells = [f"{percentile(column, 50):5.0f} / {percentile(column, 95):5.0f}" for column in columns[:3]]
+        cells.append(f"{percentile(columns[3], 50):4.0f} / {percentile(columns[3], 95):4.0f}")
+        print(f"{mode:>10}  {cells[0]:>13}  {cells[1]:>13}  {cells[2]:>13}  {cells[3]:>11}  {sum(columns[4]) / len(rows):11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=2000)
+    parser.add_argument("--schedule", default="120,160,250,290", help="chunk_length_schedule for streaming mode")
+    parser.add_argument("--llm-first-token", default="300,800", help="median_ms,p95_ms")
+    parser.add_argument("--llm-token-interval", default="15,40", help="median_ms,p95_ms")
+    parser.add_argument("--tts-first-audio", default="200,500", help="Delay to first audio of each generation, median_ms,p95_ms")
+    main(parser.parse_args())
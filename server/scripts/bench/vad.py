@@ -0,0 +1,80 @@
+"""
+CPU cost per call of the local voice activity detector, and how early it ends a turn.
+
+Generates a caller track of speech-like bursts (a modulated harmonic tone) separated by pauses over
+low background noise, runs it through VoiceActivityDetector in --frame-ms frames and reports the
+time per frame, the share of a core one call costs, and the delay from the end of each burst to
+its SPEECH_END event.
+
+    cd server && python -m scripts.bench.vad --seconds 60 --hangover-ms 300
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.audio.vad import SPEECH_END, SPEECH_START, VoiceActivityDetector
+
+
+SAMPLE_RATE = 16000
+
+
+def make_track(seconds: float, rng):
+    """16-bit PCM plus the (start, end) sample offsets of each speech burst."""
+    total = int(seconds * SAMPLE_RATE)
+    audio = rng.normal(0, 30, total)
+
+    bursts = []
+    position = int(0.5 * SAMPLE_RATE)
+    while position < total:
+        length = int(rng.uniform(0.8, 3.0) * SAMPLE_RATE)
+        end = min(position + length, total)
+        t = np.arange(end - position) / SAMPLE_RATE
+        pitch = rng.uniform(100, 220)
+        voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+        syllables = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+        audio[position:end] += 6000 * voice * syllables
+        bursts.append((position, end))
+        position = end + int(rng.uniform(0.4, 1.5) * SAMPLE_RATE)
+
+    return np.clip(audio, -32768, 32767).astype("<i2").tobytes(), bursts
+
+
+def main(args):
+    rng = np.random.default_rng(args.seed)
+    audio, bursts = make_track(args.seconds, rng)
+    frame_bytes = SAMPLE_RATE * args.frame_ms // 1000 * 2
+    frames = [audio[i:i + frame_bytes] for i in range(0, len(audio), frame_bytes)]
+
+    vad = VoiceActivityDetector(SAMPLE_RATE, start_ms=args.start_ms, hangover_ms=args.hangover_ms)
+    events = []
+    started_at = time.process_time()
+    for index, frame in enumerate(frames):
+        for event in vad.process(frame):
+            events.append((event, (index + 1) * args.frame_ms))
+    cpu_s = time.process_time() - started_at
+
+    ends_ms = [end * 1000 / SAMPLE_RATE for _, end in bursts]
+    delays = []
+    for event, at_ms in events:
+        if event != SPEECH_END:
+            continue
+        previous = [end for end in ends_ms if end <= at_ms]
+        if previous:
+            delays.append(at_ms - previous[-1])
+
+    print(f"frames={len(frames)} frame={args.frame_ms}ms bursts={len(bursts)}")
+    print(f"cpu: {cpu_s / len(frames) * 1e6:.1f}us per frame, {cpu_s / args.seconds * 100:.3f}% of a core per call")
+    print(f"events: {sum(e == SPEECH_START for e, _ in events)} starts, {sum(e == SPEECH_END for e, _ in events)} ends")
+    if delays:
+        print(f"speech end detected {np.median(delays):.0f}ms (median) / {max(delays):.0f}ms (max) after the caller stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--frame-ms", type=int, default=40)
+    parser.add_argument("--start-ms", type=int, default=60)
+    parser.add_argument("--hangover-ms", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
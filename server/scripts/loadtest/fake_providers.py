@@ -0,0 +1,250 @@
+"""
+Local stand-ins for Deepgram, ElevenLabs and the OpenAI-compatible LLM, speaking the same wire
+protocols the server uses. All three are served from one port:
+
+    Deepgram     ws   /v1/listen
+    ElevenLabs   ws   /v1/text-to-speech/{voice_id}/stream-input
+    OpenAI       POST /v1/chat/completions (streamed), GET /v1/models
+
+Latencies are drawn from log-normal distributions given as "median_ms,p95_ms".
+
+    cd server && python -m scripts.loadtest.fake_providers --port 8790 --llm-first-token 250,600
+
+Then start the server against it:
+
+    DEEPGRAM_WS_URL=ws://127.0.0.1:8790/v1/listen \\
+    ELEVENLABS_WS_BASE_URL=ws://127.0.0.1:8790 \\
+    OPENAI_BASE_URL=http://127.0.0.1:8790/v1 \\
+    uvicorn app.main:app --port 8000
+"""
+import argparse
+import array
+import asyncio
+import base64
+import itertools
+import json
+import math
+import random
+import re
+import time
+
+from aiohttp import WSMsgType, web
+
+
+DEFAULT_TRANSCRIPTS = [
+    "Hi, I'd like to check on my order.",
+    "It's order number four five six seven.",
+    "Can you tell me when it will arrive?",
+    "Great, thanks. What are your opening hours?",
+    "Okay, that's all I needed.",
+]
+DEFAULT_REPLY = "Sure, I can help with that. Let me take a quick look. It should arrive by Thursday afternoon."
+# ElevenLabs' chunk_length_schedule when the BOS message doesn't set one.
+DEFAULT_CHUNK_LENGTH_SCHEDULE = [120, 160, 250, 290]
+# Audio bytes per millisecond for each ElevenLabs output_format, mp3 at 128 kbps.
+OUTPUT_FORMAT_BYTES_PER_MS = {"pcm_16000": 32, "pcm_24000": 48, "ulaw_8000": 8, "mp3_44100_128": 16}
+
+
+class LatencyDistribution:
+    """Log-normal latency from a median and a 95th percentile, in milliseconds."""
+
+    def __init__(self, spec: str):
+        median_ms, p95_ms = (float(value) for value in spec.split(","))
+        self.mu = math.log(max(median_ms, 0.001))
+        self.sigma = max(math.log(max(p95_ms, median_ms, 0.001)) - self.mu, 0.0) / 1.645
+
+    def sample_s(self):
+        return random.lognormvariate(self.mu, self.sigma) / 1000
+
+    async def sleep(self):
+        await asyncio.sleep(self.sample_s())
+
+
+class FakeProviders:
+    def __init__(self, args):
+        self.stt_latency = LatencyDistribution(args.stt_latency)
+        self.tts_first_audio = LatencyDistribution(args.tts_first_audio)
+        self.llm_first_token = LatencyDistribution(args.llm_first_token)
+        self.llm_token_interval = LatencyDistribution(args.llm_token_interval)
+        self.endpoint_ms = args.endpoint_ms
+        self.silence_peak = args.silence_peak
+        self.transcripts = itertools.cycle(DEFAULT_TRANSCRIPTS)
+        self.reply_tokens = re.findall(r"\S+\s*", DEFAULT_REPLY)
+
+    def create_app(self):
+        app = web.Application()
+        app.router.add_get("/v1/listen", self.deepgram)
+        app.router.add_get("/v1/text-to-speech/{voice_id}/stream-input", self.elevenlabs)
+        app.router.add_get("/v1/models", self.openai_models)
+        app.router.add_post("/v1/chat/completions", self.openai_chat_completions)
+        return app
+
+    def is_silence(self, frame: bytes):
+        # Inbound audio is assumed to be 16-bit PCM, anything else counts as speech.
+        if len(frame) % 2:
+            return False
+        samples = array.array("h", frame)
+        return not samples or max(samples) < self.silence_peak and -min(samples) < self.silence_peak
+
+    async def deepgram(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+
+        state = {"heard_speech": False, "last_speech_at": 0.0}
+
+        async def send_final(from_finalize: bool = False):
+            state["heard_speech"] = False
+            await self.stt_latency.sleep()
+            await ws.send_str(json.dumps({
+                "type": "Results",
+                "channel": {"alternatives": [{"transcript": next(self.transcripts), "confidence": 0.99}]},
+                "is_final": True,
+                "speech_final": not from_finalize,
+                "from_finalize": from_finalize,
+            }))
+
+        async def endpointer():
+            while not ws.closed:
+                await asyncio.sleep(0.02)
+                silent_for_ms = (time.monotonic() - state["last_speech_at"]) * 1000
+                if state["heard_speech"] and silent_for_ms >= self.endpoint_ms:
+                    await send_final()
+
+        endpointer_task = asyncio.create_task(endpointer())
+        try:
+            async for message in ws:
+                if message.type == WSMsgType.BINARY:
+                    if not self.is_silence(message.data):
+                        state["heard_speech"] = True
+                        state["last_speech_at"] = time.monotonic()
+                elif message.type == WSMsgType.TEXT:
+                    message_type = json.loads(message.data).get("type")
+                    if message_type == "CloseStream":
+                        break
+                    if message_type == "Finalize" and state["heard_speech"]:
+                        await send_final(from_finalize=True)
+        finally:
+            endpointer_task.cancel()
+            await ws.close()
+        return ws
+
+    async def elevenlabs(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        text_buffer = []
+        bytes_per_ms = OUTPUT_FORMAT_BYTES_PER_MS.get(request.query.get("output_format"), 16)
+        schedule = DEFAULT_CHUNK_LENGTH_SCHEDULE
+        generation_count = 0
+
+        # Generations run one after another while more text keeps arriving, like the real service.
+        generations = asyncio.Queue()
+
+        async def generate():
+            while True:
+                text = await generations.get()
+                await self.synthesize(ws, text, bytes_per_ms)
+                generations.task_done()
+
+        generator_task = asyncio.create_task(generate())
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+
+                data = json.loads(message.data)
+                text = data.get("text", "")
+
+                # BOS carries voice settings and generation triggers, a lone space is a keepalive.
+                if "voice_settings" in data:
+                    schedule = (data.get("generation_config") or {}).get("chunk_length_schedule") or schedule
+                    continue
+                if text == " " and not data.get("flush"):
+                    continue
+                if text == "":
+                    await generations.join()
+                    await ws.send_str(json.dumps({"isFinal": True}))
+                    break
+
+                text_buffer.append(text)
+                buffered = "".join(text_buffer)
+                # Without a flush, generation starts once the buffer passes the next scheduled length.
+                trigger_at = schedule[min(generation_count, len(schedule) - 1)]
+                if data.get("flush") or data.get("try_trigger_generation") or len(buffered) >= trigger_at:
+                    generations.put_nowait(buffered.strip())
+                    generation_count = 0 if data.get("flush") else generation_count + 1
+                    text_buffer = []
+        finally:
+            generator_task.cancel()
+            await ws.close()
+        return ws
+
+    async def synthesize(self, ws, text: str, bytes_per_ms: int):
+        if not text:
+            return
+
+        await self.tts_first_audio.sleep()
+        # Silence in the requested format, 60 ms per character, sent in chunks of ~10 characters.
+        for start in range(0, len(text), 10):
+            chars = list(text[start:start + 10])
+            durations = [30 if char == " " else 60 for char in chars]
+            starts = list(itertools.accumulate([0, *durations[:-1]]))
+            alignment = {"chars": chars, "charStartTimesMs": starts, "charDurationsMs": durations}
+            await ws.send_str(json.dumps({
+                "audio": base64.b64encode(bytes(bytes_per_ms * sum(durations))).decode(),
+                "isFinal": False,
+                "alignment": alignment,
+                "normalizedAlignment": alignment,
+            }))
+
+    async def openai_models(self, request):
+        return web.json_response({"object": "list", "data": [{"id": "fake", "object": "model"}]})
+
+    async def openai_chat_completions(self, request):
+        body = await request.json()
+
+        if not body.get("stream"):
+            return web.json_response({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": DEFAULT_REPLY}, "finish_reason": "stop"}],
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await self.llm_first_token.sleep()
+
+        for i, token in enumerate(self.reply_tokens):
+            if i:
+                await self.llm_token_interval.sleep()
+            chunk = {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+
+def add_arguments(parser):
+    parser.add_argument("--stt-latency", default="150,400", help="Deepgram speech_final delay after endpoint, median_ms,p95_ms")
+    parser.add_argument("--tts-first-audio", default="200,500", help="ElevenLabs delay to first audio after flush, median_ms,p95_ms")
+    parser.add_argument("--llm-first-token", default="300,800", help="LLM time to first token, median_ms,p95_ms")
+    parser.add_argument("--llm-token-interval", default="15,40", help="LLM delay between tokens, median_ms,p95_ms")
+    parser.add_argument("--endpoint-ms", type=float, default=300, help="Silence that ends a caller utterance")
+    parser.add_argument("--silence-peak", type=int, default=500, help="PCM peak below which a frame counts as silence")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    web.run_app(FakeProviders(args).create_app(), host=args.host, port=args.port)
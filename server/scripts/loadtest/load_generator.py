@@ -0,0 +1,180 @@
+"""
+Opens N concurrent /ws/chat/{agent_id} sessions, replays WAV files as caller turns and reports
+per-turn latency percentiles plus server CPU and memory per call.
+
+Turn latency is measured from the last frame of caller speech to the first agent audio frame, so
+it includes the endpointing silence. Response latency runs to the last agent audio frame of the turn. Point the server at scripts/loadtest/fake_providers.py to
+avoid spending provider quota. CPU and memory are read from /proc for --server-pid (Linux only).
+
+    cd server && python -m scripts.loadtest.load_generator --calls 50 --turns 3 --wav caller.wav --server-pid $(pgrep -f uvicorn)
+"""
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import time
+import wave
+
+import websockets
+
+
+def load_wav(path: str):
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2 or f.getnchannels() != 1:
+            raise ValueError(f"{path}: expected 16-bit mono PCM")
+        return f.readframes(f.getnframes()), f.getframerate()
+
+
+def synthetic_utterance(sample_rate: int, seconds: float = 1.5):
+    # A 220 Hz tone, loud enough to count as speech for the fake Deepgram endpointer.
+    samples = (int(8000 * math.sin(2 * math.pi * 220 * i / sample_rate)) for i in range(int(sample_rate * seconds)))
+    return b"".join(sample.to_bytes(2, "little", signed=True) for sample in samples)
+
+
+def read_process_stats(pid: int):
+    """CPU seconds and resident memory in bytes of a process."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu_s = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    with open(f"/proc/{pid}/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    return cpu_s, rss_kb * 1024
+
+
+def percentile(samples: list, q: float):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q / 100))]
+
+
+class CallSession:
+    def __init__(self, args, utterances: list, sample_rate: int):
+        self.args = args
+        self.utterances = utterances
+        self.frame_bytes = int(sample_rate * args.frame_ms / 1000) * 2
+        self.silence_frame = bytes(self.frame_bytes)
+
+        self.turn_latencies_ms: list = []
+        self.response_latencies_ms: list = []
+        self.audio_bytes_received: int = 0
+        self.errors: int = 0
+
+        self.speech_ended_at = None
+        self.turn_started_at = 0.0
+        self.last_audio_at = 0.0
+
+    async def stream(self, websocket, audio: bytes):
+        for start in range(0, len(audio), self.frame_bytes):
+            await websocket.send(audio[start:start + self.frame_bytes])
+            await asyncio.sleep(self.args.frame_ms / 1000)
+
+    async def receive(self, websocket):
+        async for message in websocket:
+            if not isinstance(message, bytes):
+                continue
+
+            now = time.perf_counter()
+            if self.speech_ended_at is not None:
+                self.turn_latencies_ms.append((now - self.speech_ended_at) * 1000)
+                self.speech_ended_at = None
+            self.audio_bytes_received += len(message)
+            self.last_audio_at = now
+
+    async def send_silence_until_agent_done(self, websocket):
+        # Keep the line open with silence, like a real client, until the agent has gone quiet.
+        deadline = time.perf_counter() + self.args.turn_timeout_s
+        while time.perf_counter() < deadline:
+            await websocket.send(self.silence_frame)
+            await asyncio.sleep(self.args.frame_ms / 1000)
+
+            agent_started = self.speech_ended_at is None
+            quiet_for_s = time.perf_counter() - self.last_audio_at
+            if agent_started and quiet_for_s * 1000 >= self.args.agent_quiet_ms:
+                self.response_latencies_ms.append((self.last_audio_at - self.turn_started_at) * 1000)
+                return
+
+        self.speech_ended_at = None
+        self.errors += 1
+
+    async def run(self):
+        try:
+            url = f"{self.args.url}?input_format={self.args.input_format}&output_format={self.args.output_format}"
+            async with websockets.connect(url, max_size=None) as websocket:
+                receiver = asyncio.create_task(self.receive(websocket))
+
+                for turn in range(self.args.turns):
+                    await self.stream(websocket, self.utterances[turn % len(self.utterances)])
+                    self.speech_ended_at = self.turn_started_at = time.perf_counter()
+                    await self.send_silence_until_agent_done(websocket)
+
+                receiver.cancel()
+        except Exception as e:
+            print(f"session error: {e}")
+            self.errors += 1
+
+
+async def main(args):
+    if args.wav:
+        loaded = [load_wav(path) for path in args.wav]
+        sample_rate = loaded[0][1]
+        utterances = [audio for audio, _ in loaded]
+    else:
+        sample_rate = args.sample_rate
+        utterances = [synthetic_utterance(sample_rate)]
+
+    sessions = [CallSession(args, utterances, sample_rate) for _ in range(args.calls)]
+
+    stats_before = read_process_stats(args.server_pid) if args.server_pid else None
+    started_at = time.perf_counter()
+
+    async def start(index: int, session: CallSession):
+        # Spread connection setup over the ramp-up window.
+        await asyncio.sleep(args.ramp_up_s * index / max(args.calls, 1))
+        await session.run()
+
+    await asyncio.gather(*(start(i, session) for i, session in enumerate(sessions)))
+    elapsed_s = time.perf_counter() - started_at
+
+    latencies = [latency for session in sessions for latency in session.turn_latencies_ms]
+    response_latencies = [latency for session in sessions for latency in session.response_latencies_ms]
+    errors = sum(session.errors for session in sessions)
+
+    print(f"calls={args.calls} turns/call={args.turns} elapsed={elapsed_s:.1f}s errors={errors}")
+    if latencies:
+        print(
+            f"turn latency: n={len(latencies)} mean={statistics.mean(latencies):.0f}ms "
+            f"p50={percentile(latencies, 50):.0f}ms p95={percentile(latencies, 95):.0f}ms p99={percentile(latencies, 99):.0f}ms"
+        )
+    if response_latencies:
+        print(
+            f"response latency: n={len(response_latencies)} mean={statistics.mean(response_latencies):.0f}ms "
+            f"p50={percentile(response_latencies, 50):.0f}ms p95={percentile(response_latencies, 95):.0f}ms p99={percentile(response_latencies, 99):.0f}ms"
+        )
+    print(f"agent audio received: {sum(session.audio_bytes_received for session in sessions) / 1e6:.1f} MB")
+
+    if stats_before:
+        cpu_after, rss_after = read_process_stats(args.server_pid)
+        cpu_s = cpu_after - stats_before[0]
+        print(
+            f"server: cpu={cpu_s:.2f}s ({cpu_s / elapsed_s * 100:.1f}% of a core) "
+            f"cpu/call={cpu_s / args.calls * 1000:.1f}ms "
+            f"rss delta/call={(rss_after - stats_before[1]) / args.calls / 1024:.0f}KB rss={rss_after / 1e6:.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws/chat/loadtest")
+    parser.add_argument("--calls", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--wav", nargs="*", help="16-bit mono PCM WAV files, one per caller turn (cycled)")
+    parser.add_argument("--sample-rate", type=int, default=16000, help="Sample rate of the synthetic utterance when no WAV is given")
+    parser.add_argument("--input-format", default="pcm_16000", help="Must match the WAV or --sample-rate")
+    parser.add_argument("--output-format", default="pcm_16000")
+    parser.add_argument("--frame-ms", type=float, default=100)
+    parser.add_argument("--ramp-up-s", type=float, default=5)
+    parser.add_argument("--agent-quiet-ms", type=float, default=1500, help="Agent silence that ends its turn")
+    parser.add_argument("--turn-timeout-s", type=float, default=20)
+    parser.add_argument("--server-pid", type=int, default=None)
+    asyncio.run(main(parser.parse_args()))